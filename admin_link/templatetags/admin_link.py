@@ -3,18 +3,18 @@
 
 from django import template
 from django.template.loader import render_to_string
-from django.urls import reverse
 
 from .. import utils
 
 register = template.Library()
 
 ACTIONS = ("changelist", "add", "change", "delete")
+# Actions of `admin_links` by default (those that apply to a single instance)
+INSTANCE_ACTIONS = ("change", "delete")
 
 
 @register.simple_tag(takes_context=True)
 def admin_link_url(context, instance, action: str, require_permission=True):
-    user = context.request.user
     has_permission = utils.has_permission(context, instance, action)
 
     if require_permission and not has_permission:
@@ -23,25 +23,71 @@ def admin_link_url(context, instance, action: str, require_permission=True):
     return utils.get_admin_link_url(context, instance, action)
 
 
+def get_link_context(context, instance, action, label=None, require_permission=True):
+    """Context of the template of an admin link, or None if there is no link."""
+    model_key = utils.get_model_key(instance)
+    if model_key is None:
+        return None
+
+    url = admin_link_url(context, instance, action, require_permission)
+    if not url:
+        return None
+
+    app_label, model_name = model_key
+    return dict(
+        url=url,
+        label=label,
+        app_label=app_label.replace("_", " "),
+        model_name=model_name.replace("_", " "),
+        action=action,
+    )
+
+
 @register.simple_tag(takes_context=True)
 def admin_link(
     context, instance, action: str, label: str = None, require_permission=True
 ):
-    url = admin_link_url(context, instance, action, require_permission)
-
-    try:
-        app_label = instance._meta.app_label.replace("_", " ")
-        model_name = instance._meta.model_name.replace("_", " ")
-    except AttributeError:
-        return ""
-
-    local_context = dict(
-        url=url, label=label, app_label=app_label, model_name=model_name
+    local_context = get_link_context(
+        context, instance, action, label, require_permission
     )
 
-    if url:
+    if local_context:
         return render_to_string(
             "admin_link/{}.html".format(action), context=local_context
         )
     else:
         return ""
+
+
+@register.simple_tag(takes_context=True)
+def admin_links(context, object_list, *actions, **options):
+    """Admin links of each instance of `object_list` for `actions` (default:
+    change and delete), rendered at once by `admin_link/links.html`.
+
+    E.g. `{% admin_links object_list %}` or `{% admin_links object_list 'delete' %}`
+
+    :param options: `label` and `require_permission` (as for `admin_link`). Django
+        2.2 does not parse keyword-only arguments of template tags.
+    """
+    label = options.pop("label", None)
+    require_permission = options.pop("require_permission", True)
+    if options:
+        raise TypeError(
+            "admin_links() got unexpected keyword arguments: {}".format(
+                ", ".join(options)
+            )
+        )
+
+    links = list()
+    for instance in object_list:
+        for action in actions or INSTANCE_ACTIONS:
+            link = get_link_context(
+                context, instance, action, label, require_permission
+            )
+            if link:
+                links.append(link)
+
+    if links:
+        return render_to_string("admin_link/links.html", context=dict(links=links))
+    else:
+        return ""
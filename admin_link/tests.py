@@ -1,3 +1,43 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.template import RequestContext, Template
+from django.test import RequestFactory, TestCase
+from django.urls import resolve, reverse
+
+
+class AdminLinksTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username, "{}@example.com".format(username))
+            for username in ["alice", "bob", "carol"]
+        ]
+        self.request = RequestFactory().get("/admin/")
+        self.request.resolver_match = resolve(self.request.path)
+        self.request.user = self.users[0]
+
+    def render(self, source, **context):
+        template = Template("{% load admin_link %}" + source)
+        return template.render(RequestContext(self.request, context))
+
+    def test_permissions_are_checked_once(self):
+        with mock.patch.object(
+            User,
+            "has_perm",
+            autospec=True,
+            side_effect=lambda user, perm: perm == "auth.change_user",
+        ) as has_perm:
+            html = self.render("{% admin_links users %}", users=self.users)
+            html += self.render("{% admin_link user 'delete' %}", user=self.users[0])
+        self.assertEqual(has_perm.call_count, 2)
+        for user in self.users:
+            self.assertIn(
+                reverse("admin:auth_user_change", args=[user.pk])
+                + "?admin_link_redirect=/admin/",
+                html,
+            )
+        self.assertNotIn("/delete/", html)
+
+    def test_unknown_option(self):
+        with self.assertRaises(TypeError):
+            self.render("{% admin_links users labels='Go' %}", users=self.users)
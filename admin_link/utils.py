@@ -1,45 +1,95 @@
-from django.shortcuts import reverse
+from functools import lru_cache
+from urllib.parse import quote
 
+from django.shortcuts import reverse
+from django.urls import get_script_prefix, get_urlconf
+from django.utils.http import RFC3986_SUBDELIMS
 
 ACTIONS = ("changelist", "add", "change", "delete")
 
+# Stands for the primary key in the memoized URLs of the change and delete pages
+PK_MARKER = "__admin_link_pk__"
+# Attribute of the request that holds its permission matrix
+PERMISSIONS_ATTR = "_admin_link_permissions"
 
-def get_admin_link_url(context, instance, action: str):
-    if action not in ACTIONS:
-        raise ValueError(
-            "`action` must be one of {}. Value provided is `{}`.".format(
-                ACTIONS, action
-            )
-        )
 
+def get_model_key(instance):
+    """(app label, model name) of a model instance (or class), or None for other
+    objects.
+    """
     try:
-        app = instance._meta.app_label
-        model = instance._meta.model_name
+        return instance._meta.app_label, instance._meta.model_name
     except AttributeError:
         return None
 
-    url_name = "admin:%s_%s_%s" % (app, model, action)
 
+@lru_cache(maxsize=None)
+def _get_url_pattern(app, model, action, current_app, urlconf, script_prefix):
+    # The URL conf and script prefix are part of the key, as `reverse` depends
+    # on them
+    url_name = "admin:%s_%s_%s" % (app, model, action)
     if action in ("change", "delete"):
-        args = (instance.pk,)
+        args = (PK_MARKER,)
     else:
         args = ()
+    return reverse(url_name, args=args, current_app=current_app)
+
+
+def get_url_pattern(app, model, action, current_app=None):
+    """Admin URL of `action` for a model (memoized), with `PK_MARKER` in place of
+    the primary key for the change and delete pages.
+    """
+    return _get_url_pattern(
+        app, model, action, current_app, get_urlconf(), get_script_prefix()
+    )
+
+
+def get_admin_link_url(context, instance, action: str):
+    if action not in ACTIONS:
+        raise ValueError(
+            "`action` must be one of {}. Value provided is `{}`.".format(
+                ACTIONS, action
+            )
+        )
+
+    model_key = get_model_key(instance)
+    if model_key is None:
+        return None
 
-    url = reverse(
-        url_name, args=args, current_app=context.request.resolver_match.app_name
+    url = get_url_pattern(
+        *model_key, action, current_app=context.request.resolver_match.app_name
     )
+    if action in ("change", "delete"):
+        # Quoted as `reverse` would
+        url = url.replace(
+            PK_MARKER, quote(str(instance.pk), safe=RFC3986_SUBDELIMS + "/~:@")
+        )
     full_url = "{}?admin_link_redirect={}".format(url, context.request.get_full_path())
 
     return full_url
 
 
-def has_permission(context, instance, action: str):
-    user = context.request.user
-
+def get_permission_matrix(request):
+    """Permissions of the user of `request` by (app label, model name, action),
+    computed once per request for each model and action.
+    """
     try:
-        app = instance._meta.app_label
-        model = instance._meta.model_name
+        return getattr(request, PERMISSIONS_ATTR)
     except AttributeError:
+        permissions = dict()
+        setattr(request, PERMISSIONS_ATTR, permissions)
+        return permissions
+
+
+def has_permission(context, instance, action: str):
+    model_key = get_model_key(instance)
+    if model_key is None:
         return False
 
-    return user.has_perm("{}.{}_{}".format(app, action, model))
+    app, model = model_key
+    permissions = get_permission_matrix(context.request)
+    key = (app, model, action)
+    if key not in permissions:
+        user = context.request.user
+        permissions[key] = user.has_perm("{}.{}_{}".format(app, action, model))
+    return permissions[key]
@@ -202,6 +202,12 @@ SUMMERNOTE_CONFIG = {
 SUMMERNOTE_THEME = "bs4"
 X_FRAME_OPTIONS = "SAMEORIGIN"
 
+# Dt Content
+# Per-process caches (e.g., the navigation tree) are invalidated through counters
+# stored in this cache. Use a backend shared by all worker processes in production
+# (e.g., Memcached or the database cache) instead of the default LocMemCache.
+DT_CONTENT_CACHE_ALIAS = "default"
+
 # Django Allauth
 """
 Allauth requires some manual setup on your part. Make sure to have a good
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class CarouselConfig(AppConfig):
     name = "carousel"
+
+    def ready(self):
+        from . import signals  # noqa: F401
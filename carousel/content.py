@@ -0,0 +1,63 @@
+"""Optional integration with dt_content.
+
+With dt_content installed, carousels use its responsive renditions (generated in
+the background, see `dt_content.warming`), inline placeholders, cached rendered
+carousels and deferred registration of missing carousels. Without it, carousels
+render as they did before: images without `srcset` or placeholder, rendered on
+each request, and missing carousels created while rendering.
+"""
+from django.apps import apps
+
+DT_CONTENT_INSTALLED = apps.is_installed("dt_content")
+
+if DT_CONTENT_INSTALLED:
+    from dt_content.cache import bump_generation_on_commit  # noqa: F401
+    from dt_content.fragments import get_or_render, make_fragment_key  # noqa: F401
+    from dt_content.rendition_index import (  # noqa: F401
+        get_index_generation,
+        get_indexed_specs,
+        get_srcset,
+    )
+    from dt_content.renditions import (  # noqa: F401
+        get_field_placeholder,
+        get_placeholder_style,
+    )
+    from dt_content.warming import (  # noqa: F401
+        get_rendition_widths,
+        is_new_upload,
+        warm_on_commit,
+    )
+else:
+
+    def bump_generation_on_commit(namespace):
+        pass
+
+    def get_or_render(key, namespace, render, timeout=None):
+        return render()
+
+    def make_fragment_key(name, *parts):
+        return None
+
+    def get_index_generation():
+        return None
+
+    def get_indexed_specs(names):
+        return dict()
+
+    def get_srcset(field_file, width, height, widths):
+        return ""
+
+    def get_field_placeholder(field_file):
+        return "", ""
+
+    def get_placeholder_style(data_uri, color):
+        return ""
+
+    def get_rendition_widths(model, field_name):
+        return []
+
+    def is_new_upload(field_file):
+        return bool(field_file) and not field_file._committed
+
+    def warm_on_commit(instance, field_name):
+        pass
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:40
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_carousels(apps, schema_editor):
+    """Merge carousels that were created more than once by concurrent first
+    renders, keeping the oldest of each identifier.
+    """
+    Carousel = apps.get_model("carousel", "Carousel")
+    Placement = apps.get_model("carousel", "Placement")
+
+    duplicate_identifiers = (
+        Carousel.objects.values("identifier")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+        .values_list("identifier", flat=True)
+    )
+    for identifier in list(duplicate_identifiers):
+        kept, *duplicates = Carousel.objects.filter(identifier=identifier).order_by(
+            "id"
+        )
+        Placement.objects.filter(carousel__in=duplicates).update(carousel=kept)
+        Carousel.objects.filter(id__in=[c.id for c in duplicates]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("carousel", "0001_initial")]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_carousels, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="carousel",
+            name="identifier",
+            field=models.CharField(
+                max_length=256, unique=True, verbose_name="identifier"
+            ),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 2.2.28 on 2026-10-18 21:40
+
+import base64
+import logging
+from io import BytesIO
+
+from django.db import migrations, models
+from PIL import Image, ImageOps
+
+# Longest side (in pixels) and JPEG quality of placeholder thumbnails
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 50
+
+
+def get_placeholder(image_file):
+    # Frozen copy of `dt_content.renditions.get_placeholder`
+    image = Image.open(image_file)
+    image.draft("RGB", (PLACEHOLDER_SIZE * 8, PLACEHOLDER_SIZE * 8))
+    if "A" in image.getbands() or "transparency" in image.info:
+        return "", ""
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.LANCZOS)
+
+    red, green, blue = image.resize((1, 1), Image.BOX).getpixel((0, 0))
+    imagefile = BytesIO()
+    image.save(imagefile, "JPEG", quality=PLACEHOLDER_QUALITY, optimize=True)
+    return (
+        "data:image/jpeg;base64,{}".format(
+            base64.b64encode(imagefile.getvalue()).decode("ascii")
+        ),
+        "#{:02x}{:02x}{:02x}".format(red, green, blue),
+    )
+
+
+def render_existing_placeholders(apps, schema_editor):
+    CarouselImage = apps.get_model("carousel", "Image")
+    rows = CarouselImage.objects.exclude(image="").only("image")
+    for image in rows.iterator():
+        try:
+            with image.image.open("rb") as image_file:
+                lqip, dominant_color = get_placeholder(image_file)
+        except OSError:
+            logging.warning(
+                "Could not generate a placeholder for {}".format(image.image)
+            )
+            continue
+        CarouselImage.objects.filter(pk=image.pk).update(
+            lqip=lqip, dominant_color=dominant_color
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("carousel", "0002_unique_identifier")]
+
+    operations = [
+        migrations.AddField(
+            model_name="image",
+            name="dominant_color",
+            field=models.CharField(
+                default="",
+                editable=False,
+                max_length=7,
+                verbose_name="dominant color",
+            ),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="lqip",
+            field=models.TextField(
+                default="", editable=False, verbose_name="placeholder"
+            ),
+        ),
+        migrations.RunPython(render_existing_placeholders, migrations.RunPython.noop),
+    ]
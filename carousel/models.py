@@ -1,12 +1,30 @@
 import os
 
 from django.db import models
+from django.db.models import prefetch_related_objects
 from django.template.loader import render_to_string
 from django.utils.safestring import mark_safe
 from django.utils.translation import ugettext_lazy as _
 
 from versatileimagefield.fields import PPOIField, VersatileImageField
 
+from .content import (
+    get_field_placeholder,
+    get_index_generation,
+    get_indexed_specs,
+    get_or_render,
+    get_placeholder_style,
+    get_rendition_widths,
+    get_srcset,
+    is_new_upload,
+    make_fragment_key,
+    warm_on_commit,
+)
+
+# Generation namespace of the rendered carousels (see `dt_content.fragments`,
+# when installed)
+FRAGMENT_NAMESPACE = "carousel"
+
 
 class Image(models.Model):
     date_created = models.DateTimeField(_("date created"), auto_now_add=True)
@@ -21,13 +39,36 @@ class Image(models.Model):
     height = models.PositiveIntegerField(_("image height"), blank=True, null=True)
     width = models.PositiveIntegerField(_("image width"), blank=True, null=True)
     ppoi = PPOIField(_("image PPOI"))
+    # Low-quality placeholder of `image`, set when it is uploaded
+    lqip = models.TextField(_("placeholder"), default="", editable=False)
+    dominant_color = models.CharField(
+        _("dominant color"), max_length=7, default="", editable=False
+    )
 
     def save(self, *args, **kwargs):
+        uploaded = is_new_upload(self.image)
+        if uploaded:
+            # Store the upload first (as saving would), so that it can be read
+            self._meta.get_field("image").pre_save(self, self._state.adding)
+            self.lqip, self.dominant_color = get_field_placeholder(self.image)
         super().save(*args, **kwargs)
+        if uploaded:
+            warm_on_commit(self, "image")
 
     def url(self):
         return self.image.url
 
+    def placeholder_style(self):
+        """Inline CSS that shows the low-quality placeholder until the image loads."""
+        return get_placeholder_style(self.lqip, self.dominant_color)
+
+    def srcset(self):
+        """Renditions of the image (generated in the background once uploaded,
+        see `dt_content.warming`) that exist according to the rendition index.
+        """
+        widths = get_rendition_widths(Image, "image")
+        return get_srcset(self.image, self.width, self.height, widths)
+
     def __str__(self):
         if self.title:
             return self.title
@@ -35,9 +76,26 @@ class Image(models.Model):
             return os.path.basename(self.image.name)
 
 
+def get_slides_prefetch():
+    return models.Prefetch(
+        "placements",
+        queryset=Placement.objects.select_related("image").order_by("pk"),
+    )
+
+
+class CarouselQuerySet(models.QuerySet):
+    def prefetch_slides(self):
+        """Prefetch the placements of the carousels in order, with their images
+        (in one query for all carousels).
+        """
+        return self.prefetch_related(get_slides_prefetch())
+
+
 class Carousel(models.Model):
     date_created = models.DateTimeField(_("date created"), auto_now_add=True)
-    identifier = models.CharField(_("identifier"), max_length=256)
+    identifier = models.CharField(_("identifier"), max_length=256, unique=True)
+
+    objects = CarouselQuerySet.as_manager()
 
     @staticmethod
     def get(identifier):
@@ -45,18 +103,32 @@ class Carousel(models.Model):
         return Carousel.objects.get_or_create(identifier=identifier)
 
     def empty(self):
-        return not self.placements.exists()
+        # Carousels are saved after the first render of the carousel tag
+        return self.pk is None or not self.placements.exists()
 
     def visible(self):
         return not self.empty()
 
     def to_html(self):
-        if not self.empty():
-            context = {"carousel": self}
-            rendered = render_to_string("carousel/carousel.html", context=context)
-            return mark_safe(rendered)
-        else:
+        """Rendered carousel, cached until any placement or image changes (or new
+        renditions of images are generated).
+        """
+        if self.pk is None:
             return mark_safe("")
+        key = make_fragment_key("carousel", self.pk, get_index_generation())
+        return mark_safe(get_or_render(key, FRAGMENT_NAMESPACE, self.render_html))
+
+    def render_html(self):
+        if "placements" not in getattr(self, "_prefetched_objects_cache", {}):
+            prefetch_related_objects([self], get_slides_prefetch())
+        if self.empty():
+            return ""
+        # Look up the renditions of all images at once
+        get_indexed_specs(
+            placement.image.image.name for placement in self.placements.all()
+        )
+        context = {"carousel": self}
+        return render_to_string("carousel/carousel.html", context=context)
 
     def __str__(self):
         return self.identifier
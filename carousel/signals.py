@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .content import bump_generation_on_commit
+from .models import FRAGMENT_NAMESPACE, Image, Placement
+
+
+@receiver(post_save, sender=Placement)
+@receiver(post_delete, sender=Placement)
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+def carousel_changed(sender, **kwargs):
+    # An image may be in any number of carousels
+    bump_generation_on_commit(FRAGMENT_NAMESPACE)
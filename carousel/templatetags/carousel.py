@@ -6,20 +6,52 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.template.loader import render_to_string
 from django.utils.safestring import mark_safe
 
+from ..content import DT_CONTENT_INSTALLED
 from ..models import Carousel
 
 register = template.Library()
 
+if DT_CONTENT_INSTALLED:
+    from dt_content import registration
+    from dt_content.manifest import get_static_content, static_content_tag
 
-@register.simple_tag(takes_context=True)
-def carousel(context, identifier):
-    try:
-        carousel = Carousel.objects.all().get(identifier=identifier)
-    except ObjectDoesNotExist:
-        carousel = Carousel.objects.create(identifier=identifier)
-        logging.info(
-            "Carousel {} automatically created while loading {}".format(
-                identifier, context.request.get_full_path()
+    def get_carousels(identifiers):
+        return {
+            carousel.identifier: carousel
+            for carousel in Carousel.objects.filter(identifier__in=identifiers)
+        }
+
+    @static_content_tag(register, "carousel", get_carousels)
+    def carousel(context, identifier):
+        def register_carousel():
+            logging.info(
+                "Carousel {} automatically registered while loading {}".format(
+                    identifier, context.request.get_full_path()
+                )
             )
+            carousel = Carousel(identifier=identifier)
+            registration.register(carousel, "identifier")
+            return carousel
+
+        return get_static_content(
+            context,
+            "carousel",
+            identifier,
+            lambda: Carousel.objects.all().get(identifier=identifier),
+            register_carousel,
         )
-    return carousel
+
+else:
+
+    @register.simple_tag(takes_context=True)
+    def carousel(context, identifier):
+        try:
+            carousel = Carousel.objects.all().get(identifier=identifier)
+        except ObjectDoesNotExist:
+            carousel = Carousel.objects.create(identifier=identifier)
+            logging.info(
+                "Carousel {} automatically created while loading {}".format(
+                    identifier, context.request.get_full_path()
+                )
+            )
+        return carousel
@@ -1,3 +1,76 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase, override_settings
+from PIL import Image as PILImage
+
+from .content import DT_CONTENT_INSTALLED
+from .models import Carousel, Image, Placement
+
+
+@mock.patch("carousel.models.warm_on_commit")
+class CarouselTests(TransactionTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        # Cached values outlive the flushed databases of other tests
+        for cache in caches.all():
+            cache.clear()
+
+    def make_image(self, title):
+        data = BytesIO()
+        PILImage.new("RGB", (64, 32), "teal").save(data, "PNG")
+        image = SimpleUploadedFile(
+            "{}.png".format(title), data.getvalue(), content_type="image/png"
+        )
+        return Image.objects.create(title=title, image=image)
+
+    def test_prefetch_slides(self, warm_on_commit):
+        for identifier in ["home", "about"]:
+            carousel = Carousel.objects.create(identifier=identifier)
+            for title in ["One", "Two"]:
+                Placement.objects.create(
+                    carousel=carousel, image=self.make_image(title)
+                )
+        with self.assertNumQueries(2):
+            carousels = list(Carousel.objects.prefetch_slides().order_by("pk"))
+            self.assertEqual(
+                [
+                    [placement.image.title for placement in carousel.placements.all()]
+                    for carousel in carousels
+                ],
+                [["One", "Two"], ["One", "Two"]],
+            )
+
+    @skipUnless(DT_CONTENT_INSTALLED, "Rendered carousels are cached by dt_content")
+    def test_cached_until_changed(self, warm_on_commit):
+        carousel = Carousel.objects.create(identifier="home")
+        Placement.objects.create(carousel=carousel, image=self.make_image("One"))
+        self.assertIn('alt="One"', carousel.to_html())
+
+        carousel = Carousel.objects.get(pk=carousel.pk)
+        with self.assertNumQueries(0):
+            self.assertIn('alt="One"', carousel.to_html())
+
+        Placement.objects.create(carousel=carousel, image=self.make_image("Two"))
+        self.assertIn('alt="Two"', carousel.to_html())
+
+    @skipUnless(DT_CONTENT_INSTALLED, "Placeholders are generated by dt_content")
+    def test_placeholder(self, warm_on_commit):
+        image = self.make_image("One")
+        self.assertTrue(image.lqip.startswith("data:image/jpeg;base64,"))
+        self.assertEqual(image.dominant_color, "#008080")
+        warm_on_commit.assert_called_once_with(image, "image")
+
+        # Only computed for new uploads
+        with mock.patch("carousel.models.get_field_placeholder") as placeholder:
+            image.title = "Two"
+            image.save()
+        placeholder.assert_not_called()
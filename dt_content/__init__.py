@@ -0,0 +1 @@
+default_app_config = "dt_content.apps.DtContentConfig"
@@ -4,7 +4,6 @@ from django.utils.html import strip_tags
 
 from .models import *
 
-
 admin.site.register(Menu)
 admin.site.register(ContentSection)
 admin.site.register(ContentBlock)
@@ -61,7 +60,12 @@ class BlurbAdmin(admin.ModelAdmin):
     def filled(self, blurb):
         return blurb.content is not None
 
+    def get_queryset(self, request):
+        # The change list shows the excerpt instead of the rendered content
+        return super().get_queryset(request).defer("rendered_content")
+
     def preview(self, blurb):
-        return strip_tags(blurb.content)
+        # Plain text excerpt rendered on save
+        return blurb.excerpt
 
     filled.boolean = True
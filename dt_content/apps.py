@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class DtContentConfig(AppConfig):
     name = 'dt_content'
+
+    def ready(self):
+        from . import signals  # noqa: F401
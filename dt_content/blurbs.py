@@ -0,0 +1,64 @@
+"""Per-process LRU caches of Blurbs and ImageBlurbs by identifier.
+
+Blurbs are the most rendered objects, and are rarely changed. Each process keeps
+the field values of recently used blurbs (and the identifiers that have no blurb,
+so that unknown identifiers cost no queries either). Saving or deleting any blurb
+invalidates the cache of every process (see `dt_content.signals`).
+
+Lookups return new instances, so callers may modify them.
+"""
+from django.db import router
+
+from . import settings
+from .cache import GenerationCache
+from .models import Blurb, ImageBlurb
+
+
+class IdentifierCache:
+    def __init__(self, model, maxsize):
+        self.model = model
+        self.attnames = [field.attname for field in model._meta.concrete_fields]
+        self._cache = GenerationCache(model._meta.label_lower, maxsize)
+
+    def _fetch_rows(self, identifiers):
+        identifier_index = self.attnames.index("identifier")
+        rows = (
+            self.model._base_manager.using(router.db_for_read(self.model))
+            .filter(identifier__in=identifiers)
+            .values_list(*self.attnames)
+        )
+        rows_by_identifier = {row[identifier_index]: row for row in rows}
+        # None for missing identifiers (negative caching)
+        return {
+            identifier: rows_by_identifier.get(identifier) for identifier in identifiers
+        }
+
+    def get_many(self, identifiers):
+        """Existing objects for `identifiers` (in one query for uncached ones), as
+        a dict by identifier.
+        """
+        using = router.db_for_read(self.model)
+        rows = self._cache.get_many_or_set(list(identifiers), self._fetch_rows)
+        return {
+            identifier: self.model.from_db(using, self.attnames, row)
+            for identifier, row in rows.items()
+            if row is not None
+        }
+
+    def get(self, identifier):
+        try:
+            return self.get_many([identifier])[identifier]
+        except KeyError:
+            raise self.model.DoesNotExist(
+                "{} matching identifier {} does not exist".format(
+                    self.model._meta.object_name, identifier
+                )
+            )
+
+    def invalidate(self):
+        """Invalidate the cache in all processes (after the current transaction)."""
+        self._cache.invalidate()
+
+
+blurb_cache = IdentifierCache(Blurb, settings.BLURB_CACHE_SIZE)
+image_blurb_cache = IdentifierCache(ImageBlurb, settings.BLURB_CACHE_SIZE)
@@ -0,0 +1,113 @@
+"""Per-process caches with cross-process invalidation.
+
+Values derived from the database (e.g., the navigation tree) are kept in the
+memory of each worker process. Each dataset is tagged with a *generation*, an
+integer kept in the shared cache (`settings.DT_CONTENT_CACHE_ALIAS`). Writers
+bump the generation and every worker drops its local copy on the next access,
+which costs a single cache get.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.db import transaction
+
+from . import settings
+
+GENERATION_KEY_PREFIX = "dt_content:generation:"
+
+
+def get_shared_cache():
+    return caches[settings.CACHE_ALIAS]
+
+
+def _seed():
+    # Seeded from the clock so that a flushed or evicted counter never hands out
+    # a generation that a worker may still hold.
+    return int(time.time() * 1000)
+
+
+def get_generation(namespace: str) -> int:
+    cache = get_shared_cache()
+    key = GENERATION_KEY_PREFIX + namespace
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _seed(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(namespace: str) -> int:
+    cache = get_shared_cache()
+    key = GENERATION_KEY_PREFIX + namespace
+    try:
+        return cache.incr(key)
+    except ValueError:  # missing key
+        cache.add(key, _seed(), timeout=None)
+        return cache.get(key)
+
+
+def bump_generation_on_commit(namespace: str):
+    """Bump the generation once the current transaction commits.
+
+    Bumping before the commit would let another worker cache the
+    pre-commit data under the new generation.
+    """
+    transaction.on_commit(lambda: bump_generation(namespace))
+
+
+class GenerationCache:
+    """Process-local key-value cache that is cleared whenever the generation of
+    `namespace` changes. If `maxsize` is set, the least recently used keys are
+    evicted beyond `maxsize` keys.
+    """
+
+    def __init__(self, namespace: str, maxsize: int = None):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self._generation = None
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key, default):
+        """Return the value for `key`, computing it with the callable `default`
+        if it is not cached for the current generation.
+        """
+        return self.get_many_or_set([key], lambda keys: {key: default()})[key]
+
+    def get_many_or_set(self, keys, default_many):
+        """Return a dict of the values for `keys`. The values of all keys that are
+        not cached for the current generation are computed at once with
+        `default_many(missing_keys)`, which should return a dict with every key.
+        """
+        generation = get_generation(self.namespace)
+        values = dict()
+        missing_keys = list()
+        with self._lock:
+            if generation != self._generation:
+                self._values = OrderedDict()
+                self._generation = generation
+            for key in keys:
+                try:
+                    values[key] = self._values[key]
+                    self._values.move_to_end(key)
+                except KeyError:
+                    missing_keys.append(key)
+        if not missing_keys:
+            return values
+
+        computed = default_many(missing_keys)
+        values.update(computed)
+        with self._lock:
+            if generation == self._generation:
+                self._values.update(computed)
+                if self.maxsize is not None:
+                    while len(self._values) > self.maxsize:
+                        self._values.popitem(last=False)
+        return values
+
+    def invalidate(self):
+        """Invalidate this cache in all processes (after the current transaction)."""
+        bump_generation_on_commit(self.namespace)
@@ -0,0 +1,88 @@
+"""Denormalized row counts of the console dashboard.
+
+Counting rows is a full scan of a table (or of an index) on each load of the
+dashboard. The counts are instead kept in the `Counter` table: creating or
+deleting a counted object adjusts its counter with a single UPDATE, in the same
+transaction (see `dt_content.signals`). Bulk registrations (see
+`dt_content.registration`) cannot tell how many rows they inserted, so they drop
+the counters of the model instead, which are counted again on the next read.
+
+Whether an object is counted (e.g., a static section) is decided by the fields
+in `COUNTERS`, which are set when objects are created. Writes that bypass signals
+(e.g., `QuerySet.update` or raw SQL) are not counted until `manage.py
+recount_counters` is run.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import Blurb, ContentBlock, ContentSection, Counter, ImageBlurb
+
+# Counter name -> (model, lookup of the counted objects)
+COUNTERS = {
+    "static_section_count": (ContentSection, dict(menu=None)),
+    "static_block_count": (ContentBlock, dict(section=None)),
+    "blurb_count": (Blurb, dict()),
+    "image_blurb_count": (ImageBlurb, dict()),
+}
+
+
+def _is_counted(instance, model, lookup):
+    if not isinstance(instance, model):
+        return False
+    return all(
+        getattr(instance, model._meta.get_field(field).attname) == value
+        for field, value in lookup.items()
+    )
+
+
+def count(name):
+    """Count the objects of counter `name` and store the count."""
+    model, lookup = COUNTERS[name]
+    value = model._base_manager.filter(**lookup).count()
+    Counter.objects.update_or_create(name=name, defaults=dict(value=value))
+    return value
+
+
+def get_counts():
+    """Values of all counters by name, in one query (and a count for each
+    counter that is unknown).
+    """
+    counts = dict(
+        Counter.objects.filter(name__in=COUNTERS).values_list("name", "value")
+    )
+    for name in COUNTERS:
+        if name not in counts:
+            counts[name] = count(name)
+    return counts
+
+
+def object_added(instance):
+    """Adjust the counters of a created object."""
+    for name, (model, lookup) in COUNTERS.items():
+        if _is_counted(instance, model, lookup):
+            Counter.objects.filter(name=name).update(value=F("value") + 1)
+
+
+def object_deleted(sender, instance):
+    """Adjust the counters of a deleted object. `post_delete` is sent for each
+    model of a multi-table inheritance chain (e.g., RichTextBlock and
+    ContentBlock), so only the signal of the counted model (`sender`) counts.
+    A counter that drifted (see above) is clamped at 0 rather than breaking the
+    delete on its CHECK constraint.
+    """
+    for name, (model, lookup) in COUNTERS.items():
+        if sender is model and _is_counted(instance, model, lookup):
+            Counter.objects.filter(name=name).update(value=Greatest(F("value") - 1, 0))
+
+
+def reset_counters(model):
+    """Drop the counters of `model` (and of its subclasses), which are then
+    counted again on the next read.
+    """
+    names = [
+        name for name, (counted, _) in COUNTERS.items() if issubclass(model, counted)
+    ]
+    # After the pending changes are committed, so that they are counted
+    transaction.on_commit(lambda: Counter.objects.filter(name__in=names).delete())
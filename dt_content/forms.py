@@ -3,6 +3,7 @@ from django_summernote.widgets import SummernoteInplaceWidget
 
 from .fields import SummernoteFormField
 from .models import *
+from .transfer import BLURB_FORMATS
 
 
 class MenuForm(forms.ModelForm):
@@ -58,3 +59,8 @@ class ImageBlurbForm(forms.ModelForm):
     class Meta:
         model = ImageBlurb
         fields = ["image"]
+
+
+class BlurbImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV (with a header row) or JSON Lines")
+    format = forms.ChoiceField(choices=[(format, format) for format in BLURB_FORMATS])
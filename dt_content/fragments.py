@@ -0,0 +1,53 @@
+"""Rendered template fragments kept in the shared cache.
+
+Fragments are versioned by the generation of a namespace (see `.cache`), so
+bumping the generation invalidates every fragment rendered from that data.
+Fragments of a single object (e.g., a content section) are instead deleted when
+the object changes, so that a cached fragment costs one cache get.
+"""
+
+import hashlib
+
+from django.db import transaction
+
+from . import settings
+from .cache import get_generation, get_shared_cache
+
+
+def make_fragment_key(name, *parts):
+    digest = hashlib.md5(":".join(str(part) for part in parts).encode()).hexdigest()
+    return "dt_content:fragment:{}:{}".format(name, digest)
+
+
+def get_or_render(key, namespace, render, timeout=None):
+    """Return the cached fragment for `key`, or cache the output of `render()`.
+
+    :param namespace: generation namespace of the fragment, or None for
+        fragments that are invalidated with `delete_fragment_on_commit`
+    """
+    cache = get_shared_cache()
+    version = get_generation(namespace) if namespace else None
+    html = cache.get(key, version=version)
+    if html is None:
+        html = render()
+        if timeout is None:
+            timeout = settings.FRAGMENT_CACHE_TIMEOUT
+        cache.set(key, html, timeout, version=version)
+    return html
+
+
+def delete_fragment_on_commit(key):
+    # Deleting before the commit would let another worker cache the pre-commit
+    # data again
+    transaction.on_commit(lambda: get_shared_cache().delete(key))
+
+
+def make_section_fragment_key(section_id):
+    return make_fragment_key("content_section", section_id)
+
+
+def invalidate_section_fragment(section_id):
+    """Drop the rendered blocks of a content section (see the
+    `content_section_fragment` template tag).
+    """
+    delete_fragment_on_commit(make_section_fragment_key(section_id))
@@ -0,0 +1,208 @@
+"""Save-time rendering of rich text (Summernote) HTML.
+
+`render_rich_text` parses the HTML once and returns the sanitized, minified HTML
+that templates output as is, along with a plain-text excerpt (e.g., for admin
+change lists).
+
+- Tags and attributes outside of the allowlists below are dropped (the content
+  of unknown tags is kept, except for `DROPPED_TAGS`). Media (`<picture>`,
+  `<video>`, `<audio>`) and sectioning tags are kept, but not forms, inputs or
+  event handler attributes.
+- Links and sources may only use safe URL schemes
+- Runs of whitespace are collapsed (except in `<pre>`)
+- Images and iframes are lazy-loaded
+- Uploaded images (under MEDIA_URL) point to size-bounded renditions, with
+  `srcset`, `sizes` and their intrinsic `width` and `height` (see
+  `dt_content.renditions`). The renditions are generated as needed.
+"""
+from collections import namedtuple
+from html import escape
+from html.parser import HTMLParser
+
+from . import settings
+from .renditions import get_responsive_image_for_url
+
+EXCERPT_LENGTH = 200
+
+ALLOWED_TAGS = set(
+    "a abbr article aside audio b blockquote br button caption code col colgroup "
+    "dd del details div dl dt em figcaption figure font footer h1 h2 h3 h4 h5 h6 "
+    "header hr i iframe img ins li main mark nav ol p picture pre q s section small "
+    "source span strike strong sub summary sup table tbody td tfoot th thead tr "
+    "track u ul video".split()
+)
+VOID_TAGS = {"br", "col", "hr", "img", "source", "track"}
+# Tags that are dropped along with their content
+DROPPED_TAGS = {"head", "noscript", "script", "style", "template", "title"}
+# Tags that separate words in the excerpt
+BLOCK_TAGS = set(
+    "article aside blockquote br caption dd details div dl dt figcaption figure "
+    "footer h1 h2 h3 h4 h5 h6 header hr li main nav ol p pre section summary table "
+    "td th tr ul".split()
+)
+LAZY_TAGS = {"iframe", "img"}
+
+GLOBAL_ATTRIBUTES = {"align", "class", "dir", "id", "lang", "style", "title"}
+TAG_ATTRIBUTES = {
+    "a": {"href", "name", "rel", "target"},
+    "audio": {"controls", "loop", "muted", "preload", "src"},
+    "button": {"disabled", "type"},
+    "col": {"span", "width"},
+    "details": {"open"},
+    "font": {"color", "face", "size"},
+    "iframe": {"allow", "allowfullscreen", "frameborder", "height", "src", "width"},
+    "img": set("alt data-filename height loading sizes src srcset width".split()),
+    "ol": {"start", "type"},
+    "source": {"height", "media", "sizes", "src", "srcset", "type", "width"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan", "scope"},
+    "track": {"default", "kind", "label", "src", "srclang"},
+    "video": set(
+        "autoplay controls height loop muted playsinline poster preload src "
+        "width".split()
+    ),
+}
+URL_ATTRIBUTES = {"href", "poster", "src"}
+SAFE_URL_SCHEMES = {"http", "https", "mailto", "tel"}
+
+RenderedHtml = namedtuple("RenderedHtml", ["html", "excerpt"])
+
+
+def _is_safe_url(tag, url):
+    url = "".join(url.split()).lower()  # browsers ignore whitespace in schemes
+    scheme, colon, _ = url.partition(":")
+    if not colon or "/" in scheme or "?" in scheme or "#" in scheme:
+        return True  # relative url
+    if tag == "img" and url.startswith("data:image/"):
+        return True  # images pasted into Summernote
+    return scheme in SAFE_URL_SCHEMES
+
+
+def _is_safe_style(style):
+    style = "".join(style.split()).lower()
+    return "expression(" not in style and "javascript:" not in style
+
+
+def _add_responsive_attrs(attrs):
+    image = get_responsive_image_for_url(attrs.get("src"))
+    if image is None:
+        return
+    attrs["src"] = image.src
+    attrs["srcset"] = image.srcset
+    attrs.setdefault("sizes", settings.RESPONSIVE_IMAGE_SIZES)
+    # Keep the dimensions set in the editor
+    if "width" not in attrs and "height" not in attrs:
+        attrs["width"] = str(image.width)
+        attrs["height"] = str(image.height)
+
+
+class _RichTextRenderer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = list()
+        self.text = list()
+        self.open_tags = list()
+        self.dropping = 0  # depth of DROPPED_TAGS
+        self.preformatted = 0  # depth of <pre>
+
+    def _clean_attrs(self, tag, attrs):
+        allowed = TAG_ATTRIBUTES.get(tag, set())
+        cleaned = dict()
+        for name, value in attrs:
+            if name not in GLOBAL_ATTRIBUTES and name not in allowed:
+                continue
+            if value is None:
+                value = ""
+            if name in URL_ATTRIBUTES and not _is_safe_url(tag, value):
+                continue
+            if name == "style" and not _is_safe_style(value):
+                continue
+            cleaned[name] = value
+        if tag == "img":
+            _add_responsive_attrs(cleaned)
+        if tag in LAZY_TAGS:
+            cleaned.setdefault("loading", "lazy")
+        if tag == "a" and cleaned.get("target") == "_blank":
+            cleaned.setdefault("rel", "noopener")
+        return cleaned
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(" ")
+        if tag not in ALLOWED_TAGS:
+            return
+
+        attrs = "".join(
+            ' {}="{}"'.format(name, escape(value))
+            for name, value in self._clean_attrs(tag, attrs).items()
+        )
+        self.html.append("<{}{}>".format(tag, attrs))
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+            if tag == "pre":
+                self.preformatted += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(" ")
+        if tag not in self.open_tags:
+            return  # stray end tag
+        # Close the tags left open inside `tag`
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.html.append("</{}>".format(open_tag))
+            if open_tag == "pre":
+                self.preformatted -= 1
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        self.text.append(data)
+        if not self.preformatted:
+            # Keep a single space at the edges, which may separate words from
+            # those of neighboring inline tags
+            collapsed = " ".join(data.split())
+            if not collapsed:
+                collapsed = " "
+            else:
+                if data[0].isspace():
+                    collapsed = " " + collapsed
+                if data[-1].isspace():
+                    collapsed = collapsed + " "
+            data = collapsed
+        self.html.append(escape(data, quote=False))
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.html.append("</{}>".format(self.open_tags.pop()))
+
+
+def render_rich_text(html):
+    """Return the `RenderedHtml` of Summernote `html` (which may be None)."""
+    if not html:
+        return RenderedHtml("", "")
+    renderer = _RichTextRenderer()
+    renderer.feed(html)
+    renderer.close()
+    excerpt = " ".join("".join(renderer.text).split())
+    if len(excerpt) > EXCERPT_LENGTH:
+        excerpt = excerpt[: EXCERPT_LENGTH - 1].rstrip() + "\u2026"
+    return RenderedHtml("".join(renderer.html).strip(), excerpt)
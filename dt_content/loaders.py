@@ -0,0 +1,125 @@
+"""Batch loading of ContentBlocks as instances of their concrete subclasses.
+
+`InheritanceManager.select_subclasses()` LEFT JOINs the table of every
+ContentBlock subclass, so the query grows with each registered block type.
+`load_blocks` instead fetches the base rows once, then fetches the subclass
+columns of each block type that is actually present (one query per type, using
+`ContentBlock.type_key`), without joins.
+"""
+
+from django.db import router
+
+from . import models
+
+# Stay well below SQLite's limit on the number of query parameters
+IN_BATCH_SIZE = 500
+
+
+def _batches(values, size=IN_BATCH_SIZE):
+    for i in range(0, len(values), size):
+        yield values[i : i + size]
+
+
+def load_blocks(queryset, defer=()):
+    """Evaluate `queryset` (of ContentBlock) and return its blocks, in order, as
+    instances of their concrete subclasses.
+
+    Blocks of unknown types (e.g., whose class has been removed) are returned as
+    plain ContentBlocks.
+
+    :param defer: names of subclass fields not to load (as `QuerySet.defer`).
+        Subclasses without other fields are loaded without a query.
+    """
+    ContentBlock = models.ContentBlock
+    base_attnames = [field.attname for field in ContentBlock._meta.concrete_fields]
+    pk_index = base_attnames.index(ContentBlock._meta.pk.attname)
+    type_key_index = base_attnames.index("type_key")
+    using = queryset.db
+
+    rows = list(queryset.values_list(*base_attnames))
+
+    rows_by_type = dict()
+    for row in rows:
+        rows_by_type.setdefault(row[type_key_index], list()).append(row)
+
+    blocks_by_pk = dict()
+    for type_key, type_rows in rows_by_type.items():
+        block_class = models.content_block_classes.get(type_key, ContentBlock)
+        if block_class is ContentBlock:
+            for row in type_rows:
+                blocks_by_pk[row[pk_index]] = ContentBlock.from_db(
+                    using, base_attnames, row
+                )
+            continue
+
+        # Only the columns of the subclass table (no join with ContentBlock)
+        local_fields = [
+            field
+            for field in block_class._meta.local_concrete_fields
+            if field.name not in defer
+        ]
+        local_attnames = [field.attname for field in local_fields]
+        pk_attname = block_class._meta.pk.attname
+        local_values = dict()
+        pks = [row[pk_index] for row in type_rows]
+        if local_attnames == [pk_attname]:
+            # Only the parent link, whose value is the pk of the base row (the
+            # subclass rows are assumed to exist)
+            local_values = {pk: {pk_attname: pk} for pk in pks}
+            pks = []
+        for batch in _batches(pks):
+            subclass_rows = (
+                block_class._base_manager.using(using)
+                .filter(pk__in=batch)
+                .order_by()  # the inherited ordering would join ContentBlock
+                .values_list(*local_attnames)
+            )
+            for subclass_row in subclass_rows:
+                values = dict(zip(local_attnames, subclass_row))
+                local_values[values[pk_attname]] = values
+
+        field_attnames = [
+            field.attname
+            for field in block_class._meta.concrete_fields
+            if field.attname in base_attnames or field.attname in local_attnames
+        ]
+        for row in type_rows:
+            values = dict(zip(base_attnames, row))
+            values.update(local_values.get(row[pk_index], {}))
+            if len(values) != len(field_attnames):
+                # Missing subclass row
+                block = ContentBlock.from_db(using, base_attnames, row)
+            else:
+                block = block_class.from_db(
+                    using, field_attnames, [values[name] for name in field_attnames]
+                )
+            blocks_by_pk[row[pk_index]] = block
+
+    return [blocks_by_pk[row[pk_index]] for row in rows]
+
+
+def group_blocks_by_section(blocks):
+    blocks_by_section = dict()
+    for block in blocks:
+        blocks_by_section.setdefault(block.section_id, list()).append(block)
+    return blocks_by_section
+
+
+def prefetch_blocks(sections):
+    """Load the blocks of all `sections` (in two or more queries in total) into
+    their `ContentSection.blocks` memo.
+    """
+    sections = [section for section in sections if section.pk is not None]
+    if not sections:
+        return
+    using = router.db_for_read(models.ContentBlock)
+    blocks = list()
+    for batch in _batches([section.pk for section in sections]):
+        blocks.extend(
+            load_blocks(
+                models.ContentBlock.objects.using(using).filter(section_id__in=batch)
+            )
+        )
+    blocks_by_section = group_blocks_by_section(blocks)
+    for section in sections:
+        section._block_list = models.BlockList(blocks_by_section.get(section.pk, []))
@@ -0,0 +1,145 @@
+import gc
+import statistics
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_databases,
+    teardown_databases,
+)
+
+from ... import models as content_models
+from ...loaders import load_blocks
+from ...models import ContentBlock, ContentSection
+
+
+def _define_block_classes(count, offset):
+    """Define `count` throwaway ContentBlock subclasses (unmanaged by migrations)."""
+    block_classes = list()
+    for i in range(offset, offset + count):
+        name = "BenchmarkBlock{}".format(i)
+        block_classes.append(
+            type(
+                name,
+                (ContentBlock,),
+                dict(
+                    __module__=__name__,
+                    Meta=type("Meta", (), dict(app_label="dt_content")),
+                    base=models.OneToOneField(
+                        ContentBlock,
+                        on_delete=models.CASCADE,
+                        parent_link=True,
+                        primary_key=True,
+                    ),
+                    text=models.TextField(default=""),
+                ),
+            )
+        )
+    return block_classes
+
+
+def _unregister_block_classes(block_classes):
+    """Drop the references to the classes defined by `_define_block_classes`
+    (from the app registry and ContentBlock), so that they are collected.
+    """
+    app_models = apps.all_models["dt_content"]
+    for block_class in block_classes:
+        del app_models[block_class._meta.model_name]
+        accessor = block_class._meta.get_field("base").remote_field.get_accessor_name()
+        delattr(ContentBlock, accessor)
+        content_models.content_block_classes.pop(block_class.block_type_key, None)
+    apps.clear_cache()
+    block_classes.clear()
+
+
+def _time(function, repeat):
+    timings = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare loading the blocks of a section with select_subclasses() and "
+        "with dt_content.loaders.load_blocks as the number of block types grows. "
+        "Runs against a test database, created and destroyed by the command."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--types",
+            type=int,
+            nargs="+",
+            default=[2, 4, 8, 16, 32],
+            help="Numbers of extra block types to register",
+        )
+        parser.add_argument(
+            "--present", type=int, default=2, help="Block types used by the section"
+        )
+        parser.add_argument(
+            "--blocks", type=int, default=50, help="Blocks in the section"
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        if options["present"] > min(options["types"]):
+            raise CommandError("--present must not exceed the smallest --types")
+
+        defined = list()
+        old_config = setup_databases(self.verbosity, interactive=False)
+        try:
+            self.run_benchmark(defined, options)
+        finally:
+            _unregister_block_classes(defined)
+            # `__subclasses__` only holds weak references
+            gc.collect()
+            content_models.update_content_block_subclasses()
+            teardown_databases(old_config, self.verbosity)
+            # Closing in-memory (SQLite) test databases is a no-op until their
+            # name is restored
+            connection.close()
+
+    def run_benchmark(self, defined, options):
+        section = ContentSection.objects.create(key="benchmark-block-loading")
+        self.stdout.write(
+            "{:>6} {:>20} {:>20}  (median time/queries/joins)".format(
+                "types", "select_subclasses", "load_blocks"
+            )
+        )
+        for type_count in sorted(options["types"]):
+            new_classes = _define_block_classes(type_count - len(defined), len(defined))
+            with connection.schema_editor() as schema_editor:
+                for block_class in new_classes:
+                    schema_editor.create_model(block_class)
+            defined.extend(new_classes)
+            content_models.update_content_block_subclasses()
+
+            if type_count == len(new_classes):
+                present = defined[: options["present"]]
+                for i in range(options["blocks"]):
+                    present[i % len(present)].objects.create(
+                        section=section, text="Block {}".format(i)
+                    )
+
+            results = list()
+            for load in [
+                lambda: list(
+                    ContentBlock.objects.select_subclasses().filter(section=section)
+                ),
+                lambda: load_blocks(ContentBlock.objects.filter(section=section)),
+            ]:
+                with CaptureQueriesContext(connection) as queries:
+                    load()
+                joins = sum(q["sql"].count(" JOIN ") for q in queries)
+                seconds = _time(load, options["repeat"])
+                results.append(
+                    "{:.2f}ms/{}q/{}j".format(seconds * 1000, len(queries), joins)
+                )
+            self.stdout.write("{:>6} {:>20} {:>20}".format(type_count, *results))
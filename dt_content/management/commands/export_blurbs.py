@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from ...models import Blurb, ImageBlurb
+from ...transfer import BLURB_FORMATS, dump_blurbs
+
+MODELS = dict(blurb=Blurb, image_blurb=ImageBlurb)
+
+
+class Command(BaseCommand):
+    help = (
+        "Export all blurbs (or image blurb metadata) as CSV or JSON Lines, "
+        "streamed in chunks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=sorted(MODELS))
+        parser.add_argument(
+            "-o", "--output", help="Output file (defaults to standard output)"
+        )
+        parser.add_argument("--format", choices=BLURB_FORMATS, default="csv")
+
+    def handle(self, *args, **options):
+        lines = dump_blurbs(MODELS[options["model"]], options["format"])
+        if options["output"]:
+            with open(options["output"], "w", newline="") as f:
+                f.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
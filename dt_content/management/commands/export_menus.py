@@ -0,0 +1,23 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from ...transfer import dump_menu_tree
+
+
+class Command(BaseCommand):
+    help = "Export the menu tree (with the blocks of each menu) as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-o", "--output", help="Output file (defaults to standard output)"
+        )
+        parser.add_argument("--indent", type=int, default=2)
+
+    def handle(self, *args, **options):
+        data = json.dumps(dump_menu_tree(), indent=options["indent"])
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(data)
+        else:
+            self.stdout.write(data)
@@ -0,0 +1,42 @@
+import os
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from ...transfer import BLURB_FORMATS, load_blurbs, read_blurb_rows
+from .export_blurbs import MODELS
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update blurbs (or image blurb metadata) by identifier from a "
+        "CSV or JSON Lines file, in chunks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=sorted(MODELS))
+        parser.add_argument("input", help="File exported by `export_blurbs`")
+        parser.add_argument(
+            "--format",
+            choices=BLURB_FORMATS,
+            help="Input format (defaults to the extension of the file)",
+        )
+
+    def handle(self, *args, **options):
+        model = MODELS[options["model"]]
+        format = options["format"] or os.path.splitext(options["input"])[1][1:]
+        if format not in BLURB_FORMATS:
+            raise CommandError("Unknown format, use --format")
+
+        with open(options["input"], newline="") as f:
+            try:
+                created, updated = load_blurbs(model, read_blurb_rows(model, f, format))
+            except ValidationError as e:
+                raise CommandError("Invalid input:\n" + "\n".join(e.messages))
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Created {} and updated {} {}s".format(
+                    created, updated, model._meta.verbose_name
+                )
+            )
+        )
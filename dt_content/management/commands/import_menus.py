@@ -0,0 +1,41 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from ...transfer import load_menu_tree
+
+
+class Command(BaseCommand):
+    help = (
+        "Replace all menus (and their sections and blocks) with a menu tree "
+        "exported by `export_menus`"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="JSON file exported by `export_menus`")
+        parser.add_argument(
+            "--noinput",
+            "--no-input",
+            action="store_false",
+            dest="interactive",
+            help="Do not prompt for confirmation",
+        )
+
+    def handle(self, *args, **options):
+        with open(options["input"]) as f:
+            data = json.load(f)
+
+        if options["interactive"]:
+            confirm = input(
+                "This will delete all existing menus and their content. "
+                "Type 'yes' to continue: "
+            )
+            if confirm != "yes":
+                raise CommandError("Import cancelled.")
+
+        try:
+            count = load_menu_tree(data)
+        except ValidationError as e:
+            raise CommandError("Invalid menu tree:\n" + "\n".join(e.messages))
+        self.stdout.write(self.style.SUCCESS("Imported {} menus".format(count)))
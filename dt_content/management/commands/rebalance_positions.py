@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from ...models import ContentBlock, Menu
+from ...ordering import REBALANCE_THRESHOLD, rebalance_crowded_groups
+
+
+class Command(BaseCommand):
+    help = (
+        "Renumber the positions of menus and content blocks in groups that are "
+        "running out of gaps. Meant to be run periodically (e.g., via cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threshold",
+            type=int,
+            default=REBALANCE_THRESHOLD,
+            help="Rebalance groups where two neighbors are closer than this",
+        )
+
+    def handle(self, *args, **options):
+        for model in [Menu, ContentBlock]:
+            count = rebalance_crowded_groups(model, options["threshold"])
+            self.stdout.write(
+                "Rebalanced {} group(s) of {}".format(count, model._meta.verbose_name)
+            )
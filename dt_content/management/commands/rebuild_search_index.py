@@ -0,0 +1,38 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from ...search import SEARCH_TYPES, index_missing_objects, is_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Index all blurbs, rich text blocks, menus and static sections again for "
+        "the console search (e.g., after bulk writes that bypass signals)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Objects per insert"
+        )
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Only add the objects that are missing from the index",
+        )
+
+    def handle(self, *args, **options):
+        if not is_available(options["database"]):
+            raise CommandError(
+                "There is no search index in this database (SQLite with FTS5 "
+                "is required)"
+            )
+        if options["missing"]:
+            count = sum(
+                index_missing_objects(apps.get_model(label), options["database"])
+                for label, *_ in SEARCH_TYPES
+            )
+        else:
+            count = rebuild_index(options["database"], options["batch_size"])
+        self.stdout.write(self.style.SUCCESS("Indexed {} objects".format(count)))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from ...counters import COUNTERS, count
+
+
+class Command(BaseCommand):
+    help = (
+        "Count the objects of the console dashboard again (e.g., after bulk "
+        "writes that bypass signals), correcting the denormalized counts."
+    )
+
+    def handle(self, *args, **options):
+        for name in COUNTERS:
+            value = count(name)
+            if options["verbosity"] >= 2:
+                self.stdout.write("{}: {}".format(name, value))
+        self.stdout.write(
+            self.style.SUCCESS("Recounted {} counters".format(len(COUNTERS)))
+        )
@@ -0,0 +1,67 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from ...snapshot import KINDS, diff_snapshot, get_missing_media, restore_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Make all content match a snapshot exported by `snapshot_content`, "
+        "writing only what differs"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="JSON file exported by `snapshot_content`")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only list the changes that restoring would make",
+        )
+        parser.add_argument(
+            "--noinput",
+            "--no-input",
+            action="store_false",
+            dest="interactive",
+            help="Do not prompt for confirmation",
+        )
+
+    def write_changes(self, changes):
+        for kind in KINDS:
+            created, updated, deleted = changes[kind]
+            self.stdout.write(
+                "{}: {} created, {} updated, {} deleted".format(
+                    kind, len(created), len(updated), len(deleted)
+                )
+            )
+            if self.verbosity > 1:
+                for prefix, refs in (("+", created), ("~", updated), ("-", deleted)):
+                    for ref in refs:
+                        self.stdout.write("  {} {}".format(prefix, ref))
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        with open(options["input"]) as f:
+            data = json.load(f)
+
+        try:
+            changes = diff_snapshot(data)
+        except ValidationError as e:
+            raise CommandError("Invalid snapshot:\n" + "\n".join(e.messages))
+        for name in get_missing_media(data):
+            self.stderr.write("Missing media file: {}".format(name))
+        self.write_changes(changes)
+        if options["dry_run"] or not any(any(c) for c in changes.values()):
+            return
+
+        if options["interactive"]:
+            confirm = input("Type 'yes' to apply these changes: ")
+            if confirm != "yes":
+                raise CommandError("Restore cancelled.")
+
+        try:
+            restore_snapshot(data)
+        except ValidationError as e:
+            raise CommandError("Invalid snapshot:\n" + "\n".join(e.messages))
+        self.stdout.write(self.style.SUCCESS("Restored the snapshot"))
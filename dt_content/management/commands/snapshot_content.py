@@ -0,0 +1,26 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from ...snapshot import dump_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Export all content (menus, sections, blocks, blurbs and image blurbs) "
+        "as a JSON snapshot, for `restore_snapshot`"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-o", "--output", help="Output file (defaults to standard output)"
+        )
+
+    def handle(self, *args, **options):
+        # Sorted keys and one field per line, so that snapshots diff well
+        data = json.dumps(dump_snapshot(), indent=1, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(data + "\n")
+        else:
+            self.stdout.write(data)
@@ -0,0 +1,124 @@
+import os
+from itertools import islice, repeat
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...rendition_index import add_renditions
+from ...warming import (
+    create_executor,
+    get_field_label,
+    get_rendition_fields,
+    warm_image,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the missing renditions of existing images (declared by "
+        "DT_CONTENT_RENDITION_WIDTHS) in parallel, and record them in the "
+        "rendition index. Existing renditions are skipped, so an interrupted run "
+        "can simply be restarted (or resumed with --start-after)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "fields",
+            nargs="*",
+            metavar="app_label.Model.field",
+            help="Image fields to warm (default: all fields with declared renditions)",
+        )
+        parser.add_argument(
+            "--processes", type=int, help="Worker processes (default: CPU count)"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Images per progress report (and resume point)",
+        )
+        parser.add_argument(
+            "--start-after",
+            type=int,
+            default=0,
+            metavar="PK",
+            help="Skip the images of objects up to this primary key (requires a "
+            "single field)",
+        )
+
+    def handle(self, *args, **options):
+        rendition_fields = get_rendition_fields()
+        if options["fields"]:
+            labels = {
+                get_field_label(model, field_name)
+                for model, field_name, _ in rendition_fields
+            }
+            unknown = set(options["fields"]) - labels
+            if unknown:
+                raise CommandError(
+                    "No declared renditions for {}".format(", ".join(sorted(unknown)))
+                )
+            rendition_fields = [
+                (model, field_name, widths)
+                for model, field_name, widths in rendition_fields
+                if get_field_label(model, field_name) in options["fields"]
+            ]
+        if options["start_after"] and len(rendition_fields) != 1:
+            raise CommandError("--start-after requires a single field")
+
+        with create_executor(options["processes"] or os.cpu_count()) as executor:
+            for model, field_name, widths in rendition_fields:
+                self.warm_field(executor, model, field_name, widths, options)
+
+    def warm_field(self, executor, model, field_name, widths, options):
+        field_label = get_field_label(model, field_name)
+        rows = (
+            model._base_manager.exclude(**{field_name: ""})
+            .exclude(**{field_name: None})
+            .filter(pk__gt=options["start_after"])
+            .order_by("pk")
+            .values_list("pk", field_name)
+        )
+        total = rows.count()
+        done = 0
+        failed = list()
+        last_pk = options["start_after"]
+
+        rows = rows.iterator(chunk_size=options["batch_size"])
+        try:
+            for batch in iter(lambda: list(islice(rows, options["batch_size"])), []):
+                names = [name for _, name in batch]
+                results = executor.map(
+                    warm_image,
+                    repeat(model._meta.label),
+                    repeat(field_name),
+                    names,
+                    repeat(widths),
+                )
+                for name, generated in zip(names, results):
+                    if generated is None:
+                        failed.append(name)
+                    else:
+                        add_renditions(name, generated.source_mtime, generated.widths)
+                done += len(batch)
+                last_pk = batch[-1][0]
+                self.stdout.write(
+                    "{}: {}/{} images ({} failed), up to pk {}".format(
+                        field_label, done, total, len(failed), last_pk
+                    )
+                )
+        except KeyboardInterrupt:
+            raise CommandError(
+                "Interrupted. Resume with: warm_renditions {} --start-after {}".format(
+                    field_label, last_pk
+                )
+            )
+
+        for name in failed:
+            self.stderr.write("Could not generate renditions of {}".format(name))
+        self.stdout.write(
+            self.style.SUCCESS(
+                "{}: warmed {} of {} images".format(
+                    field_label, done - len(failed), total
+                )
+            )
+        )
@@ -0,0 +1,159 @@
+"""Compile-time manifest of the static content used by a template.
+
+Tags such as `{% blurb %}` look up an object by identifier, which costs a query
+per tag. Tags registered with `static_content_tag` instead record their literal
+identifiers in a manifest shared by all tags of the same template when the
+template is compiled. On the first lookup of a render, every identifier in the
+manifest is fetched at once, with one bulk query per kind of object (e.g., all
+blurbs of the template in one query).
+
+Tags whose identifier is not a literal (e.g., `{% blurb some_variable %}`) fall
+back to their own lookup.
+"""
+from collections import defaultdict
+from functools import wraps
+from inspect import getfullargspec
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.template.library import SimpleNode, parse_bits
+
+MANIFEST_PARSER_ATTRIBUTE = "_dt_content_manifest"
+CURRENT_MANIFEST_KEY = "dt_content_manifest"
+
+# kind -> callable that takes identifiers and returns {identifier: object}
+_bulk_loaders = dict()
+
+
+def register_bulk_loader(kind, bulk_load):
+    _bulk_loaders[kind] = bulk_load
+
+
+class Manifest:
+    """Literal identifiers (per kind) used by the static content tags of a
+    template. Shared between renders, so it is only written while compiling.
+    """
+
+    def __init__(self):
+        self.identifiers = defaultdict(set)
+
+    def add(self, kind, identifier):
+        self.identifiers[kind].add(identifier)
+
+    def __contains__(self, item):
+        kind, identifier = item
+        return identifier in self.identifiers.get(kind, ())
+
+    def load(self):
+        return {
+            kind: _bulk_loaders[kind](sorted(identifiers))
+            for kind, identifiers in self.identifiers.items()
+        }
+
+    def get_objects(self, context, kind):
+        """Existing objects of `kind` by identifier. The whole manifest is loaded
+        on the first call of the current render.
+        """
+        # The render context is local to the template being rendered
+        objects = context.render_context.get(self)
+        if objects is None:
+            objects = self.load()
+            context.render_context[self] = objects
+        return objects[kind]
+
+
+def get_manifest(parser):
+    manifest = getattr(parser, MANIFEST_PARSER_ATTRIBUTE, None)
+    if manifest is None:
+        manifest = Manifest()
+        setattr(parser, MANIFEST_PARSER_ATTRIBUTE, manifest)
+    return manifest
+
+
+def get_static_content(context, kind, identifier, get, create):
+    """Return the object of `kind` for `identifier` from the manifest of the
+    template being rendered, or `get()` if the identifier is not in it. Missing
+    objects are created with `create()`.
+    """
+    manifest = context.render_context.get(CURRENT_MANIFEST_KEY)
+    if manifest is None or (kind, identifier) not in manifest:
+        try:
+            return get()
+        except ObjectDoesNotExist:
+            return create()
+
+    objects = manifest.get_objects(context, kind)
+    try:
+        return objects[identifier]
+    except KeyError:
+        # Later tags with the same identifier get the created object
+        obj = objects[identifier] = create()
+        return obj
+
+
+def _get_literal(filter_expression):
+    """Value of a quoted string argument (without filters), or None."""
+    if filter_expression.filters or not isinstance(filter_expression.var, str):
+        return None
+    return filter_expression.var
+
+
+class StaticContentNode(SimpleNode):
+    def __init__(self, manifest, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.manifest = manifest
+
+    def render(self, context):
+        context.render_context[CURRENT_MANIFEST_KEY] = self.manifest
+        return super().render(context)
+
+
+def static_content_tag(register, kind, bulk_load):
+    """Register a simple tag (that takes the context) whose first argument is the
+    identifier of an object of `kind`, as a tag that records literal identifiers
+    in the manifest of its template. The tag should look up its object with
+    `get_static_content`.
+
+    :param bulk_load: callable that takes a list of identifiers and returns a dict
+        of the existing objects by identifier
+    """
+    register_bulk_loader(kind, bulk_load)
+
+    def decorator(func):
+        params, varargs, varkw, defaults, kwonly, kwonly_defaults, _ = getfullargspec(
+            func
+        )
+        identifier_param = params[1]  # after the context
+        function_name = func.__name__
+
+        @wraps(func)
+        def compile_func(parser, token):
+            bits = token.split_contents()[1:]
+            target_var = None
+            if len(bits) >= 2 and bits[-2] == "as":
+                target_var = bits[-1]
+                bits = bits[:-2]
+            args, kwargs = parse_bits(
+                parser,
+                bits,
+                params,
+                varargs,
+                varkw,
+                defaults,
+                kwonly,
+                kwonly_defaults,
+                True,
+                function_name,
+            )
+
+            manifest = get_manifest(parser)
+            identifier = args[0] if args else kwargs.get(identifier_param)
+            identifier = _get_literal(identifier) if identifier else None
+            if identifier is not None:
+                manifest.add(kind, str(identifier))
+
+            return StaticContentNode(manifest, func, True, args, kwargs, target_var)
+
+        register.tag(function_name, compile_func)
+        return func
+
+    return decorator
@@ -1,11 +1,72 @@
+import logging
 import os
+from collections import namedtuple
 
+from django.http import Http404
+
+from .cache import GenerationCache
 from .models import *
+from .nav import NavNode, NavTree
 
+MENU_NAMESPACE = "menu"
+
+menu_cache = GenerationCache(MENU_NAMESPACE)
+
+
+def invalidate_menus():
+    """Drop the cached menus in all processes.
+
+    Called automatically when a Menu is saved or deleted. Call this manually after
+    bulk writes that bypass signals (e.g., `QuerySet.update`).
+    """
+    menu_cache.invalidate()
+
+
+def _load_menus():
+    menus = tuple(Menu.objects.all())
+    menus_by_id = {menu.id: menu for menu in menus}
+    for menu in menus:
+        if menu.parent_id:
+            # Link cached parents so that `menu.parent` never hits the database
+            menu.parent = menus_by_id[menu.parent_id]
+    return menus
+
+
+def get_menus():
+    """All menus, loaded at most once per menu generation in each process."""
+    return menu_cache.get_or_set("menus", _load_menus)
+
+
+def _build_slug_index():
+    """Map each menu path (`parent_slug` or `parent_slug/child_slug`) to
+    `(parent, child)`, where `child` is None for parent menus.
+    """
+    slug_index = dict()
+    parents = dict()
+    menus = get_menus()
+
+    for menu in menus:
+        if not menu.parent_id:
+            parents[menu.id] = menu
+            slug_index[menu.url_slug] = (menu, None)
+
+    for menu in menus:
+        if menu.parent_id:
+            parent = parents[menu.parent_id]
+            path = "{}/{}".format(parent.url_slug, menu.url_slug)
+            slug_index[path] = (parent, menu)
+
+    return slug_index
 
-def get_nav_menu_list(base_url, request_path=None, preview_mode=False):
-    menu_dict = dict()
-    menus = list(Menu.objects.all())
+
+def get_slug_index():
+    return menu_cache.get_or_set("slug_index", _build_slug_index)
+
+
+def _build_nav_tree(base_url):
+    nodes = dict()
+    children = dict()
+    menus = get_menus()
 
     # Parent menus
     for menu in menus:
@@ -15,39 +76,87 @@ def get_nav_menu_list(base_url, request_path=None, preview_mode=False):
             else:
                 # TODO may not be appropriate to use os.path.join
                 href = os.path.join(base_url, menu.url_slug)
-            # TODO comparing request_path with redirect url (which may or may not be a full URL)
-            active = request_path and request_path.find(href) == 0
-
-            menu_dict[menu.id] = dict(
-                id=menu.id,
-                title=menu.title,
-                href=href,
-                active=active,
-                disabled=menu.disabled,
-                children=list(),
-            )
+            nodes[menu.id] = NavNode(menu.id, menu.title, href, menu.disabled)
+            children[menu.id] = list()
 
     # Child menus
     for menu in menus:
         if menu.parent_id:
-            parent_dict = menu_dict[menu.parent_id]
+            parent = nodes[menu.parent_id]
             if menu.redirect_to:
                 href = menu.redirect_to
             else:
                 # TODO may not be appropriate to use os.path.join
-                href = os.path.join(base_url, parent_dict["href"], menu.url_slug)
-
-            # TODO comparing request_path with redirect url (which may or may not be a full URL)
-            active = request_path and request_path.find(href) == 0
-            parent_dict["children"].append(
-                dict(
-                    id=menu.id,
-                    title=menu.title,
-                    parent=parent_dict,
-                    href=href,
-                    active=active,
-                    disabled=menu.disabled,
-                )
+                href = os.path.join(base_url, parent.href, menu.url_slug)
+            children[menu.parent_id].append(
+                NavNode(menu.id, menu.title, href, menu.disabled, parent=parent)
             )
 
-    return list(menu_dict.values())
+    for menu_id, node in nodes.items():
+        node._attach_children(children[menu_id])
+
+    return NavTree(nodes.values(), base_url)
+
+
+def get_nav_tree(base_url):
+    """The shared `NavTree` for `base_url`. Do not modify."""
+    return menu_cache.get_or_set(
+        ("nav_tree", base_url), lambda: _build_nav_tree(base_url)
+    )
+
+
+def get_nav_menu_list(base_url, request_path=None, preview_mode=False):
+    """Return the nav menus with the menus along `request_path` marked active.
+
+    The result is a read-only sequence of nodes (see `dt_content.nav`) that share
+    the cached tree. Only the active menus are wrapped per request.
+    """
+    # TODO comparing request_path with redirect url (which may or may not be a full URL)
+    return get_nav_tree(base_url).for_request(request_path)
+
+
+ResolvedPage = namedtuple(
+    "ResolvedPage", ["parent", "child", "nav_menu", "content_section"]
+)
+
+
+def resolve_menu_path(menu_path, nav_menu_list):
+    """Resolve `menu_path` against the cached slug index.
+
+    `nav_menu_list` must have been built by `get_nav_menu_list` for the current
+    request. Returns a `ResolvedPage`, whose `child` is None for parent menus, or
+    raises Http404. Costs no menu queries and at most one section query. The
+    blocks of the section are loaded on first access (see `ContentSection.blocks`),
+    which cached section fragments avoid.
+    """
+    slugs = menu_path.split("/")
+    if len(slugs) not in [1, 2]:
+        logging.warning("Invalid menu_path {}".format(menu_path))
+    # Other numbers of slugs resolve to the parent menu, as they always have
+    key = menu_path if len(slugs) == 2 else slugs[0]
+
+    try:
+        parent, child = get_slug_index()[key]
+    except KeyError:
+        raise Http404("No menu matches the given path.")
+
+    # Looked up by id, as the slug index and `nav_menu_list` may come from
+    # different menu generations
+    nav_menu = nav_menu_list.get_node((child or parent).id)
+    if nav_menu is None:
+        logging.warning("Could not find menu {} in menu_list".format(menu_path))
+
+    # Sections are fetched per request (and not cached with the shared menus)
+    menu = child or parent
+    content_section = (
+        ContentSection.objects.select_related("menu__parent")
+        .filter(menu_id=menu.id)
+        .first()
+    )
+    if content_section is None:
+        # Render an empty section rather than writing on a GET request. Sections
+        # are created along with their menus, so this should not happen.
+        logging.warning("Menu {} has no content section".format(menu.id))
+        content_section = ContentSection(menu_id=menu.id)
+
+    return ResolvedPage(parent, child, nav_menu, content_section)
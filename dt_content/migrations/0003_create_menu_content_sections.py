@@ -0,0 +1,28 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:05
+
+from django.db import migrations
+
+
+def create_menu_content_sections(apps, schema_editor):
+    """Content sections are now created along with their menus instead of on the
+    first page view.
+    """
+    Menu = apps.get_model("dt_content", "Menu")
+    ContentSection = apps.get_model("dt_content", "ContentSection")
+    menu_ids = Menu.objects.filter(content_section__isnull=True).values_list(
+        "id", flat=True
+    )
+    ContentSection.objects.bulk_create(
+        [ContentSection(key="", menu_id=menu_id) for menu_id in menu_ids]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dt_content', '0002_auto_20200225_0226'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_menu_content_sections, migrations.RunPython.noop),
+    ]
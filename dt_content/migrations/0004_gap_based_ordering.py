@@ -0,0 +1,70 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:07
+
+from django.db import migrations, models
+
+POSITION_GAP = 1 << 16
+
+
+def copy_order_to_position(apps, schema_editor):
+    for model_name in ["Menu", "ContentBlock"]:
+        model = apps.get_model("dt_content", model_name)
+        for pk, order in model.objects.values_list("pk", "_order").iterator():
+            model.objects.filter(pk=pk).update(position=(order + 1) * POSITION_GAP)
+
+
+def copy_position_to_order(apps, schema_editor):
+    for model_name, scope in [("Menu", "parent_id"), ("ContentBlock", "section_id")]:
+        model = apps.get_model("dt_content", model_name)
+        rows = model.objects.order_by(scope, "position", "pk").values_list(scope, "pk")
+        previous_scope, order = object(), 0
+        for scope_value, pk in rows.iterator():
+            order = order + 1 if scope_value == previous_scope else 0
+            model.objects.filter(pk=pk).update(_order=order)
+            previous_scope = scope_value
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dt_content', '0003_create_menu_content_sections'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contentblock',
+            name='position',
+            field=models.BigIntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='position',
+            field=models.BigIntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_order_to_position, copy_position_to_order),
+        migrations.AlterOrderWithRespectTo(
+            name='contentblock',
+            order_with_respect_to=None,
+        ),
+        migrations.AlterOrderWithRespectTo(
+            name='menu',
+            order_with_respect_to=None,
+        ),
+        migrations.AlterModelOptions(
+            name='contentblock',
+            options={'ordering': ['position', 'id']},
+        ),
+        migrations.AlterModelOptions(
+            name='menu',
+            options={'ordering': ['position', 'id']},
+        ),
+        migrations.AddIndex(
+            model_name='contentblock',
+            index=models.Index(fields=['section', 'position'], name='dt_content__section_1ef03a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['parent', 'position'], name='dt_content__parent__41d3c5_idx'),
+        ),
+    ]
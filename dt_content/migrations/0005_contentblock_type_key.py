@@ -0,0 +1,32 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:12
+
+from django.db import migrations, models
+from django.utils.text import camel_case_to_spaces
+
+
+def populate_type_keys(apps, schema_editor):
+    """Set the type key of existing blocks from the subclass table they are in."""
+    ContentBlock = apps.get_model("dt_content", "ContentBlock")
+    for model in apps.get_models():
+        if ContentBlock not in model._meta.parents:
+            continue
+        type_key = camel_case_to_spaces(model.__name__).replace(" ", "_")
+        ContentBlock.objects.filter(
+            pk__in=model.objects.values_list("pk", flat=True)
+        ).update(type_key=type_key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dt_content', '0004_gap_based_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contentblock',
+            name='type_key',
+            field=models.CharField(default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(populate_type_keys, migrations.RunPython.noop),
+    ]
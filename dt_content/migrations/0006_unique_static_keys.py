@@ -0,0 +1,59 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:40
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_static_objects(apps, schema_editor):
+    """Merge static sections (and delete static blocks) that were created more than
+    once by concurrent first renders, keeping the oldest of each key.
+    """
+    ContentSection = apps.get_model("dt_content", "ContentSection")
+    ContentBlock = apps.get_model("dt_content", "ContentBlock")
+
+    duplicate_keys = (
+        ContentSection.objects.filter(menu=None)
+        .values("key")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+        .values_list("key", flat=True)
+    )
+    for key in list(duplicate_keys):
+        kept, *duplicates = ContentSection.objects.filter(menu=None, key=key).order_by(
+            "id"
+        )
+        ContentBlock.objects.filter(section__in=duplicates).update(section=kept)
+        ContentSection.objects.filter(id__in=[s.id for s in duplicates]).delete()
+
+    duplicate_blocks = (
+        ContentBlock.objects.filter(section=None, key__isnull=False)
+        .order_by()  # Meta.ordering would be grouped by
+        .values("key", "type_key")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in list(duplicate_blocks):
+        ids = ContentBlock.objects.filter(
+            section=None, key=duplicate["key"], type_key=duplicate["type_key"]
+        ).values_list("id", flat=True)
+        # Deletes the subclass rows as well (parent links cascade)
+        ContentBlock.objects.filter(id__in=list(ids.order_by("id"))[1:]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dt_content', '0005_contentblock_type_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_static_objects, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='contentblock',
+            constraint=models.UniqueConstraint(condition=models.Q(('key__isnull', False), ('section', None)), fields=('key', 'type_key'), name='unique_static_block_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='contentsection',
+            constraint=models.UniqueConstraint(condition=models.Q(menu=None), fields=('key',), name='unique_static_section_key'),
+        ),
+    ]
@@ -0,0 +1,212 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:05
+
+from collections import namedtuple
+from html import escape
+from html.parser import HTMLParser
+
+from django.db import migrations, models
+
+# Frozen copy of `dt_content.html.render_rich_text` as of this migration, so that
+# later changes to the renderer (or to its dependencies) do not affect it. Content
+# that is saved again is rendered by the current renderer.
+
+EXCERPT_LENGTH = 200
+
+ALLOWED_TAGS = set(
+    "a abbr b blockquote br caption code col colgroup dd del div dl dt em "
+    "figcaption figure font h1 h2 h3 h4 h5 h6 hr i iframe img ins li mark ol p "
+    "pre q s small span strike strong sub sup table tbody td tfoot th thead tr u "
+    "ul".split()
+)
+VOID_TAGS = {"br", "col", "hr", "img"}
+# Tags that are dropped along with their content
+DROPPED_TAGS = {"head", "noscript", "script", "style", "template", "title"}
+# Tags that separate words in the excerpt
+BLOCK_TAGS = set(
+    "blockquote br caption dd div dl dt figcaption figure h1 h2 h3 h4 h5 h6 hr li "
+    "ol p pre table td th tr ul".split()
+)
+LAZY_TAGS = {"iframe", "img"}
+
+GLOBAL_ATTRIBUTES = {"align", "class", "dir", "id", "lang", "style", "title"}
+TAG_ATTRIBUTES = {
+    "a": {"href", "name", "rel", "target"},
+    "col": {"span", "width"},
+    "font": {"color", "face", "size"},
+    "iframe": {"allow", "allowfullscreen", "frameborder", "height", "src", "width"},
+    "img": set("alt data-filename height loading sizes src srcset width".split()),
+    "ol": {"start", "type"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan", "scope"},
+}
+URL_ATTRIBUTES = {"href", "src"}
+SAFE_URL_SCHEMES = {"http", "https", "mailto", "tel"}
+
+RenderedHtml = namedtuple("RenderedHtml", ["html", "excerpt"])
+
+
+def _is_safe_url(tag, url):
+    url = "".join(url.split()).lower()  # browsers ignore whitespace in schemes
+    scheme, colon, _ = url.partition(":")
+    if not colon or "/" in scheme or "?" in scheme or "#" in scheme:
+        return True  # relative url
+    if tag == "img" and url.startswith("data:image/"):
+        return True  # images pasted into Summernote
+    return scheme in SAFE_URL_SCHEMES
+
+
+def _is_safe_style(style):
+    style = "".join(style.split()).lower()
+    return "expression(" not in style and "javascript:" not in style
+
+
+class _RichTextRenderer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = list()
+        self.text = list()
+        self.open_tags = list()
+        self.dropping = 0  # depth of DROPPED_TAGS
+        self.preformatted = 0  # depth of <pre>
+
+    def _clean_attrs(self, tag, attrs):
+        allowed = TAG_ATTRIBUTES.get(tag, set())
+        cleaned = dict()
+        for name, value in attrs:
+            if name not in GLOBAL_ATTRIBUTES and name not in allowed:
+                continue
+            if value is None:
+                value = ""
+            if name in URL_ATTRIBUTES and not _is_safe_url(tag, value):
+                continue
+            if name == "style" and not _is_safe_style(value):
+                continue
+            cleaned[name] = value
+        if tag in LAZY_TAGS:
+            cleaned.setdefault("loading", "lazy")
+        if tag == "a" and cleaned.get("target") == "_blank":
+            cleaned.setdefault("rel", "noopener")
+        return cleaned
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(" ")
+        if tag not in ALLOWED_TAGS:
+            return
+
+        attrs = "".join(
+            ' {}="{}"'.format(name, escape(value))
+            for name, value in self._clean_attrs(tag, attrs).items()
+        )
+        self.html.append("<{}{}>".format(tag, attrs))
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+            if tag == "pre":
+                self.preformatted += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(" ")
+        if tag not in self.open_tags:
+            return  # stray end tag
+        # Close the tags left open inside `tag`
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.html.append("</{}>".format(open_tag))
+            if open_tag == "pre":
+                self.preformatted -= 1
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        self.text.append(data)
+        if not self.preformatted:
+            # Keep a single space at the edges, which may separate words from
+            # those of neighboring inline tags
+            collapsed = " ".join(data.split())
+            if not collapsed:
+                collapsed = " "
+            else:
+                if data[0].isspace():
+                    collapsed = " " + collapsed
+                if data[-1].isspace():
+                    collapsed = collapsed + " "
+            data = collapsed
+        self.html.append(escape(data, quote=False))
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.html.append("</{}>".format(self.open_tags.pop()))
+
+
+def render_rich_text(html):
+    """Return the `RenderedHtml` of Summernote `html` (which may be None)."""
+    if not html:
+        return RenderedHtml("", "")
+    renderer = _RichTextRenderer()
+    renderer.feed(html)
+    renderer.close()
+    excerpt = " ".join("".join(renderer.text).split())
+    if len(excerpt) > EXCERPT_LENGTH:
+        excerpt = excerpt[: EXCERPT_LENGTH - 1].rstrip() + "\u2026"
+    return RenderedHtml("".join(renderer.html).strip(), excerpt)
+
+
+def render_existing_content(apps, schema_editor):
+    for model_name in ["Blurb", "RichTextBlock"]:
+        model = apps.get_model("dt_content", model_name)
+        rows = model.objects.exclude(content=None).values_list("pk", "content")
+        for pk, content in rows.iterator():
+            rendered_content, excerpt = render_rich_text(content)
+            model.objects.filter(pk=pk).update(
+                rendered_content=rendered_content, excerpt=excerpt
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dt_content', '0006_unique_static_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blurb',
+            name='excerpt',
+            field=models.CharField(default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='blurb',
+            name='rendered_content',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='richtextblock',
+            name='excerpt',
+            field=models.CharField(default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='richtextblock',
+            name='rendered_content',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(render_existing_content, migrations.RunPython.noop),
+    ]
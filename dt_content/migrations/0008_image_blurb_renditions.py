@@ -0,0 +1,66 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:40
+
+import logging
+
+from django.db import migrations, models
+import versatileimagefield.fields
+from PIL import Image
+
+EXIF_ORIENTATION = 274
+# EXIF orientations that swap the width and the height
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def get_image_size(image_file):
+    # Frozen copy of `dt_content.renditions.get_image_size`
+    image = Image.open(image_file)
+    width, height = image.size
+    if image.getexif().get(EXIF_ORIENTATION) in TRANSPOSED_ORIENTATIONS:
+        width, height = height, width
+    return width, height
+
+
+def set_existing_dimensions(apps, schema_editor):
+    # The renditions are generated by `manage.py warm_renditions` (`srcset` was
+    # left empty, and is no longer stored since 0013)
+    ImageBlurb = apps.get_model("dt_content", "ImageBlurb")
+    rows = ImageBlurb.objects.exclude(image=None).exclude(image="")
+    for blurb in rows.only("image").iterator():
+        try:
+            with blurb.image.open("rb") as image_file:
+                width, height = get_image_size(image_file)
+        except OSError:
+            logging.warning("Could not read the size of {}".format(blurb.image))
+            continue
+        ImageBlurb.objects.filter(pk=blurb.pk).update(width=width, height=height)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dt_content', '0007_rendered_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageblurb',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='imageblurb',
+            name='ppoi',
+            field=versatileimagefield.fields.PPOIField(default='0.5x0.5', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='imageblurb',
+            name='srcset',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='imageblurb',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(set_existing_dimensions, migrations.RunPython.noop),
+    ]
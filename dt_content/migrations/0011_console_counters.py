@@ -0,0 +1,20 @@
+# Generated by Django 2.2.28 on 2026-10-18 22:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dt_content', '0010_image_blurb_placeholder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('value', models.PositiveIntegerField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 2.2.28 on 2026-10-18 22:50
+
+from html import unescape
+from itertools import islice
+
+from django.db import OperationalError, migrations
+from django.urls import reverse
+from django.utils.html import strip_tags
+
+TABLE = "dt_content_search"
+BATCH_SIZE = 1000
+
+# Frozen copy of the documents of `dt_content.search` (rowids are derived from
+# the position of each model in this list)
+
+
+def _text(html):
+    return unescape(strip_tags(html or ""))
+
+
+def _blurb_document(blurb):
+    return (
+        reverse("dt-content:blurb-update", args=[blurb.pk]),
+        blurb.label or blurb.identifier or "",
+        " ".join(filter(None, [blurb.identifier, blurb.last_known_location])),
+        _text(blurb.content),
+    )
+
+
+def _rich_text_block_document(block):
+    return (
+        reverse("dt-content:rich-text-block-update", args=[block.pk]),
+        block.key or "",
+        block.static_location or "",
+        _text(block.content),
+    )
+
+
+def _menu_document(menu):
+    if menu.parent_id:
+        url = reverse("dt-content:submenu-update", args=[menu.pk])
+    else:
+        url = reverse("dt-content:menu-update", args=[menu.pk])
+    return (
+        url,
+        menu.title,
+        " ".join(filter(None, [menu.url_slug, menu.redirect_to])),
+        "",
+    )
+
+
+def _content_section_document(section):
+    return (
+        reverse("dt-content:content-section-update", args=[section.pk]),
+        section.key,
+        section.static_location or "",
+        "",
+    )
+
+
+SEARCH_TYPES = (
+    ("Blurb", dict(), _blurb_document),
+    ("RichTextBlock", dict(), _rich_text_block_document),
+    ("Menu", dict(), _menu_document),
+    ("ContentSection", dict(menu=None), _content_section_document),
+)
+
+
+def index_existing_objects(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for type_index, (model_name, lookup, get_document) in enumerate(SEARCH_TYPES):
+            model = apps.get_model("dt_content", model_name)
+            objs = model._base_manager.filter(**lookup).order_by("pk").iterator()
+            for batch in iter(lambda: list(islice(objs, BATCH_SIZE)), []):
+                cursor.executemany(
+                    "INSERT INTO {} (rowid, url, title, keywords, body) "
+                    "VALUES (%s, %s, %s, %s, %s)".format(TABLE),
+                    [
+                        (obj.pk * len(SEARCH_TYPES) + type_index, *get_document(obj))
+                        for obj in batch
+                    ],
+                )
+        cursor.execute("INSERT INTO {0} ({0}) VALUES ('optimize')".format(TABLE))
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE {} USING fts5("
+            "url UNINDEXED, title, keywords, body, "
+            "prefix='2 3', tokenize='unicode61 remove_diacritics 2')".format(TABLE)
+        )
+    except OperationalError:
+        # SQLite was built without FTS5, search is unavailable
+        return
+    index_existing_objects(apps, schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS {}".format(TABLE))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dt_content', '0011_console_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
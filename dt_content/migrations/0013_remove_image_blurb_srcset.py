@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 23:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dt_content', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='imageblurb',
+            name='srcset',
+        ),
+    ]
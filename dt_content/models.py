@@ -1,8 +1,10 @@
+import logging
 from abc import abstractmethod
 
 from django.apps import apps
-from django.core.exceptions import ValidationError
-from django.db import models
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import models, transaction
+from django.db.models.query import ModelIterable
 from django.db.models.query_utils import Q
 from django.urls import reverse
 from django.utils.decorators import classproperty
@@ -12,9 +14,14 @@ from versatileimagefield.fields import PPOIField, VersatileImageField
 from django.contrib.staticfiles.templatetags.staticfiles import static
 
 from .fields import SummernoteField
+from .fragments import invalidate_section_fragment
+from .html import EXCERPT_LENGTH, render_rich_text
+from .ordering import PositionedModel
+from .renditions import get_field_placeholder, get_image_size, get_placeholder_style
+from .warming import get_rendition_widths, is_new_upload, warm_on_commit
 
 
-class Menu(models.Model):
+class Menu(PositionedModel):
     title = models.CharField(max_length=256, db_index=True)
     url_slug = models.SlugField(max_length=32, db_index=True)
     disabled = models.BooleanField(default=False)
@@ -24,9 +31,14 @@ class Menu(models.Model):
     # User will be redirected if redirect link is set
     redirect_to = models.URLField(null=True, blank=True)
 
+    position_scope = "parent"
+
     class Meta:
-        order_with_respect_to = "parent"
-        indexes = [models.Index(fields=["parent", "url_slug"])]
+        ordering = ["position", "id"]
+        indexes = [
+            models.Index(fields=["parent", "url_slug"]),
+            models.Index(fields=["parent", "position"]),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["url_slug"],
@@ -57,17 +69,35 @@ class Menu(models.Model):
         else:
             return super().unique_error_message(model_class, unique_check)
 
+    @classmethod
+    def positions_changed(cls, parent_id):
+        # Moves are updates, which send no signals (see `dt_content.signals`)
+        from .menu import invalidate_menus
+
+        invalidate_menus()
+
     def get_content_section(self):
-        ContentSection = apps.get_model("dt_content", "ContentSection")
-        content_section, created = ContentSection.objects.get_or_create(menu=self)
-        return content_section
+        """Read-only accessor for the content section of this menu, which is created
+        along with the menu. Use `select_related("content_section")` to avoid a query.
+
+        Returns None if the section is missing.
+        """
+        try:
+            return self.content_section
+        except ObjectDoesNotExist:
+            return None
 
     def save(self, *args, **kwargs):
         if self.parent and self.children.exists():
             raise RuntimeError(
                 "Multi-level submenus are not supported (only menu and sub-menu)"
             )
-        super().save(*args, **kwargs)
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                ContentSection = apps.get_model("dt_content", "ContentSection")
+                ContentSection.objects.create(menu=self)
 
     @property
     def update_url(self):
@@ -97,9 +127,56 @@ class Menu(models.Model):
             return self.title
 
 
-class StaticContentSectionManager(InheritanceManager):
+class BlockList(list):
+    """Materialized blocks of a ContentSection.
+
+    Also supports the QuerySet methods used in templates (`all`, `count` and
+    `exists`), so that all of them share a single fetch.
+    """
+
+    def all(self):
+        return self
+
+    def count(self):
+        return len(self)
+
+    def exists(self):
+        return bool(self)
+
+
+class ContentSectionQuerySet(models.QuerySet):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._prefetch_blocks = False
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._prefetch_blocks = self._prefetch_blocks
+        return clone
+
+    def prefetch_blocks(self):
+        """Load the blocks (as subclasses) of all sections along with the sections,
+        using one query per block type present (see `dt_content.loaders`).
+        """
+        clone = self._chain()
+        clone._prefetch_blocks = True
+        return clone
+
+    def _fetch_all(self):
+        fetching = self._result_cache is None
+        super()._fetch_all()
+        if fetching and self._prefetch_blocks and self._iterable_class is ModelIterable:
+            from .loaders import prefetch_blocks
+
+            prefetch_blocks(self._result_cache)
+
+
+ContentSectionManager = models.Manager.from_queryset(ContentSectionQuerySet)
+
+
+class StaticContentSectionManager(ContentSectionManager):
     def get_queryset(self):
-        return self._queryset_class(self.model).filter(menu=None)
+        return super().get_queryset().filter(menu=None)
 
 
 class ContentSection(models.Model):
@@ -117,9 +194,18 @@ class ContentSection(models.Model):
         blank=True,
     )
 
-    objects = models.Manager()
+    objects = ContentSectionManager()
     static_objects = StaticContentSectionManager()
 
+    class Meta:
+        constraints = [
+            # Static sections are registered with bulk inserts that skip
+            # existing keys (see `dt_content.registration`)
+            models.UniqueConstraint(
+                fields=["key"], condition=Q(menu=None), name="unique_static_section_key"
+            )
+        ]
+
     def __str__(self):
         if self.menu:
             if self.menu.parent:
@@ -131,12 +217,31 @@ class ContentSection(models.Model):
 
     @property
     def blocks(self):
-        ContentBlock = apps.get_model("dt_content", "ContentBlock")
-        return ContentBlock.objects.select_subclasses().filter(section=self)
+        """Blocks of this section (as subclasses), fetched at most once per instance.
+
+        Use `ContentSection.objects.prefetch_blocks()` to fetch the blocks of many
+        sections at once.
+        """
+        if getattr(self, "_block_list", None) is None:
+            from .loaders import prefetch_blocks
+
+            # Stays empty for unsaved sections (filtering by them would match
+            # static blocks)
+            self._block_list = BlockList()
+            prefetch_blocks([self])
+        return self._block_list
+
+    def clear_blocks(self):
+        """Clear the memoized blocks."""
+        self._block_list = None
+
+    def refresh_from_db(self, *args, **kwargs):
+        self.clear_blocks()
+        super().refresh_from_db(*args, **kwargs)
 
     @property
     def empty(self):
-        return not self.blocks.exists()
+        return not self.blocks
 
     @property
     def template_name(self):
@@ -148,7 +253,7 @@ class StaticContentBlockManager(InheritanceManager):
         return self._queryset_class(self.model).filter(section=None)
 
 
-class ContentBlock(models.Model):
+class ContentBlock(PositionedModel):
     section = models.ForeignKey(
         ContentSection,
         related_name="_blocks",
@@ -164,12 +269,24 @@ class ContentBlock(models.Model):
     # Location of static ContentSection (if it is static)
     # Saves the url where the ContentSection was first initiated
     static_location = models.URLField(null=True)
+    # `block_type_key` of the concrete subclass (see `dt_content.loaders`)
+    type_key = models.CharField(max_length=64, default="", editable=False)
 
     objects = InheritanceManager()
     static_objects = StaticContentBlockManager()
 
+    position_scope = "section"
+
     class Meta:
-        order_with_respect_to = "section"
+        ordering = ["position", "id"]
+        indexes = [models.Index(fields=["section", "position"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key", "type_key"],
+                condition=Q(section=None, key__isnull=False),
+                name="unique_static_block_key",
+            )
+        ]
 
     @classproperty
     def block_type(cls):
@@ -178,6 +295,16 @@ class ContentBlock(models.Model):
     def get_block_type(self):
         return self.__class__.block_type
 
+    def save(self, *args, **kwargs):
+        self.type_key = self.block_type_key
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def positions_changed(cls, section_id):
+        # Moves are updates, which send no signals (see `dt_content.signals`)
+        if section_id is not None:
+            invalidate_section_fragment(section_id)
+
     @classproperty
     def block_type_key(cls):
         return camel_case_to_spaces(cls.__name__).replace(" ", "_")
@@ -250,7 +377,26 @@ class ContentBlock(models.Model):
             return "Static {} ({})".format(self.block_type, self.key)
 
 
-class RichTextBlock(ContentBlock):
+class RenderedContentModel(models.Model):
+    """Abstract model with Summernote `content` that is rendered on save (see
+    `dt_content.html`), so templates output `rendered_content` as is.
+    """
+
+    rendered_content = models.TextField(default="", editable=False)
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, default="", editable=False)
+
+    class Meta:
+        abstract = True
+
+    def render_content(self):
+        self.rendered_content, self.excerpt = render_rich_text(self.content)
+
+    def save(self, *args, **kwargs):
+        self.render_content()
+        super().save(*args, **kwargs)
+
+
+class RichTextBlock(ContentBlock, RenderedContentModel):
     base = models.OneToOneField(
         ContentBlock, on_delete=models.CASCADE, parent_link=True
     )
@@ -289,7 +435,7 @@ class CarouselBlock(ContentBlock):
         raise NotImplementedError()
 
 
-class Blurb(models.Model):
+class Blurb(RenderedContentModel):
     # Identifiers are primarily for the template-embedded blurb use case,
     # using the `blurb` template tag.
     identifier = models.CharField(max_length=256, unique=True, null=True, blank=True)
@@ -346,8 +492,21 @@ class ImageBlurb(models.Model):
     # A null value indicates that the content has not been set.
     # An empty value would indicate that the blurb is intentionally empty.
     image = VersatileImageField(
-        upload_to="image_blurbs", null=True, blank=True, default=None
+        upload_to="image_blurbs",
+        null=True,
+        blank=True,
+        default=None,
+        ppoi_field="ppoi",
     )
+    # Set on save, like the renditions of `image` (see `dt_content.renditions`).
+    # Not `width_field`/`height_field` of `image`, which read the image file
+    # whenever they are empty, including when instances are loaded.
+    height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    ppoi = PPOIField()
+    # Low-quality placeholder of `image`, set when it is uploaded
+    lqip = models.TextField(default="", editable=False)
+    dominant_color = models.CharField(max_length=7, default="", editable=False)
     placeholder = models.TextField(
         help_text="Path to static placeholder image file",
         null=True,
@@ -370,6 +529,52 @@ class ImageBlurb(models.Model):
             return self.identifier
         return "Unnamed Blurb ({})".format(self.id)
 
+    # Name of `image` when loaded (or last saved), so that saves only read the
+    # image file when it changed
+    _saved_image_name = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_image_name = instance.__dict__.get("image")
+        return instance
+
+    def save(self, *args, **kwargs):
+        uploaded = is_new_upload(self.image)
+        if uploaded or self.image.name != self._saved_image_name:
+            self.set_dimensions()
+        if uploaded or not self.image:
+            self.lqip, self.dominant_color = get_field_placeholder(self.image)
+        super().save(*args, **kwargs)
+        self._saved_image_name = self.image.name
+        if uploaded:
+            warm_on_commit(self, "image")
+
+    def set_dimensions(self):
+        """Set `width` and `height` from `image`."""
+        # Store a new upload first (as saving would), so that its size can be read
+        self._meta.get_field("image").pre_save(self, self._state.adding)
+        self.width = self.height = None
+        if not self.image:
+            return
+        try:
+            self.width, self.height = get_image_size(
+                self.image.name, self.image.storage
+            )
+        except OSError:
+            logging.warning("Could not read the size of {}".format(self.image))
+
+    @property
+    def srcset(self):
+        """Renditions of `image` (generated in the background once a new image is
+        saved, see `dt_content.warming`) that exist according to the rendition
+        index.
+        """
+        from .rendition_index import get_srcset
+
+        widths = get_rendition_widths(ImageBlurb, "image")
+        return get_srcset(self.image, self.width, self.height, widths)
+
     @property
     def src(self):
         if self.image:
@@ -378,6 +583,11 @@ class ImageBlurb(models.Model):
             return static(self.placeholder)
         return None
 
+    @property
+    def placeholder_style(self):
+        """Inline CSS that shows the low-quality placeholder until `image` loads."""
+        return get_placeholder_style(self.lqip, self.dominant_color)
+
     @property
     def html_id(self):
         return "dt-content-image-blurb-{}".format(self.id)
@@ -403,6 +613,41 @@ class ImageBlurb(models.Model):
         return self.display_name
 
 
+class Rendition(models.Model):
+    """Index of the generated renditions of images (see
+    `dt_content.rendition_index`).
+    """
+
+    source_name = models.CharField(max_length=255)
+    # Size key of the rendition, e.g., "bounded__480x0"
+    spec = models.CharField(max_length=64)
+    # Modification time of the source image when the rendition was generated
+    # (null if the storage does not support modification times)
+    source_mtime = models.DateTimeField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source_name", "spec"], name="unique_rendition"
+            )
+        ]
+
+    def __str__(self):
+        return "{} ({})".format(self.source_name, self.spec)
+
+
+class Counter(models.Model):
+    """Denormalized row count (see `dt_content.counters`). A missing row means
+    that the count is unknown.
+    """
+
+    name = models.CharField(max_length=64, primary_key=True)
+    value = models.PositiveIntegerField()
+
+    def __str__(self):
+        return "{}: {}".format(self.name, self.value)
+
+
 def update_content_block_subclasses():
     """
     Call this after you have defined additional ContentBlock subclasses
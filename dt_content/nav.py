@@ -0,0 +1,165 @@
+"""Immutable navigation tree shared by all requests.
+
+`NavTree` is built once per menu generation and base url. Requests never copy
+it: `NavTree.for_request` walks a prefix trie of the menu hrefs once to find the
+active menus and returns a `NavNodeList` that wraps only those menus (and the
+parents of active children) in an `ActiveNavNode` overlay.
+
+Nodes expose the same names as the dicts previously returned by
+`get_nav_menu_list` (`id`, `title`, `href`, `active`, `disabled`, `parent`,
+`children`), so templates can use either.
+"""
+
+from collections.abc import Sequence
+
+
+def _split_href(href):
+    segments = href.split("/")
+    if len(segments) > 1 and segments[-1] == "":
+        segments.pop()  # ignore trailing slashes
+    return segments
+
+
+class NavNode:
+    """A menu entry. Instances are shared between requests and immutable."""
+
+    __slots__ = ("id", "title", "href", "disabled", "parent", "children")
+
+    active = False
+
+    def __init__(self, id, title, href, disabled, parent=None, children=()):
+        object.__setattr__(self, "id", id)
+        object.__setattr__(self, "title", title)
+        object.__setattr__(self, "href", href)
+        object.__setattr__(self, "disabled", disabled)
+        object.__setattr__(self, "parent", parent)
+        object.__setattr__(self, "children", tuple(children))
+
+    def _attach_children(self, children):
+        # Only used while building the tree, as children refer to their parent
+        object.__setattr__(self, "children", tuple(children))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("NavNode is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("NavNode is immutable")
+
+    def __repr__(self):
+        return "<NavNode {}: {}>".format(self.id, self.href)
+
+
+class ActiveNavNode:
+    """Request-scoped overlay of a shared `NavNode` that is active, or that has
+    active children (e.g., a child that redirects to the requested page).
+    """
+
+    __slots__ = ("node", "parent", "_active_ids")
+
+    def __init__(self, node, active_ids, parent=None):
+        self.node = node
+        self.parent = parent if parent is not None else node.parent
+        self._active_ids = active_ids
+
+    def __getattr__(self, name):
+        return getattr(self.node, name)
+
+    @property
+    def active(self):
+        return self.node.id in self._active_ids
+
+    @property
+    def children(self):
+        return NavNodeList(self.node.children, self._active_ids, parent=self)
+
+    def __repr__(self):
+        return "<ActiveNavNode {}: {}>".format(self.node.id, self.node.href)
+
+
+class NavNodeList(Sequence):
+    """Read-only view of shared nodes where active nodes are overlaid."""
+
+    __slots__ = ("nodes", "active_ids", "parent", "tree")
+
+    def __init__(self, nodes, active_ids, parent=None, tree=None):
+        self.nodes = nodes
+        self.active_ids = active_ids
+        self.parent = parent
+        # The NavTree of top-level lists
+        self.tree = tree
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        node = self.nodes[index]
+        if self.active_ids and (
+            node.id in self.active_ids
+            or any(child.id in self.active_ids for child in node.children)
+        ):
+            return ActiveNavNode(node, self.active_ids, parent=self.parent)
+        return node
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def get_node(self, node_id):
+        """Node of id `node_id` in this top-level list (or one of its children),
+        or None if there is none.
+        """
+        position = self.tree.get_position(node_id) if self.tree else None
+        if position is None:
+            return None
+        position, child_position = position
+        node = self[position]
+        if child_position is not None:
+            node = node.children[child_position]
+        return node
+
+
+class NavTree:
+    __slots__ = ("nodes", "base_url", "_trie", "_positions")
+
+    def __init__(self, nodes, base_url=None):
+        """
+        :param nodes: top-level NavNodes, with their children attached
+        :param base_url: base url used to build the hrefs
+        """
+        self.nodes = tuple(nodes)
+        self.base_url = base_url
+        self._trie = dict()
+        # Node id -> (position, position among the children of the parent)
+        self._positions = dict()
+        for position, node in enumerate(self.nodes):
+            self._insert(node)
+            self._positions[node.id] = (position, None)
+            for child_position, child in enumerate(node.children):
+                self._insert(child)
+                self._positions[child.id] = (position, child_position)
+
+    def _insert(self, node):
+        trie = self._trie
+        for segment in _split_href(node.href):
+            trie = trie.setdefault(segment, dict())
+        # `None` never collides with a segment (always a str)
+        trie.setdefault(None, list()).append(node.id)
+
+    def get_position(self, node_id):
+        """`(position, child_position)` of a node (see `NavNodeList.get_node`),
+        or None if it is not in the tree.
+        """
+        return self._positions.get(node_id)
+
+    def get_active_ids(self, request_path):
+        """Ids of all nodes whose href is a path prefix of `request_path`."""
+        active_ids = list()
+        if request_path:
+            trie = self._trie
+            for segment in _split_href(request_path):
+                trie = trie.get(segment)
+                if trie is None:
+                    break
+                active_ids.extend(trie.get(None, ()))
+        return frozenset(active_ids)
+
+    def for_request(self, request_path=None):
+        return NavNodeList(self.nodes, self.get_active_ids(request_path), tree=self)
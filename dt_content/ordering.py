@@ -0,0 +1,183 @@
+"""Gap-based ordering of sibling objects (e.g., the blocks of a section).
+
+Siblings are ordered by a sparse `position` key. New objects are appended
+`POSITION_GAP` after the last sibling and moving an object takes the midpoint of
+its new neighbors, so a move is a single UPDATE instead of rewriting the order of
+every sibling (as `Meta.order_with_respect_to` does).
+
+Siblings are only renumbered when there is no gap left between two neighbors,
+or when `rebalance_positions` (see the management command) is run.
+"""
+
+from django.db import models, transaction
+
+POSITION_GAP = 1 << 16
+
+# Sibling groups with a smaller gap are renumbered by `rebalance_positions`
+REBALANCE_THRESHOLD = 16
+
+
+def position_between(lower, upper):
+    """Return a position between `lower` and `upper` (either may be None), or
+    None if there is no gap.
+    """
+    if lower is None and upper is None:
+        return POSITION_GAP
+    if lower is None:
+        return upper - POSITION_GAP
+    if upper is None:
+        return lower + POSITION_GAP
+    if upper - lower > 1:
+        return (lower + upper) // 2
+    return None
+
+
+class PositionedModel(models.Model):
+    """Abstract model ordered within the group of objects that share the value of
+    `position_scope` (a ForeignKey name). Subclasses should index
+    `[position_scope, "position"]`.
+    """
+
+    position_scope = None
+
+    position = models.BigIntegerField(editable=False)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def get_position_model(cls):
+        # The concrete model that declares `position` (e.g., ContentBlock for
+        # RichTextBlock), as siblings may be of any subclass
+        return cls._meta.get_field("position").model
+
+    def get_position_scope_value(self):
+        return getattr(self, self._meta.get_field(self.position_scope).attname)
+
+    def get_siblings(self):
+        """All objects in the same group, including self."""
+        model = self.get_position_model()
+        scope = self._meta.get_field(self.position_scope).attname
+        return model._base_manager.filter(**{scope: self.get_position_scope_value()})
+
+    @classmethod
+    def positions_changed(cls, scope_value):
+        """Called (within the transaction) after the positions of the group of
+        `scope_value` have been updated, which sends no signals. Override to
+        invalidate what depends on the order (e.g., caches).
+        """
+
+    def save(self, *args, **kwargs):
+        if self.position is None:
+            last = (
+                self.get_siblings()
+                .order_by("-position")
+                .values_list("position", flat=True)
+                .first()
+            )
+            self.position = position_between(last, None)
+        super().save(*args, **kwargs)
+
+    def _neighbor_positions(self, after):
+        siblings = self.get_siblings().exclude(pk=self.pk).order_by("position")
+        positions = siblings.values_list("position", flat=True)
+        if after is None:
+            return None, positions.first()
+        return after.position, positions.filter(position__gt=after.position).first()
+
+    @transaction.atomic
+    def move_after(self, after=None):
+        """Move this object right after the sibling `after` (or to the front if
+        None). Updates a single row unless the siblings need to be rebalanced.
+        """
+        if after is not None and after.pk == self.pk:
+            return
+        position = position_between(*self._neighbor_positions(after))
+        if position is None:
+            rebalance_positions(self.get_siblings())
+            if after is not None:
+                after.refresh_from_db(fields=["position"])
+            position = position_between(*self._neighbor_positions(after))
+
+        self.position = position
+        self.get_position_model()._base_manager.filter(pk=self.pk).update(
+            position=position
+        )
+        self.positions_changed(self.get_position_scope_value())
+
+    def move_up(self):
+        previous = list(
+            self.get_siblings()
+            .filter(position__lt=self.position)
+            .order_by("-position")[:2]
+        )
+        if previous:
+            self.move_after(previous[1] if len(previous) == 2 else None)
+
+    def move_down(self):
+        following = (
+            self.get_siblings()
+            .filter(position__gt=self.position)
+            .order_by("position")
+            .first()
+        )
+        if following:
+            self.move_after(following)
+
+
+def rebalance_positions(siblings):
+    """Renumber `siblings` (a queryset of one group) with even gaps."""
+    with transaction.atomic():
+        pks = list(
+            siblings.select_for_update()
+            .order_by("position", "pk")
+            .values_list("pk", flat=True)
+        )
+        for i, pk in enumerate(pks, start=1):
+            siblings.model._base_manager.filter(pk=pk).update(position=i * POSITION_GAP)
+    return len(pks)
+
+
+def rebalance_crowded_groups(model, threshold=REBALANCE_THRESHOLD):
+    """Rebalance every group of `model` where two neighbors are closer than
+    `threshold`. Meant to run periodically in the background (e.g., via cron).
+
+    :return: number of groups rebalanced
+    """
+    scope = model._meta.get_field(model.position_scope).attname
+    rows = model._base_manager.order_by(scope, "position").values_list(
+        scope, "position"
+    )
+
+    crowded = set()
+    previous_scope, previous_position = object(), None
+    for scope_value, position in rows.iterator():
+        if scope_value == previous_scope and position - previous_position < threshold:
+            crowded.add(scope_value)
+        previous_scope, previous_position = scope_value, position
+
+    for scope_value in crowded:
+        with transaction.atomic():
+            rebalance_positions(model._base_manager.filter(**{scope: scope_value}))
+            model.positions_changed(scope_value)
+    return len(crowded)
+
+
+def assign_positions(objs):
+    """Append unsaved `objs` (of one model) after their siblings, in order, for
+    bulk inserts (which skip `PositionedModel.save`).
+    """
+    last_positions = dict()
+    for obj in objs:
+        if obj.position is not None:
+            continue
+        scope_value = obj.get_position_scope_value()
+        if scope_value not in last_positions:
+            last_positions[scope_value] = (
+                obj.get_siblings()
+                .order_by("-position")
+                .values_list("position", flat=True)
+                .first()
+            )
+        obj.position = position_between(last_positions[scope_value], None)
+        last_positions[scope_value] = obj.position
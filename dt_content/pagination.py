@@ -0,0 +1,129 @@
+"""Keyset ("seek") pagination of the console lists.
+
+OFFSET pagination makes the database scan and discard every row before the
+page, and `Paginator` also counts all rows. Pages are instead selected with a
+WHERE clause on the ordering key of the last row of the previous page (the
+cursor, passed as `?after=`), which the index of the ordering key serves
+directly, however deep the page. The ordering key must be unique (e.g., end
+with the primary key).
+
+Cursors only lead forward (there is a link to the first page instead of page
+numbers).
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import connections
+from django.db.models import Q
+
+CURSOR_PARAM = "after"
+
+
+def encode_cursor(values):
+    data = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, length):
+    """Values of the ordering key encoded in `cursor` (see `encode_cursor`)."""
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(data.decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise SuspiciousOperation("Invalid cursor: {}".format(cursor))
+    if not isinstance(values, list) or len(values) != length:
+        raise SuspiciousOperation("Invalid cursor: {}".format(cursor))
+    return values
+
+
+def _equal(field, value):
+    if value is None:
+        return Q(**{"{}__isnull".format(field): True})
+    return Q(**{field: value})
+
+
+def _after(field, value, nulls_largest):
+    # Follows the position of NULLs in ascending order of the database
+    if value is None:
+        if nulls_largest:
+            return Q(pk__in=[])
+        return Q(**{"{}__isnull".format(field): False})
+    after = Q(**{"{}__gt".format(field): value})
+    if nulls_largest:
+        after |= Q(**{"{}__isnull".format(field): True})
+    return after
+
+
+def keyset_filter(fields, values, using):
+    """Condition that selects the rows after `values` in ascending order of
+    `fields` (lexicographically, as the database orders them).
+    """
+    nulls_largest = connections[using].features.nulls_order_largest
+    condition = Q(pk__in=[])
+    for i, (field, value) in enumerate(zip(fields, values)):
+        term = _after(field, value, nulls_largest)
+        for previous_field, previous_value in zip(fields[:i], values[:i]):
+            term &= _equal(previous_field, previous_value)
+        condition |= term
+    return condition
+
+
+class KeysetPage:
+    def __init__(self, object_list, cursor, next_cursor):
+        self.object_list = object_list
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginate_keyset(queryset, fields, cursor, per_page, load=list):
+    """Page of `queryset` (ordered by `fields`) after `cursor`, in one query.
+
+    :param load: evaluates the sliced queryset into the objects of the page
+    """
+    queryset = queryset.order_by(*fields)
+    if cursor:
+        values = decode_cursor(cursor, len(fields))
+        queryset = queryset.filter(keyset_filter(fields, values, queryset.db))
+    # One more row tells whether there is a next page
+    object_list = load(queryset[: per_page + 1])
+    next_cursor = None
+    if len(object_list) > per_page:
+        object_list = object_list[:per_page]
+        last = object_list[-1]
+        next_cursor = encode_cursor([getattr(last, field) for field in fields])
+    return KeysetPage(object_list, cursor or None, next_cursor)
+
+
+class KeysetPaginationMixin:
+    """Keyset pagination for a `ListView`, by `keyset_fields` (unique together).
+    The page is `page_obj` (a `KeysetPage`) in the context.
+    """
+
+    keyset_fields = ("pk",)
+
+    def load_page(self, queryset):
+        return list(queryset)
+
+    def paginate_queryset(self, queryset, page_size):
+        page = paginate_keyset(
+            queryset,
+            self.keyset_fields,
+            self.request.GET.get(CURSOR_PARAM),
+            page_size,
+            self.load_page,
+        )
+        return None, page, page.object_list, page.has_next() or page.has_previous()
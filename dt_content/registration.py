@@ -0,0 +1,183 @@
+"""Deferred registration of the objects that templates refer to.
+
+Template tags such as `{% blurb %}` need an object for each identifier, and
+missing objects used to be created while rendering, so page loads wrote to the
+database. Tags now render an unsaved instance instead and queue it with
+`register` (and queue corrections, such as the type of a blurb, with
+`register_update`), which keeps rendering read-only.
+
+The queue of each thread is flushed once the response has been sent (see
+`dt_content.signals`). Outside of requests (e.g., in management commands or
+tasks), render templates within `flushing()`, which flushes the queue at the
+end. A queue that reaches `settings.REGISTRATION_QUEUE_SIZE` objects is also
+flushed right away, so that it never grows unbounded.
+
+Objects are inserted with a bulk insert per model that skips identifiers that
+exist already (e.g., registered by another worker in the meantime), which relies
+on a unique constraint on the identifying fields. Bulk queries send no model
+signals, so `objects_registered` is sent instead.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import Q
+from django.dispatch import Signal
+
+from . import settings
+from .ordering import PositionedModel, assign_positions
+
+# Sent with the model as the sender after objects have been registered, with
+# `lookup`, a Q of the registered objects (None when the sender does not tell,
+# e.g., bulk loads)
+objects_registered = Signal()
+
+_local = threading.local()
+
+
+class RegistrationQueue:
+    def __init__(self):
+        # (model, identifying fields) -> {identifying values: unsaved instance}
+        self.objects = dict()
+        # (model, field values) -> set of pks
+        self.updates = dict()
+
+    def __len__(self):
+        return sum(len(group) for group in self.objects.values()) + sum(
+            len(pks) for pks in self.updates.values()
+        )
+
+    def add(self, obj, fields):
+        values = tuple(getattr(obj, field) for field in fields)
+        group = self.objects.setdefault((type(obj), tuple(fields)), dict())
+        group.setdefault(values, obj)
+
+    def add_update(self, obj, values):
+        key = (type(obj), tuple(sorted(values.items())))
+        self.updates.setdefault(key, set()).add(obj.pk)
+
+    def flush(self):
+        lookups = dict()  # model -> lookup of the registered objects
+        for (model, fields), group in self.objects.items():
+            using = router.db_for_write(model)
+            objs = list(group.values())
+            with transaction.atomic(using=using):
+                _insert(model, fields, objs, using)
+            lookups[model] = lookups.get(model, Q()) | _get_lookup(fields, objs)
+        for (model, values), pks in self.updates.items():
+            model._base_manager.using(router.db_for_write(model)).filter(
+                pk__in=pks
+            ).update(**dict(values))
+            lookups[model] = lookups.get(model, Q()) | Q(pk__in=pks)
+
+        for model, lookup in lookups.items():
+            objects_registered.send(sender=model, lookup=lookup)
+
+
+def _get_lookup(fields, objs):
+    """Q of the rows identified by the values of `fields` of `objs`."""
+    lookup = Q()
+    for obj in objs:
+        lookup |= Q(**{field: getattr(obj, field) for field in fields})
+    return lookup
+
+
+def _insert(model, fields, objs, using):
+    if issubclass(model, PositionedModel):
+        assign_positions(objs)
+
+    if not model._meta.parents:
+        model._base_manager.using(using).bulk_create(objs, ignore_conflicts=True)
+        return
+
+    # Multi-table inheritance (e.g., ContentBlock subclasses): bulk insert the
+    # parent rows, then insert the missing child rows one by one
+    ((parent_model, parent_link),) = model._meta.parents.items()
+    parent_fields = [
+        field for field in parent_model._meta.concrete_fields if not field.primary_key
+    ]
+    parents = [
+        parent_model(
+            **{field.attname: getattr(obj, field.attname) for field in parent_fields}
+        )
+        for obj in objs
+    ]
+    parent_model._base_manager.using(using).bulk_create(parents, ignore_conflicts=True)
+
+    lookup = _get_lookup(fields, objs)
+    objs_by_values = {
+        tuple(getattr(obj, field) for field in fields): obj for obj in objs
+    }
+    existing_pks = set(
+        model._base_manager.using(using).filter(lookup).values_list("pk", flat=True)
+    )
+    parent_rows = (
+        parent_model._base_manager.using(using)
+        .filter(lookup)
+        .values_list("pk", *fields)
+    )
+    for parent_pk, *values in parent_rows:
+        obj = objs_by_values.get(tuple(values))
+        if obj is None or parent_pk in existing_pks:
+            continue
+        setattr(obj, parent_link.attname, parent_pk)
+        try:
+            with transaction.atomic(using=using):
+                obj.save_base(raw=True, force_insert=True, using=using)
+        except IntegrityError:
+            # Registered by another worker in the meantime
+            pass
+
+
+def get_queue():
+    queue = getattr(_local, "queue", None)
+    if queue is None:
+        queue = _local.queue = RegistrationQueue()
+    return queue
+
+
+def register(obj, *fields):
+    """Queue the unsaved `obj`, identified by the values of `fields`, to be
+    created unless it exists by then.
+    """
+    queue = get_queue()
+    queue.add(obj, fields)
+    _flush_if_full(queue)
+
+
+def register_update(obj, **values):
+    """Queue an update of the fields of the saved `obj` to `values`."""
+    queue = get_queue()
+    queue.add_update(obj, values)
+    _flush_if_full(queue)
+
+
+def _flush_if_full(queue):
+    if len(queue) >= settings.REGISTRATION_QUEUE_SIZE:
+        flush()
+
+
+def flush():
+    """Write the objects queued by the current thread."""
+    queue = getattr(_local, "queue", None)
+    _local.queue = None
+    if queue:
+        try:
+            queue.flush()
+        except Exception:
+            # The response may have been sent already. Missing objects are
+            # queued again by the next render.
+            logging.exception("Failed to register template objects")
+
+
+@contextmanager
+def flushing():
+    """Flush the objects queued within the block (e.g., by templates rendered
+    outside of requests, where nothing else flushes the queue).
+    """
+    try:
+        yield
+    finally:
+        flush()
@@ -0,0 +1,132 @@
+"""Persistent index of the generated renditions of images.
+
+Checking whether a rendition exists costs a storage stat per rendition (a
+network request with remote storages). Generated renditions are instead recorded
+in the `Rendition` table, keyed by source image and size key, along with the
+modification time of the source image when they were generated. Each process
+caches the index entries of the images it renders, so building the URLs of
+renditions at render time (`get_available_widths`) usually costs no query and
+no stat.
+
+The storage is only checked for renditions missing from the index (e.g., those
+generated in the background after an upload, see `dt_content.warming`). Found
+renditions are queued for the index (see `dt_content.registration`), so that
+rendering never writes to the database. The result of the check is cached until
+the index changes (e.g., once warming or the queue adds renditions).
+"""
+
+from django.db import transaction
+
+from . import registration, settings
+from .cache import GenerationCache, get_generation
+from .loaders import IN_BATCH_SIZE
+from .models import Rendition
+from .renditions import build_responsive_image, find_renditions, get_rendition_spec
+
+NAMESPACE = "dt_content.rendition"
+
+_cache = GenerationCache(NAMESPACE, settings.RENDITION_INDEX_CACHE_SIZE)
+
+# Widths found in the storage, by image name and widths missing from the index
+_storage_cache = GenerationCache(NAMESPACE, settings.RENDITION_INDEX_CACHE_SIZE)
+
+
+def get_index_generation():
+    """Generation of the index, which changes whenever renditions are added (e.g.,
+    to version cached fragments that use renditions).
+    """
+    return get_generation(NAMESPACE)
+
+
+def _fetch_specs(names):
+    specs = {name: set() for name in names}
+    for i in range(0, len(names), IN_BATCH_SIZE):
+        rows = Rendition.objects.filter(
+            source_name__in=names[i : i + IN_BATCH_SIZE]
+        ).values_list("source_name", "spec")
+        for source_name, spec in rows:
+            specs[source_name].add(spec)
+    return {name: frozenset(name_specs) for name, name_specs in specs.items()}
+
+
+def get_indexed_specs(names):
+    """Size keys of the indexed renditions of each image of `names` (in one query
+    for the images that are not cached), as a dict by name.
+    """
+    return _cache.get_many_or_set(list(names), _fetch_specs)
+
+
+def invalidate_index():
+    """Invalidate the cached index entries in all processes (after the current
+    transaction).
+    """
+    _cache.invalidate()
+
+
+def add_renditions(name, source_mtime, widths):
+    """Record the renditions of `widths` of image `name`, generated from the
+    version of the image modified at `source_mtime`.
+    """
+    specs = [get_rendition_spec(width) for width in widths]
+    if not specs:
+        return
+    with transaction.atomic():
+        Rendition.objects.filter(source_name=name, spec__in=specs).delete()
+        # Ignore the rows inserted by concurrent lookups of the same image
+        Rendition.objects.bulk_create(
+            [
+                Rendition(source_name=name, spec=spec, source_mtime=source_mtime)
+                for spec in specs
+            ],
+            ignore_conflicts=True,
+        )
+    invalidate_index()
+
+
+def get_available_widths(name, storage, width, widths, indexed_specs=None):
+    """Widths (of `widths`) of the existing renditions of image `name` of `width`
+    pixels. Only the renditions that are missing from the index are checked in
+    the storage. Reads the database only.
+
+    :param indexed_specs: indexed size keys of the image, if already fetched with
+        `get_indexed_specs`
+    """
+    if indexed_specs is None:
+        indexed_specs = get_indexed_specs([name])[name]
+    widths = [w for w in widths if w < width]  # images are never scaled up
+    available = [w for w in widths if get_rendition_spec(w) in indexed_specs]
+    missing = [w for w in widths if w not in available]
+    if missing:
+
+        def check_storage():
+            try:
+                source_mtime, found = find_renditions(name, storage, missing)
+            except OSError:
+                return []
+            for found_width in found:
+                rendition = Rendition(
+                    source_name=name,
+                    spec=get_rendition_spec(found_width),
+                    source_mtime=source_mtime,
+                )
+                registration.register(rendition, "source_name", "spec")
+            return found
+
+        available.extend(
+            _storage_cache.get_or_set((name, tuple(missing)), check_storage)
+        )
+    return sorted(available)
+
+
+def get_srcset(field_file, width, height, widths):
+    """`srcset` of the image of an image field (of `width`x`height` pixels) with
+    its renditions of `widths` that exist (see `get_available_widths`), empty if
+    there is no image or no widths.
+    """
+    if not field_file or not width or not widths:
+        return ""
+    name, storage = field_file.name, field_file.storage
+    available_widths = get_available_widths(name, storage, width, widths)
+    return build_responsive_image(
+        name, storage, width, height, widths, available_widths
+    ).srcset
@@ -0,0 +1,250 @@
+"""Size-bounded renditions of uploaded images, for responsive `<img>` tags.
+
+Renditions are generated with the VersatileImageField sizing API (in the same
+`__sized__` directory of the storage as the renditions of VersatileImageFields),
+so generating them again is a no-op (unless the source image has changed). The
+renditions used at render time are looked up in `dt_content.rendition_index`.
+"""
+import base64
+import logging
+import posixpath
+from collections import namedtuple
+from io import BytesIO
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings as django_settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+from versatileimagefield.datastructures import SizedImage
+from versatileimagefield.registry import versatileimagefield_registry
+from versatileimagefield.settings import VERSATILEIMAGEFIELD_SIZED_DIRNAME
+
+from . import settings
+
+# Longest side (in pixels) and JPEG quality of placeholder thumbnails
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 50
+
+EXIF_ORIENTATION = 274
+# EXIF orientations that swap the width and the height
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+ResponsiveImage = namedtuple("ResponsiveImage", ["src", "srcset", "width", "height"])
+# Low-quality image placeholder: a tiny JPEG thumbnail (as a data URI) and the
+# average color of the image (e.g., "#a0b1c2"), shown until the image loads
+Placeholder = namedtuple("Placeholder", ["data_uri", "color"])
+# Size of a source image, its modification time, and the widths of its renditions
+GeneratedRenditions = namedtuple(
+    "GeneratedRenditions", ["width", "height", "source_mtime", "widths"]
+)
+
+
+class BoundedImage(SizedImage):
+    """Scales an image down (never up) to fit within `width`x`height`. A height of
+    0 does not bound the height (e.g., `bounded__480x0`).
+
+    Same as the `thumbnail` sizer of versatileimagefield, which relies on
+    `Image.ANTIALIAS` (removed in Pillow 10).
+    """
+
+    filename_key = "bounded"
+
+    def process_image(self, image, image_format, save_kwargs, width, height):
+        imagefile = BytesIO()
+        image.thumbnail((width, height or image.height), Image.LANCZOS)
+        image.save(imagefile, **save_kwargs)
+        return imagefile
+
+
+versatileimagefield_registry.register_sizer("bounded", BoundedImage)
+
+
+def get_rendition_key(width):
+    """Size key of the `BoundedImage` rendition of `width` pixels."""
+    return "{}x0".format(width)
+
+
+def get_rendition_spec(width):
+    """Size key (including the sizer) of the rendition of `width` pixels."""
+    return "bounded__{}".format(get_rendition_key(width))
+
+
+def get_media_name(url):
+    """Name (in the default storage) of the uploaded file at `url`, or None if
+    `url` is not under MEDIA_URL or is itself a rendition.
+    """
+    media_url = django_settings.MEDIA_URL
+    if not url or not media_url or not url.startswith(media_url):
+        return None
+    name = unquote(urlsplit(url[len(media_url) :]).path)
+    if not name or posixpath.normpath(name) != name or name.startswith("../"):
+        return None
+    if name.split("/", 1)[0] == VERSATILEIMAGEFIELD_SIZED_DIRNAME:
+        return None
+    return name
+
+
+def get_image_size(name, storage=default_storage):
+    """(width, height) of an image as displayed (after EXIF rotation)."""
+    with storage.open(name, "rb") as image_file:
+        image = Image.open(image_file)
+        width, height = image.size
+        if image.getexif().get(EXIF_ORIENTATION) in TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+    return width, height
+
+
+def get_placeholder(name, storage=default_storage):
+    """`Placeholder` of image `name` (empty for images with transparency, which
+    would show the placeholder through).
+    """
+    with storage.open(name, "rb") as image_file:
+        image = Image.open(image_file)
+        # Decode JPEGs at a fraction of their size
+        image.draft("RGB", (PLACEHOLDER_SIZE * 8, PLACEHOLDER_SIZE * 8))
+        if "A" in image.getbands() or "transparency" in image.info:
+            return Placeholder("", "")
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.LANCZOS)
+
+    red, green, blue = image.resize((1, 1), Image.BOX).getpixel((0, 0))
+    imagefile = BytesIO()
+    image.save(imagefile, "JPEG", quality=PLACEHOLDER_QUALITY, optimize=True)
+    return Placeholder(
+        "data:image/jpeg;base64,{}".format(
+            base64.b64encode(imagefile.getvalue()).decode("ascii")
+        ),
+        "#{:02x}{:02x}{:02x}".format(red, green, blue),
+    )
+
+
+def get_field_placeholder(field_file):
+    """`Placeholder` of the (stored) image of an image field, empty if there is
+    none or it cannot be read.
+    """
+    if not field_file:
+        return Placeholder("", "")
+    try:
+        return get_placeholder(field_file.name, field_file.storage)
+    except OSError:
+        logging.warning("Could not generate a placeholder for {}".format(field_file))
+        return Placeholder("", "")
+
+
+def get_placeholder_style(data_uri, color):
+    """Inline CSS that shows a placeholder as the background of an `<img>`."""
+    if not color:
+        return ""
+    style = "background-color: {};".format(color)
+    if data_uri:
+        style += " background-image: url({}); background-size: cover;".format(data_uri)
+    return style
+
+
+def _get_modified_time(storage, name):
+    try:
+        return storage.get_modified_time(name)
+    except NotImplementedError:
+        return None
+
+
+def _is_fresh(storage, rendition_name, source_mtime):
+    """Whether a rendition exists and is not older than its source image."""
+    if not storage.exists(rendition_name):
+        return False
+    mtime = _get_modified_time(storage, rendition_name)
+    return source_mtime is None or mtime is None or mtime >= source_mtime
+
+
+def find_renditions(name, storage, widths):
+    """Check the storage for the renditions of image `name` of `widths`.
+
+    :return: the modification time of the image (None if the storage does not
+        support it), and the widths of the renditions that are up to date
+    """
+    source_mtime = _get_modified_time(storage, name)
+    sized_image = BoundedImage(name, storage, create_on_demand=False)
+    found = [
+        width
+        for width in widths
+        if _is_fresh(storage, sized_image[get_rendition_key(width)].name, source_mtime)
+    ]
+    return source_mtime, found
+
+
+def generate_renditions(name, storage=default_storage, widths=None):
+    """Generate the missing or outdated renditions of image `name` for each of
+    `widths` (default: `settings.RESPONSIVE_IMAGE_WIDTHS`) below its width. Only
+    accesses the storage.
+
+    :return: `GeneratedRenditions` of the image
+    """
+    width, height = get_image_size(name, storage)
+    widths = [w for w in widths or settings.RESPONSIVE_IMAGE_WIDTHS if w < width]
+    source_mtime, found = find_renditions(name, storage, widths)
+    sized_image = BoundedImage(name, storage, create_on_demand=False)
+    for rendition_width in widths:
+        if rendition_width in found:
+            continue
+        rendition_name = sized_image[get_rendition_key(rendition_width)].name
+        if storage.exists(rendition_name):
+            storage.delete(rendition_name)  # outdated
+        sized_image.create_resized_image(name, rendition_name, rendition_width, 0)
+    return GeneratedRenditions(width, height, source_mtime, widths)
+
+
+def build_responsive_image(
+    name, storage, width, height, widths=None, available_widths=None
+):
+    """`ResponsiveImage` of image `name` of `width`x`height` pixels, with the
+    renditions of `widths` (see `generate_renditions`). Does not access the
+    storage, nor generate the renditions.
+
+    There is a rendition for each of `widths` below the width of the image, or
+    only for those of `available_widths` if given. The image itself is a
+    candidate too, unless it is wider than all `widths` (and none of its
+    renditions are missing). `src` is the widest candidate.
+    """
+    widths = sorted(widths or settings.RESPONSIVE_IMAGE_WIDTHS)
+    rendition_widths = [w for w in widths if w < width]
+    if available_widths is not None:
+        missing = [w for w in rendition_widths if w not in available_widths]
+        rendition_widths = [w for w in rendition_widths if w in available_widths]
+    else:
+        missing = []
+
+    sized_image = BoundedImage(name, storage, create_on_demand=False)
+    candidates = [(sized_image[get_rendition_key(w)].url, w) for w in rendition_widths]
+    if width <= widths[-1] or missing:
+        candidates.append((storage.url(name), width))
+
+    src, src_width = candidates[-1]
+    return ResponsiveImage(
+        src=src,
+        srcset=", ".join("{} {}w".format(url, w) for url, w in candidates),
+        width=src_width,
+        height=max(round(height * src_width / width), 1),
+    )
+
+
+def get_responsive_image(name, storage=default_storage, widths=None):
+    """Generate the missing renditions of image `name` and return its
+    `ResponsiveImage`.
+    """
+    width, height, _, _ = generate_renditions(name, storage, widths)
+    return build_responsive_image(name, storage, width, height, widths)
+
+
+def get_responsive_image_for_url(url):
+    """`ResponsiveImage` of the uploaded image at `url`, or None for other URLs
+    (e.g., external or data URIs) and files that are not (readable) images.
+    """
+    name = get_media_name(url)
+    if name is None:
+        return None
+    try:
+        return get_responsive_image(name)
+    except (OSError, SuspiciousFileOperation):
+        logging.warning("Could not generate renditions of {}".format(url))
+        return None
@@ -0,0 +1,297 @@
+"""Full-text search of dt_content objects (for the console), with SQLite FTS5.
+
+Blurbs, rich text blocks, menus and static content sections are indexed in the
+`dt_content_search` FTS5 table (created by a migration, on SQLite only), with
+their title, keywords (identifiers, slugs and locations) and the text of their
+content. Results are ranked by BM25, with matches in the title ranking highest,
+and come with a highlighted snippet of the content.
+
+The index is kept in sync by `dt_content.signals` (saves, deletes and bulk
+registrations), and by the bulk loads of `dt_content.transfer` and
+`dt_content.snapshot`. Other bulk writes that bypass signals (e.g.,
+`QuerySet.update`) are not indexed until `manage.py rebuild_search_index` is run
+(with `--missing` to only add the objects missing from the index).
+
+Each object has a single row, whose rowid is derived from its type and primary
+key, so that it is updated without scanning the index.
+"""
+
+import re
+from collections import namedtuple
+from html import unescape
+from itertools import islice
+
+from django.apps import apps as global_apps
+from django.db import OperationalError, connections, router, transaction
+from django.urls import reverse
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+from .loaders import IN_BATCH_SIZE
+
+TABLE = "dt_content_search"
+
+# Marks the matches in snippets (control characters, which do not occur in
+# content and survive escaping)
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+# Tokens around the matches in snippets
+SNIPPET_TOKENS = 16
+
+# Weights of the title, keywords and body columns in the ranking
+COLUMN_WEIGHTS = (10.0, 5.0, 1.0)
+
+Document = namedtuple("Document", ["url", "title", "keywords", "body"])
+SearchResult = namedtuple("SearchResult", ["type_name", "title", "url", "snippet"])
+
+
+def _text(html):
+    return unescape(strip_tags(html or ""))
+
+
+def _blurb_document(blurb):
+    return Document(
+        url=reverse("dt-content:blurb-update", args=[blurb.pk]),
+        title=blurb.label or blurb.identifier or "",
+        keywords=" ".join(filter(None, [blurb.identifier, blurb.last_known_location])),
+        body=_text(blurb.content),
+    )
+
+
+def _rich_text_block_document(block):
+    return Document(
+        url=reverse("dt-content:rich-text-block-update", args=[block.pk]),
+        title=block.key or "",
+        keywords=block.static_location or "",
+        body=_text(block.content),
+    )
+
+
+def _menu_document(menu):
+    if menu.parent_id:
+        url = reverse("dt-content:submenu-update", args=[menu.pk])
+    else:
+        url = reverse("dt-content:menu-update", args=[menu.pk])
+    return Document(
+        url=url,
+        title=menu.title,
+        keywords=" ".join(filter(None, [menu.url_slug, menu.redirect_to])),
+        body="",
+    )
+
+
+def _content_section_document(section):
+    return Document(
+        url=reverse("dt-content:content-section-update", args=[section.pk]),
+        title=section.key,
+        keywords=section.static_location or "",
+        body="",
+    )
+
+
+# Indexed models: (model label, type name, lookup of the indexed objects,
+# document of an object). The position of each model is part of the rowids.
+SEARCH_TYPES = (
+    ("dt_content.Blurb", "Blurb", dict(), _blurb_document),
+    ("dt_content.RichTextBlock", "Rich Text Block", dict(), _rich_text_block_document),
+    ("dt_content.Menu", "Menu", dict(), _menu_document),
+    # Menu-bound sections are found through their menus
+    (
+        "dt_content.ContentSection",
+        "Static Section",
+        dict(menu=None),
+        _content_section_document,
+    ),
+)
+
+_available = dict()
+
+
+def is_available(using):
+    """Whether the search index exists in database `using` (memoized)."""
+    if using not in _available:
+        connection = connections[using]
+        _available[using] = (
+            connection.vendor == "sqlite"
+            and TABLE in connection.introspection.table_names()
+        )
+    return _available[using]
+
+
+def _get_search_type(model):
+    for type_index, (label, type_name, lookup, get_document) in enumerate(SEARCH_TYPES):
+        if model._meta.label == label:
+            return type_index, lookup, get_document
+    return None
+
+
+def _rowid(type_index, pk):
+    return pk * len(SEARCH_TYPES) + type_index
+
+
+def _is_indexed(instance, lookup):
+    return all(
+        getattr(instance, instance._meta.get_field(field).attname) == value
+        for field, value in lookup.items()
+    )
+
+
+def _insert_rows(cursor, rows):
+    cursor.executemany(
+        "INSERT INTO {} (rowid, url, title, keywords, body) "
+        "VALUES (%s, %s, %s, %s, %s)".format(TABLE),
+        rows,
+    )
+
+
+def index_objects(model, objs, using=None):
+    """Add (or update) objects of an indexed model in the index."""
+    search_type = _get_search_type(model)
+    using = using or router.db_for_write(model)
+    if search_type is None or not is_available(using):
+        return
+    type_index, lookup, get_document = search_type
+    objs = list(objs)
+    rowids = [(_rowid(type_index, obj.pk),) for obj in objs]
+    rows = [
+        (_rowid(type_index, obj.pk), *get_document(obj))
+        for obj in objs
+        if _is_indexed(obj, lookup)
+    ]
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.executemany("DELETE FROM {} WHERE rowid = %s".format(TABLE), rowids)
+        _insert_rows(cursor, rows)
+
+
+def unindex_objects(model, pks, using=None):
+    """Remove objects of an indexed model from the index."""
+    search_type = _get_search_type(model)
+    using = using or router.db_for_write(model)
+    if search_type is None or not is_available(using):
+        return
+    type_index = search_type[0]
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            "DELETE FROM {} WHERE rowid = %s".format(TABLE),
+            [(_rowid(type_index, pk),) for pk in pks],
+        )
+
+
+def index_matching_objects(model, lookup, using=None):
+    """Add (or update) the objects of an indexed model that match `lookup` (e.g.,
+    after a bulk insert).
+    """
+    search_type = _get_search_type(model)
+    using = using or router.db_for_write(model)
+    if search_type is None or not is_available(using):
+        return
+    index_objects(model, model._base_manager.using(using).filter(lookup), using)
+
+
+def index_missing_objects(model, using=None):
+    """Add the objects of an indexed model that are missing from the index. This
+    reads every row of the model and of its part of the index.
+
+    :return: number of indexed objects
+    """
+    search_type = _get_search_type(model)
+    using = using or router.db_for_write(model)
+    if search_type is None or not is_available(using):
+        return 0
+    type_index, lookup, _ = search_type
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT rowid FROM {} WHERE rowid %% %s = %s".format(TABLE),
+            [len(SEARCH_TYPES), type_index],
+        )
+        indexed_pks = {(rowid - type_index) // len(SEARCH_TYPES) for rowid, in cursor}
+    pks = set(
+        model._base_manager.using(using).filter(**lookup).values_list("pk", flat=True)
+    )
+    missing = sorted(pks - indexed_pks)
+    for i in range(0, len(missing), IN_BATCH_SIZE):
+        batch = missing[i : i + IN_BATCH_SIZE]
+        index_objects(
+            model, model._base_manager.using(using).filter(pk__in=batch), using
+        )
+    return len(missing)
+
+
+def rebuild_index(using=None, batch_size=1000, apps=global_apps):
+    """Index all objects again, in one transaction.
+
+    :param apps: app registry of the models (e.g., of a migration)
+    :return: number of indexed objects
+    """
+    using = using or router.db_for_write(apps.get_model(SEARCH_TYPES[0][0]))
+    count = 0
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute("DELETE FROM {}".format(TABLE))
+        for type_index, (label, _, lookup, get_document) in enumerate(SEARCH_TYPES):
+            model = apps.get_model(label)
+            objs = (
+                model._base_manager.using(using)
+                .filter(**lookup)
+                .order_by("pk")
+                .iterator(chunk_size=batch_size)
+            )
+            for batch in iter(lambda: list(islice(objs, batch_size)), []):
+                _insert_rows(
+                    cursor,
+                    [(_rowid(type_index, obj.pk), *get_document(obj)) for obj in batch],
+                )
+                count += len(batch)
+        # Merge the segments written by the inserts
+        cursor.execute("INSERT INTO {0} ({0}) VALUES ('optimize')".format(TABLE))
+    return count
+
+
+def get_match_query(query):
+    """FTS5 query of the rows that contain all the words of `query` (as prefixes),
+    which never has syntax errors. Empty if `query` has no words.
+    """
+    words = re.findall(r"\w+", query)
+    return " ".join('"{}"*'.format(word) for word in words)
+
+
+def _highlight(text):
+    return mark_safe(
+        escape(text).replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+    )
+
+
+def search(query, using=None, limit=50):
+    """Objects that match `query`, best first, as `SearchResult`s (the snippet is
+    HTML, with the matches in `<mark>`).
+    """
+    using = using or router.db_for_read(global_apps.get_model(SEARCH_TYPES[0][0]))
+    match_query = get_match_query(query)
+    if not match_query or not is_available(using):
+        return []
+    sql = (
+        "SELECT rowid, title, url, "
+        "snippet({table}, 3, %s, %s, '…', {tokens}) "
+        "FROM {table} WHERE {table} MATCH %s "
+        "ORDER BY bm25({table}, 0, {weights}) LIMIT %s"
+    ).format(
+        table=TABLE,
+        tokens=SNIPPET_TOKENS,
+        weights=", ".join(str(weight) for weight in COLUMN_WEIGHTS),
+    )
+    with connections[using].cursor() as cursor:
+        try:
+            cursor.execute(sql, [MATCH_START, MATCH_END, match_query, limit])
+        except OperationalError:
+            # e.g., FTS5 is not available in this build of SQLite
+            return []
+        rows = cursor.fetchall()
+    return [
+        SearchResult(
+            type_name=SEARCH_TYPES[rowid % len(SEARCH_TYPES)][1],
+            title=title,
+            url=url,
+            snippet=_highlight(snippet or ""),
+        )
+        for rowid, title, url, snippet in rows
+    ]
@@ -0,0 +1,71 @@
+from django.conf import settings
+
+# Cache shared by all worker processes. Generation counters that invalidate the
+# per-process caches of dt_content live here, so this should not be a
+# process-local backend (e.g., LocMemCache) in multi-process deployments.
+CACHE_ALIAS: str = getattr(settings, "DT_CONTENT_CACHE_ALIAS", "default")
+
+# Timeout (in seconds) of rendered navbar/footer fragments. Fragments are also
+# invalidated whenever menus change.
+FRAGMENT_CACHE_TIMEOUT: int = getattr(
+    settings, "DT_CONTENT_FRAGMENT_CACHE_TIMEOUT", 60 * 60
+)
+
+# Maximum number of blurbs (and of image blurbs) cached by identifier in each
+# process, including identifiers that do not exist
+BLURB_CACHE_SIZE: int = getattr(settings, "DT_CONTENT_BLURB_CACHE_SIZE", 1024)
+
+# Widths (in pixels) of the renditions of images uploaded in rich text content.
+# Images are never scaled up, and `src` is the widest rendition.
+RESPONSIVE_IMAGE_WIDTHS: list = getattr(
+    settings, "DT_CONTENT_RESPONSIVE_IMAGE_WIDTHS", [480, 960, 1440]
+)
+
+# `sizes` attribute of images in rich text content (the width of the content
+# column of the default templates)
+RESPONSIVE_IMAGE_SIZES: str = getattr(
+    settings, "DT_CONTENT_RESPONSIVE_IMAGE_SIZES", "(min-width: 1200px) 1110px, 100vw"
+)
+
+# Widths (in pixels) of the renditions generated ahead of time ("warmed") for
+# uploaded images, by image field ("app_label.Model.field"). See
+# `dt_content.warming`.
+RENDITION_WIDTHS: dict = getattr(
+    settings,
+    "DT_CONTENT_RENDITION_WIDTHS",
+    {
+        "carousel.Image.image": [640, 1280, 1920],
+        "dt_content.ImageBlurb.image": RESPONSIVE_IMAGE_WIDTHS,
+    },
+)
+
+# Maximum number of images whose indexed renditions are cached in each process
+# (see `dt_content.rendition_index`)
+RENDITION_INDEX_CACHE_SIZE: int = getattr(
+    settings, "DT_CONTENT_RENDITION_INDEX_CACHE_SIZE", 4096
+)
+
+# Worker processes that generate the renditions of new uploads in the
+# background. Each process that saves images (e.g., each web worker, whatever its
+# number of threads) starts its own pool, so this multiplies with the number of
+# web workers. With 0, the renditions are generated by the process that saves the
+# image, once the upload is committed. The `warm_renditions` command uses the
+# number of CPUs instead.
+RENDITION_WARMING_PROCESSES: int = getattr(
+    settings, "DT_CONTENT_RENDITION_WARMING_PROCESSES", 0
+)
+
+# Attempts at generating the renditions of a new upload, after which they are
+# left to the `warm_renditions` command
+RENDITION_WARMING_ATTEMPTS: int = getattr(
+    settings, "DT_CONTENT_RENDITION_WARMING_ATTEMPTS", 3
+)
+
+# Objects per page of the console lists (see `dt_content.pagination`)
+CONSOLE_PAGE_SIZE: int = getattr(settings, "DT_CONTENT_CONSOLE_PAGE_SIZE", 50)
+
+# Maximum number of objects queued for registration by each thread (see
+# `dt_content.registration`). A full queue is flushed right away.
+REGISTRATION_QUEUE_SIZE: int = getattr(
+    settings, "DT_CONTENT_REGISTRATION_QUEUE_SIZE", 1000
+)
@@ -0,0 +1,88 @@
+from django.core.signals import request_finished
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import counters, registration, rendition_index, search
+from .blurbs import blurb_cache, image_blurb_cache
+from .fragments import invalidate_section_fragment
+from .menu import invalidate_menus
+from .models import Blurb, ContentBlock, ContentSection, ImageBlurb, Menu, Rendition
+
+
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+def menu_changed(sender, **kwargs):
+    invalidate_menus()
+
+
+@receiver(post_save, sender=ContentSection)
+@receiver(post_delete, sender=ContentSection)
+def content_section_changed(sender, instance, **kwargs):
+    invalidate_section_fragment(instance.pk)
+
+
+# Signals are sent with the concrete class as the sender (e.g., RichTextBlock),
+# so this receives the signals of all models and filters ContentBlocks
+@receiver(post_save)
+@receiver(post_delete)
+def content_block_changed(sender, instance, **kwargs):
+    if issubclass(sender, ContentBlock) and instance.section_id is not None:
+        invalidate_section_fragment(instance.section_id)
+
+
+@receiver(post_save, sender=Blurb)
+@receiver(post_delete, sender=Blurb)
+@receiver(registration.objects_registered, sender=Blurb)
+def blurb_changed(sender, **kwargs):
+    blurb_cache.invalidate()
+
+
+@receiver(post_save, sender=ImageBlurb)
+@receiver(post_delete, sender=ImageBlurb)
+@receiver(registration.objects_registered, sender=ImageBlurb)
+def image_blurb_changed(sender, **kwargs):
+    image_blurb_cache.invalidate()
+
+
+@receiver(registration.objects_registered, sender=Rendition)
+def renditions_registered(sender, **kwargs):
+    rendition_index.invalidate_index()
+
+
+@receiver(post_save)
+def counted_object_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.object_added(instance)
+
+
+@receiver(post_delete)
+def counted_object_deleted(sender, instance, **kwargs):
+    counters.object_deleted(sender, instance)
+
+
+@receiver(registration.objects_registered)
+def counted_objects_registered(sender, **kwargs):
+    counters.reset_counters(sender)
+
+
+# Ignored for models that are not searchable (see `dt_content.search`)
+@receiver(post_save)
+def searchable_object_saved(sender, instance, using, **kwargs):
+    search.index_objects(sender, [instance], using)
+
+
+@receiver(post_delete)
+def searchable_object_deleted(sender, instance, using, **kwargs):
+    search.unindex_objects(sender, [instance.pk], using)
+
+
+@receiver(registration.objects_registered)
+def searchable_objects_registered(sender, lookup=None, **kwargs):
+    if lookup is not None:
+        search.index_matching_objects(sender, lookup)
+
+
+@receiver(request_finished)
+def flush_registrations(sender, **kwargs):
+    # After the response has been sent, so that page loads stay read-only
+    registration.flush()
@@ -0,0 +1,568 @@
+"""Whole-site content snapshots, to promote content between environments (e.g.,
+from staging to production).
+
+A snapshot holds all menus, content sections, blocks (of any type), blurbs and
+image blurbs, identified by natural keys ("refs") instead of primary keys:
+
+```
+{
+    "version": 1,
+    "menus": [{"ref": "about/team", "parent": "about", "title": "Team", ...}],
+    "sections": [{"ref": "menu:about/team", "menu": "about/team", ...},
+                 {"ref": "static:footer", "menu": null, "key": "footer", ...}],
+    "blocks": [{"ref": "static:footer#0", "section": "static:footer",
+                "type": "rich_text_block", "content": "<p>Hi</p>", ...},
+               {"ref": "static:rich_text_block:banner", "section": null, ...}],
+    "blurbs": [{"identifier": "home/intro", "content": "<p>Hi</p>", ...}],
+    "image_blurbs": [{"identifier": "home/hero", "image": "image_blurbs/hero.jpg", ...}],
+    "media": ["image_blurbs/hero.jpg", ...]
+}
+```
+
+Menus are identified by their path, sections by their menu (or static key), the
+blocks of a section by their index in it, static blocks by their type and key,
+and blurbs by identifier (blurbs without one are not included). Snapshots are
+written with sorted keys, one field per line, so they diff well.
+
+`media` lists the uploaded files that the content refers to (images of image
+blurbs and images in rich text). Files are not part of snapshots, and are
+reported by `restore_snapshot` if missing from the storage.
+
+`restore_snapshot` compares a snapshot with the current content by ref, and only
+writes the rows that differ: deletes, then bulk updates and ordered bulk inserts
+(parents first, with primary keys allocated up front), in one transaction.
+Derived fields (e.g., rendered content) are computed again for the written rows.
+"""
+
+import re
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import router, transaction
+
+from . import models, registration, search
+from .fragments import invalidate_section_fragment
+from .loaders import IN_BATCH_SIZE, load_blocks
+from .menu import invalidate_menus
+from .models import Blurb, ContentBlock, ContentSection, ImageBlurb, Menu
+from .renditions import get_field_placeholder, get_media_name
+from .transfer import (
+    BLURB_FIELDS,
+    _bulk_create_child_rows,
+    _IdAllocator,
+    _reset_sequences,
+    get_block_fields,
+)
+from .warming import warm_on_commit
+
+SNAPSHOT_VERSION = 1
+
+# Kinds of records, in the order in which they are created
+KINDS = ("menus", "sections", "blocks", "blurbs", "image_blurbs")
+REF_FIELDS = dict(
+    menus="ref",
+    sections="ref",
+    blocks="ref",
+    blurbs="identifier",
+    image_blurbs="identifier",
+)
+# Fields that records of a kind must have (besides the ref), which may be null
+REQUIRED_FIELDS = dict(
+    menus=["parent"],
+    sections=["menu"],
+    blocks=["section", "type"],
+    blurbs=[],
+    image_blurbs=[],
+)
+
+IMG_SRC_RE = re.compile(r'<img\s[^>]*?src="([^"]*)"')
+
+# refs (of a kind) to create, to update and to delete
+Changes = namedtuple("Changes", ["created", "updated", "deleted"])
+
+
+def _menu_record(menu, path, parent_path):
+    return dict(
+        ref=path,
+        parent=parent_path,
+        title=menu.title,
+        url_slug=menu.url_slug,
+        disabled=menu.disabled,
+        redirect_to=menu.redirect_to,
+        position=menu.position,
+    )
+
+
+def _section_record(section, ref, menu_path):
+    return dict(
+        ref=ref,
+        menu=menu_path,
+        key=section.key,
+        static_location=section.static_location,
+    )
+
+
+def _block_record(block, ref, section_ref):
+    record = dict(
+        ref=ref,
+        section=section_ref,
+        type=block.type_key,
+        key=block.key,
+        disabled=block.disabled,
+        position=block.position,
+        static_location=block.static_location,
+    )
+    if type(block) is not ContentBlock:
+        for field in get_block_fields(type(block)):
+            record[field.name] = field.value_from_object(block)
+    return record
+
+
+def _blurb_record(blurb):
+    record = {
+        field: blurb._meta.get_field(field).value_from_object(blurb)
+        for field in BLURB_FIELDS[type(blurb)]
+    }
+    if isinstance(blurb, ImageBlurb):
+        record["image"] = blurb.image.name or None
+        record["ppoi"] = blurb._meta.get_field("ppoi").value_to_string(blurb)
+    return record
+
+
+def _load_state(using):
+    """Current objects with their records, as {kind: {ref: (object, record)}}."""
+    state = {kind: dict() for kind in KINDS}
+
+    menus = list(Menu.objects.using(using).order_by("pk"))
+    slugs = {menu.pk: menu.url_slug for menu in menus}
+    menu_paths = dict()
+    for menu in menus:
+        if menu.parent_id:
+            menu_paths[menu.pk] = "{}/{}".format(slugs[menu.parent_id], menu.url_slug)
+        else:
+            menu_paths[menu.pk] = menu.url_slug
+    for menu in menus:
+        path = menu_paths[menu.pk]
+        record = _menu_record(menu, path, menu_paths.get(menu.parent_id))
+        state["menus"][path] = (menu, record)
+
+    section_refs = dict()
+    for section in ContentSection.objects.using(using).order_by("pk"):
+        if section.menu_id:
+            ref = "menu:{}".format(menu_paths[section.menu_id])
+        else:
+            ref = "static:{}".format(section.key)
+        section_refs[section.pk] = ref
+        record = _section_record(section, ref, menu_paths.get(section.menu_id))
+        state["sections"][ref] = (section, record)
+
+    blocks = load_blocks(
+        ContentBlock.objects.using(using).order_by("section_id", "position", "id")
+    )
+    block_counts = dict()
+    for block in blocks:
+        if block.section_id:
+            section_ref = section_refs[block.section_id]
+            index = block_counts.get(section_ref, 0)
+            block_counts[section_ref] = index + 1
+            ref = "{}#{}".format(section_ref, index)
+        elif block.key is not None:
+            section_ref = None
+            ref = "static:{}:{}".format(block.type_key, block.key)
+        else:
+            continue  # neither in a section nor static, never rendered
+        state["blocks"][ref] = (block, _block_record(block, ref, section_ref))
+
+    for kind, model in (("blurbs", Blurb), ("image_blurbs", ImageBlurb)):
+        for blurb in model.objects.using(using).exclude(identifier=None).order_by("pk"):
+            state[kind][blurb.identifier] = (blurb, _blurb_record(blurb))
+
+    return state
+
+
+def _get_media(state):
+    names = set()
+    for _, record in state["image_blurbs"].values():
+        if record["image"]:
+            names.add(record["image"])
+    for kind in ("blocks", "blurbs"):
+        for _, record in state[kind].values():
+            for url in IMG_SRC_RE.findall(record.get("content") or ""):
+                name = get_media_name(url)
+                if name:
+                    names.add(name)
+    return sorted(names)
+
+
+def _get_sort_key(ref):
+    # By ref, with the blocks of a section by index (not "#10" before "#2")
+    section_ref, _, index = ref.rpartition("#")
+    if section_ref and index.isdigit():
+        return section_ref, int(index)
+    return ref, -1
+
+
+def dump_snapshot(using=None):
+    """Snapshot of all content (see module docstring). Records are ordered by
+    ref (not by primary key, which differs between environments).
+    """
+    state = _load_state(using or router.db_for_read(Menu))
+    data = dict(version=SNAPSHOT_VERSION, media=_get_media(state))
+    for kind in KINDS:
+        data[kind] = [
+            state[kind][ref][1] for ref in sorted(state[kind], key=_get_sort_key)
+        ]
+    return data
+
+
+def _validate_snapshot(data):
+    """Validate the structure and references of a snapshot (no queries)."""
+    if data.get("version") != SNAPSHOT_VERSION:
+        raise ValidationError(
+            "Unsupported snapshot version {}".format(data.get("version"))
+        )
+    errors = list()
+    refs = dict()
+    for kind in KINDS:
+        ref_field = REF_FIELDS[kind]
+        refs[kind] = set()
+        records = data.get(kind, [])
+        if not isinstance(records, list) or not all(
+            isinstance(record, dict) for record in records
+        ):
+            raise ValidationError("{} must be a list of objects".format(kind))
+        for i, record in enumerate(records):
+            ref = record.get(ref_field)
+            if not ref:
+                errors.append("{}[{}]: missing {}".format(kind, i, ref_field))
+            elif ref in refs[kind]:
+                errors.append("{}[{}]: duplicate {} {}".format(kind, i, ref_field, ref))
+            refs[kind].add(ref)
+            for field in REQUIRED_FIELDS[kind]:
+                if field not in record:
+                    errors.append("{}[{}]: missing {}".format(kind, i, field))
+    if errors:
+        # The checks below rely on the refs and the required fields
+        raise ValidationError(errors)
+
+    menu_records = {record["ref"]: record for record in data.get("menus", [])}
+    for record in data.get("menus", []):
+        menu = Menu(
+            title=record.get("title"),
+            url_slug=record.get("url_slug"),
+            disabled=record.get("disabled", False),
+            redirect_to=record.get("redirect_to"),
+        )
+        try:
+            menu.clean_fields(exclude=["parent", "position"])
+        except ValidationError as e:
+            for field, messages in e.message_dict.items():
+                errors.append(
+                    "menus {}: {}: {}".format(record["ref"], field, " ".join(messages))
+                )
+        parent = record["parent"]
+        if parent and parent not in menu_records:
+            errors.append("menus {}: unknown parent {}".format(record["ref"], parent))
+        elif parent and menu_records[parent]["parent"]:
+            # As `Menu.save` enforces (bulk inserts skip it)
+            errors.append(
+                "menus {}: multi-level submenus are not supported".format(record["ref"])
+            )
+        path = "{}/{}".format(parent, menu.url_slug) if parent else menu.url_slug
+        if record["ref"] != path:
+            errors.append(
+                "menus {}: the ref must be the path {}".format(record["ref"], path)
+            )
+        if "menu:{}".format(record["ref"]) not in refs["sections"]:
+            errors.append(
+                "menus {}: missing section menu:{}".format(record["ref"], record["ref"])
+            )
+    for record in data.get("sections", []):
+        if record["menu"] and record["menu"] not in refs["menus"]:
+            errors.append(
+                "sections {}: unknown menu {}".format(record["ref"], record["menu"])
+            )
+        if record["menu"]:
+            ref = "menu:{}".format(record["menu"])
+        else:
+            ref = "static:{}".format(record.get("key"))
+        if record["ref"] != ref:
+            errors.append("sections {}: the ref must be {}".format(record["ref"], ref))
+    for record in data.get("blocks", []):
+        if record.get("section") and record["section"] not in refs["sections"]:
+            errors.append(
+                "blocks {}: unknown section {}".format(record["ref"], record["section"])
+            )
+        if record.get("type") not in models.content_block_classes:
+            errors.append(
+                "blocks {}: unknown block type {}".format(
+                    record["ref"], record.get("type")
+                )
+            )
+
+    for kind, model in (("blurbs", Blurb), ("image_blurbs", ImageBlurb)):
+        fields = BLURB_FIELDS[model] + (
+            ["image", "ppoi"] if model is ImageBlurb else []
+        )
+        for record in data.get(kind, []):
+            try:
+                blurb = model()
+                _set_fields(blurb, record, fields)
+                blurb.clean_fields(exclude=["image"])
+            except ValidationError as e:
+                errors.append(
+                    "{} {}: {}".format(
+                        kind, record.get("identifier"), " ".join(e.messages)
+                    )
+                )
+
+    if errors:
+        raise ValidationError(errors)
+
+
+def _diff(state, data):
+    changes = dict()
+    for kind in KINDS:
+        current = state[kind]
+        target = {record[REF_FIELDS[kind]]: record for record in data.get(kind, [])}
+        created = [ref for ref in target if ref not in current]
+        updated = list()
+        deleted = [ref for ref in current if ref not in target]
+        for ref, record in target.items():
+            if ref not in current or current[ref][1] == record:
+                continue
+            if kind == "blocks" and current[ref][1]["type"] != record["type"]:
+                # A block of another type replaces the block
+                created.append(ref)
+                deleted.append(ref)
+            else:
+                updated.append(ref)
+        changes[kind] = Changes(created, updated, deleted)
+    return changes
+
+
+def diff_snapshot(data, using=None):
+    """Changes that restoring snapshot `data` would make, by kind."""
+    _validate_snapshot(data)
+    return _diff(_load_state(using or router.db_for_read(Menu)), data)
+
+
+def get_missing_media(data, storage=default_storage):
+    """Files listed in the `media` of a snapshot that are not in `storage`."""
+    return [name for name in data.get("media", []) if not storage.exists(name)]
+
+
+def _set_fields(obj, record, names):
+    for name in names:
+        if name in record:
+            field = obj._meta.get_field(name)
+            setattr(obj, field.attname, field.to_python(record[name]))
+
+
+def restore_snapshot(data, using=None):
+    """Make the content match snapshot `data` (see module docstring), writing
+    only the rows that differ.
+
+    :raises ValidationError: if the snapshot is invalid (nothing is written)
+    :return: the changes made, by kind
+    """
+    _validate_snapshot(data)
+    using = using or router.db_for_write(Menu)
+    records = {
+        kind: {record[REF_FIELDS[kind]]: record for record in data.get(kind, [])}
+        for kind in KINDS
+    }
+    touched_sections = set()
+    indexed_objects = list()  # (model, objects) to index for search
+
+    with transaction.atomic(using=using):
+        state = _load_state(using)
+        changes = _diff(state, data)
+
+        def current(kind, ref):
+            return state[kind][ref][0]
+
+        # Deletes, dependents first (deleting a menu also deletes its section and
+        # blocks, which are deleted by the diff too)
+        for kind, model in (
+            ("blocks", ContentBlock),
+            ("sections", ContentSection),
+            ("menus", Menu),
+            ("blurbs", Blurb),
+            ("image_blurbs", ImageBlurb),
+        ):
+            pks = [current(kind, ref).pk for ref in changes[kind].deleted]
+            if kind == "blocks":
+                touched_sections.update(
+                    current(kind, ref).section_id for ref in changes[kind].deleted
+                )
+            model._base_manager.using(using).filter(pk__in=pks).delete()
+
+        # Menus: parents first
+        menu_pks = {
+            ref: menu.pk
+            for ref, (menu, _) in state["menus"].items()
+            if ref not in changes["menus"].deleted
+        }
+        created_menus = sorted(
+            changes["menus"].created,
+            key=lambda ref: bool(records["menus"][ref]["parent"]),
+        )
+        new_menu_id = _IdAllocator(Menu, using)
+        new_menus = list()
+        menu_fields = ["title", "url_slug", "disabled", "redirect_to", "position"]
+        for ref in created_menus:
+            record = records["menus"][ref]
+            menu_pks[ref] = new_menu_id()
+            menu = Menu(id=menu_pks[ref], parent_id=menu_pks.get(record["parent"]))
+            _set_fields(menu, record, menu_fields)
+            new_menus.append(menu)
+        Menu.objects.using(using).bulk_create(new_menus)
+        updated_menus = list()
+        for ref in changes["menus"].updated:
+            menu = current("menus", ref)
+            _set_fields(menu, records["menus"][ref], menu_fields)
+            updated_menus.append(menu)
+        Menu.objects.using(using).bulk_update(updated_menus, menu_fields)
+        indexed_objects.append((Menu, new_menus + updated_menus))
+
+        # Sections
+        section_pks = {
+            ref: section.pk
+            for ref, (section, _) in state["sections"].items()
+            if ref not in changes["sections"].deleted
+        }
+        new_section_id = _IdAllocator(ContentSection, using)
+        new_sections = list()
+        section_fields = ["key", "static_location"]
+        for ref in changes["sections"].created:
+            record = records["sections"][ref]
+            section_pks[ref] = new_section_id()
+            section = ContentSection(
+                id=section_pks[ref], menu_id=menu_pks.get(record["menu"])
+            )
+            _set_fields(section, record, section_fields)
+            new_sections.append(section)
+        ContentSection.objects.using(using).bulk_create(new_sections)
+        updated_sections = list()
+        for ref in changes["sections"].updated:
+            section = current("sections", ref)
+            _set_fields(section, records["sections"][ref], section_fields)
+            updated_sections.append(section)
+            touched_sections.add(section.pk)
+        ContentSection.objects.using(using).bulk_update(
+            updated_sections, section_fields
+        )
+        indexed_objects.append((ContentSection, new_sections + updated_sections))
+
+        # Blocks: base rows, then the rows of their subclasses
+        base_fields = ["key", "disabled", "position", "static_location"]
+        new_block_id = _IdAllocator(ContentBlock, using)
+        new_bases = list()
+        new_blocks = dict()  # block class -> blocks
+        for ref in changes["blocks"].created:
+            record = records["blocks"][ref]
+            block_class = models.content_block_classes[record["type"]]
+            block_id = new_block_id()
+            section_id = section_pks.get(record["section"])
+            base = ContentBlock(
+                id=block_id, section_id=section_id, type_key=block_class.block_type_key
+            )
+            _set_fields(base, record, base_fields)
+            new_bases.append(base)
+            block = block_class(base_id=block_id)
+            _set_fields(block, record, [f.name for f in get_block_fields(block_class)])
+            if isinstance(block, models.RenderedContentModel):
+                block.render_content()
+            new_blocks.setdefault(block_class, list()).append(block)
+            touched_sections.add(section_id)
+        ContentBlock.objects.using(using).bulk_create(new_bases)
+        for block_class, blocks in new_blocks.items():
+            _bulk_create_child_rows(block_class, blocks, using)
+            indexed_objects.append((block_class, blocks))
+
+        updated_blocks = dict()  # block class -> blocks
+        for ref in changes["blocks"].updated:
+            block = current("blocks", ref)
+            fields = [f.name for f in get_block_fields(type(block))]
+            _set_fields(block, records["blocks"][ref], base_fields + fields)
+            if isinstance(block, models.RenderedContentModel):
+                block.render_content()
+            updated_blocks.setdefault(type(block), list()).append(block)
+            touched_sections.add(block.section_id)
+        for block_class, blocks in updated_blocks.items():
+            ContentBlock._base_manager.using(using).bulk_update(blocks, base_fields)
+            local_fields = [
+                field.name
+                for field in block_class._meta.local_concrete_fields
+                if not field.primary_key
+            ]
+            if block_class is not ContentBlock and local_fields:
+                block_class._base_manager.using(using).bulk_update(blocks, local_fields)
+            indexed_objects.append((block_class, blocks))
+
+        # Blurbs
+        fields = BLURB_FIELDS[Blurb][1:]
+        new_blurbs = list()
+        for ref in changes["blurbs"].created:
+            blurb = Blurb(identifier=ref)
+            _set_fields(blurb, records["blurbs"][ref], fields)
+            new_blurbs.append(blurb)
+        updated_blurbs = list()
+        for ref in changes["blurbs"].updated:
+            blurb = current("blurbs", ref)
+            _set_fields(blurb, records["blurbs"][ref], fields)
+            updated_blurbs.append(blurb)
+        for blurb in new_blurbs + updated_blurbs:
+            blurb.render_content()
+        Blurb.objects.using(using).bulk_create(new_blurbs)
+        Blurb.objects.using(using).bulk_update(
+            updated_blurbs, fields + ["rendered_content", "excerpt"]
+        )
+        indexed_objects.append((Blurb, updated_blurbs))
+        for i in range(0, len(new_blurbs), IN_BATCH_SIZE):
+            identifiers = [
+                blurb.identifier for blurb in new_blurbs[i : i + IN_BATCH_SIZE]
+            ]
+            indexed_objects.append(
+                (Blurb, Blurb.objects.using(using).filter(identifier__in=identifiers))
+            )
+
+        # Image blurbs (the derived fields are only set again for new images)
+        fields = BLURB_FIELDS[ImageBlurb][1:] + ["image", "ppoi"]
+        new_blurbs = list()
+        for ref in changes["image_blurbs"].created:
+            blurb = ImageBlurb(identifier=ref)
+            _set_fields(blurb, records["image_blurbs"][ref], fields)
+            new_blurbs.append(blurb)
+        updated_blurbs = list()
+        new_images = list(new_blurbs)
+        for ref in changes["image_blurbs"].updated:
+            blurb = current("image_blurbs", ref)
+            _set_fields(blurb, records["image_blurbs"][ref], fields)
+            updated_blurbs.append(blurb)
+            if blurb.image.name != state["image_blurbs"][ref][1]["image"]:
+                new_images.append(blurb)
+        for blurb in new_images:
+            blurb.set_dimensions()
+            blurb.lqip, blurb.dominant_color = get_field_placeholder(blurb.image)
+            warm_on_commit(blurb, "image")
+        ImageBlurb.objects.using(using).bulk_create(new_blurbs)
+        ImageBlurb.objects.using(using).bulk_update(
+            updated_blurbs,
+            fields + ["width", "height", "lqip", "dominant_color"],
+        )
+
+        _reset_sequences(using, [Menu, ContentSection, ContentBlock])
+
+        for model, objs in indexed_objects:
+            search.index_objects(model, objs, using)
+
+    # Bulk queries send no model signals (drops the cached blurbs and counters)
+    invalidate_menus()
+    for section_id in touched_sections - {None}:
+        invalidate_section_fragment(section_id)
+    for model in (Menu, ContentSection, ContentBlock, Blurb, ImageBlurb):
+        registration.objects_registered.send(sender=model)
+    return changes
@@ -7,30 +7,41 @@ from django.urls import reverse
 from django.utils.html import escape, format_html
 from django.utils.safestring import mark_safe
 
+from .. import registration
+from ..blurbs import blurb_cache
+from ..manifest import get_static_content, static_content_tag
 from ..models import Blurb
 
 register = template.Library()
 
 
-@register.simple_tag(takes_context=True)
+@static_content_tag(register, "blurb", blurb_cache.get_many)
 def blurb(context, identifier, plain_text=False):
     # identifier should be in the form of '.../.../...'
-    try:
-        blurb = Blurb.objects.all().get(identifier=identifier)
-        if blurb.plain_text != plain_text:
-            blurb.plain_text = plain_text
-            blurb.save()
-            logging.warning(
-                "Auto-correcting blurb type of {} to plain_text={}".format(
-                    blurb.display_name, plain_text
-                )
-            )
-    except ObjectDoesNotExist:
-        blurb = Blurb.objects.create(
+    def register_blurb():
+        blurb = Blurb(
             identifier=identifier,
             content=None,
             plain_text=plain_text,
             last_known_location=context.request.path,
         )
+        registration.register(blurb, "identifier")
+        return blurb
+
+    blurb = get_static_content(
+        context,
+        "blurb",
+        identifier,
+        lambda: blurb_cache.get(identifier),
+        register_blurb,
+    )
+    if blurb.plain_text != plain_text and blurb.pk is not None:
+        blurb.plain_text = plain_text
+        registration.register_update(blurb, plain_text=plain_text)
+        logging.warning(
+            "Auto-correcting blurb type of {} to plain_text={}".format(
+                blurb.display_name, plain_text
+            )
+        )
 
     return blurb
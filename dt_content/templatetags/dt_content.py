@@ -1,30 +1,134 @@
 from django import template
+from django.utils.safestring import mark_safe
 
-from .. import models
+from .. import models, registration
+from ..fragments import get_or_render, make_fragment_key, make_section_fragment_key
+from ..loaders import load_blocks
+from ..manifest import get_static_content, static_content_tag
+from ..menu import MENU_NAMESPACE
 from ..models import ContentSection, ContentBlock
 
 register = template.Library()
 
 
-@register.simple_tag(takes_context=True)
+def get_content_sections(keys):
+    return {
+        section.key: section
+        for section in ContentSection.static_objects.filter(key__in=keys)
+    }
+
+
+def get_content_blocks(keys):
+    # Blocks of any type (see the type check of `content_block`)
+    blocks = load_blocks(ContentBlock.static_objects.filter(key__in=keys))
+    return {block.key: block for block in blocks}
+
+
+@static_content_tag(register, "content_section", get_content_sections)
 def content_section(context, key):
-    url = context.request.path
-    section, created = ContentSection.objects.get_or_create(
-        key=key, defaults=dict(static_location=url)
+    def register_section():
+        section = ContentSection(key=key, static_location=context.request.path)
+        registration.register(section, "key")
+        return section
+
+    return get_static_content(
+        context,
+        "content_section",
+        key,
+        lambda: ContentSection.static_objects.get(key=key),
+        register_section,
     )
-    return section
 
 
-@register.simple_tag(takes_context=True)
+@static_content_tag(register, "content_block", get_content_blocks)
 def content_block(context, key, block_type):
-    url = context.request.path
     BlockClass = models.content_block_classes[block_type]
-    block, created = BlockClass.objects.get_or_create(
-        key=key, defaults=dict(static_location=url)
+
+    def register_block():
+        block = BlockClass(
+            key=key,
+            static_location=context.request.path,
+            type_key=BlockClass.block_type_key,
+        )
+        registration.register(block, "key", "type_key")
+        return block
+
+    block = get_static_content(
+        context,
+        "content_block",
+        key,
+        lambda: BlockClass.static_objects.get(key=key),
+        register_block,
     )
+    if not isinstance(block, BlockClass):
+        # Another type of block with the same key
+        try:
+            block = BlockClass.static_objects.get(key=key)
+        except BlockClass.DoesNotExist:
+            block = register_block()
     return block
 
 
 @register.simple_tag(takes_context=False)
 def content_block_classes():
     return list(models.content_block_classes.values())
+
+
+@register.simple_tag(takes_context=True)
+def nav_fragment(context, template_name):
+    """Include `template_name` (e.g., the navbar) and cache the output.
+
+    The output is cached per menu generation, active menus, authentication and
+    staff status, and preview mode (plus the request path for staff), so the
+    template should not depend on anything else (e.g., `{% now %}`, which is why
+    footers are included as is).
+    """
+
+    def render():
+        template = context.template.engine.get_template(template_name)
+        with context.push():
+            return template.render(context)
+
+    request = context.get("request")
+    nav_menu_list = context.get("nav_menu_list")
+    if request is None or getattr(nav_menu_list, "tree", None) is None:
+        return mark_safe(render())
+
+    user = request.user
+    key = make_fragment_key(
+        template_name,
+        nav_menu_list.tree.base_url,
+        sorted(nav_menu_list.active_ids),
+        user.is_authenticated,
+        user.is_staff,
+        bool(context.get("dt_content_preview_mode")),
+        request.path if user.is_staff else "",
+    )
+    return mark_safe(get_or_render(key, MENU_NAMESPACE, render))
+
+
+@register.simple_tag(takes_context=True)
+def content_section_fragment(context, content_section):
+    """Render the blocks of `content_section` for visitors (non-admin view).
+
+    The output for anonymous users outside of preview mode is cached until the
+    section or any of its blocks changes (see `dt_content.signals`).
+    """
+    template_name = "dt_content/content/content_section_blocks.html"
+
+    def render():
+        template = context.template.engine.get_template(template_name)
+        with context.push(content_section=content_section):
+            return template.render(context)
+
+    request = context.get("request")
+    if (
+        request is None
+        or request.user.is_authenticated
+        or context.get("dt_content_preview_mode")
+        or content_section.pk is None
+    ):
+        return mark_safe(render())
+
+    key = make_section_fragment_key(content_section.pk)
+    return mark_safe(get_or_render(key, None, render))
@@ -2,21 +2,33 @@ import logging
 
 from django import template
 from django.conf import settings
+
+from .. import registration
+from ..blurbs import image_blurb_cache
+from ..manifest import get_static_content, static_content_tag
 from ..models import ImageBlurb
 
 register = template.Library()
 
 
-@register.simple_tag(takes_context=True)
+@static_content_tag(register, "image_blurb", image_blurb_cache.get_many)
 def image_blurb(context, identifier, placeholder=None):
     # identifier should be in the form of '<page>:<name>'
-    try:
-        ib = ImageBlurb.objects.all().get(identifier=identifier)
-    except ImageBlurb.DoesNotExist:
-        ib = ImageBlurb.objects.create(
+    def register_image_blurb():
+        ib = ImageBlurb(
             identifier=identifier,
             last_known_location=context.request.path,
             placeholder=placeholder,
         )
+        registration.register(ib, "identifier")
+        return ib
+
+    ib = get_static_content(
+        context,
+        "image_blurb",
+        identifier,
+        lambda: image_blurb_cache.get(identifier),
+        register_image_blurb,
+    )
 
     return ib
@@ -1,3 +1,888 @@
-from django.test import TestCase
+import csv
+import re
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.cache import caches
+from django.db import connection
+from django.http import Http404
+from django.template import Context, Engine, RequestContext, Template
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from . import registration, search, settings
+from .blurbs import blurb_cache
+from .cache import bump_generation, get_shared_cache
+from .counters import get_counts
+from .fragments import make_section_fragment_key
+from .html import render_rich_text
+from .loaders import load_blocks
+from .manifest import get_static_content
+from .menu import MENU_NAMESPACE, get_menus, get_nav_menu_list, resolve_menu_path
+from .models import (
+    Blurb,
+    CarouselBlock,
+    ContentBlock,
+    ContentSection,
+    Counter,
+    ImageBlurb,
+    Menu,
+    Rendition,
+    RichTextBlock,
+)
+from .ordering import POSITION_GAP, rebalance_crowded_groups
+from .pagination import paginate_keyset
+from . import rendition_index
+from .rendition_index import add_renditions
+from .snapshot import KINDS, dump_snapshot, restore_snapshot
+from .transfer import (
+    dump_blurbs,
+    dump_menu_tree,
+    load_blurbs,
+    load_menu_tree,
+    read_blurb_rows,
+)
+from .warming import warm_image
+
+
+class ClearCacheMixin:
+    def setUp(self):
+        # Cached values outlive the rolled back transactions of other tests
+        caches[settings.CACHE_ALIAS].clear()
+
+
+class DtContentTestCase(ClearCacheMixin, TestCase):
+    pass
+
+
+class DtContentTransactionTestCase(ClearCacheMixin, TransactionTestCase):
+    """For code that runs on commit (e.g., the invalidation of caches)."""
+
+    def setUp(self):
+        super().setUp()
+        # Flushing the database leaves the search index (a virtual table) as is
+        if search.is_available(connection.alias):
+            search.rebuild_index(connection.alias)
+
+
+class MediaRootMixin:
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def make_image(self, name, width, height):
+        data = BytesIO()
+        Image.new("RGB", (width, height), "teal").save(data, "PNG")
+        return SimpleUploadedFile(name, data.getvalue(), content_type="image/png")
+
+
+class ResolveMenuPathTests(DtContentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.about = Menu.objects.create(title="About", url_slug="about")
+        self.team = Menu.objects.create(
+            title="Team", url_slug="team", parent=self.about
+        )
+
+    def test_resolves_parent_and_child(self):
+        page = resolve_menu_path("about", get_nav_menu_list("/", "/about"))
+        self.assertEqual((page.parent, page.child), (self.about, None))
+        self.assertEqual(page.nav_menu.id, self.about.id)
+        self.assertEqual(page.content_section.menu_id, self.about.id)
+
+        page = resolve_menu_path("about/team", get_nav_menu_list("/", "/about/team"))
+        self.assertEqual((page.parent, page.child), (self.about, self.team))
+        self.assertEqual(page.nav_menu.id, self.team.id)
+        self.assertTrue(page.nav_menu.active)
+
+    def test_extra_slugs_resolve_to_parent(self):
+        page = resolve_menu_path("about/team/extra", get_nav_menu_list("/"))
+        self.assertEqual((page.parent, page.child), (self.about, None))
+
+    def test_unknown_path(self):
+        with self.assertRaises(Http404):
+            resolve_menu_path("about/nope", get_nav_menu_list("/"))
+
+    def test_nav_menu_list_of_previous_generation(self):
+        nav_menu_list = get_nav_menu_list("/")
+        first = Menu.objects.create(title="First", url_slug="first")
+        first.move_after(None)
+        Menu.objects.create(title="Staff", url_slug="staff", parent=self.about)
+        Menu.objects.get(pk=self.team.pk).move_after(Menu.objects.get(url_slug="staff"))
+        bump_generation(MENU_NAMESPACE)
+
+        page = resolve_menu_path("about/team", nav_menu_list)
+        self.assertEqual(page.nav_menu.id, self.team.id)
+        page = resolve_menu_path("first", nav_menu_list)
+        self.assertIsNone(page.nav_menu)
+
+
+class MenuContentSectionTests(DtContentTestCase):
+    def test_created_with_menu(self):
+        menu = Menu.objects.create(title="About", url_slug="about")
+        menu = Menu.objects.select_related("content_section").get(pk=menu.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(menu.get_content_section().menu_id, menu.pk)
+
+    def test_missing_section_is_not_created(self):
+        menu = Menu.objects.create(title="About", url_slug="about")
+        ContentSection.objects.filter(menu=menu).delete()
+        menu = Menu.objects.get(pk=menu.pk)
+        self.assertIsNone(menu.get_content_section())
+
+        page = resolve_menu_path("about", get_nav_menu_list("/"))
+        self.assertEqual(page.content_section.menu_id, menu.pk)
+        self.assertIsNone(page.content_section.pk)
+        self.assertFalse(ContentSection.objects.filter(menu=menu).exists())
+
+
+class NavMenuListTests(DtContentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.about = Menu.objects.create(title="About", url_slug="about")
+        self.team = Menu.objects.create(
+            title="Team", url_slug="team", parent=self.about
+        )
+        self.news = Menu.objects.create(
+            title="News", url_slug="news", parent=self.about, redirect_to="/news"
+        )
+
+    def test_active_menus(self):
+        about = get_nav_menu_list("/", "/about/team/")[0]
+        self.assertTrue(about.active)
+        self.assertEqual(
+            [(child.id, child.active) for child in about.children],
+            [(self.team.id, True), (self.news.id, False)],
+        )
+        self.assertIs(about.children[0].parent, about)
+
+    def test_active_child_of_inactive_parent(self):
+        about = get_nav_menu_list("/", "/news/2020")[0]
+        self.assertFalse(about.active)
+        self.assertEqual([child.active for child in about.children], [False, True])
+
+    def test_no_active_menus(self):
+        about = get_nav_menu_list("/", "/elsewhere")[0]
+        self.assertFalse(about.active)
+        self.assertFalse(any(child.active for child in about.children))
+
+
+class MenuTreeTransferTests(DtContentTestCase):
+    tree = dict(
+        version=1,
+        menus=[
+            dict(
+                title="About",
+                url_slug="about",
+                blocks=[
+                    dict(type="rich_text_block", content="<p>One</p>"),
+                    dict(type="rich_text_block", content="<p>Two</p>"),
+                ],
+                children=[
+                    dict(
+                        title="Team",
+                        url_slug="team",
+                        blocks=[dict(type="rich_text_block", content="<p>Three</p>")],
+                    )
+                ],
+            )
+        ],
+    )
+
+    def test_round_trip(self):
+        self.assertEqual(load_menu_tree(self.tree), 2)
+        blocks = RichTextBlock.objects.order_by("section__menu_id", "position")
+        self.assertEqual(
+            [block.rendered_content for block in blocks],
+            ["<p>One</p>", "<p>Two</p>", "<p>Three</p>"],
+        )
+        dumped = dump_menu_tree()
+        self.assertEqual(
+            [block["content"] for block in dumped["menus"][0]["blocks"]],
+            ["<p>One</p>", "<p>Two</p>"],
+        )
+        self.assertEqual(dumped["menus"][0]["children"][0]["url_slug"], "team")
+
+    def test_inserts_in_bulk(self):
+        with CaptureQueriesContext(connection) as context:
+            load_menu_tree(self.tree)
+        # executemany() is logged as "<count> times: <sql>"
+        statements = [
+            query["sql"].split(" times: ")[-1] for query in context.captured_queries
+        ]
+        inserts = [
+            sql.split()[2] for sql in statements if sql.startswith('INSERT INTO "')
+        ]
+        self.assertEqual(
+            inserts,
+            [
+                '"dt_content_menu"',
+                '"dt_content_contentsection"',
+                '"dt_content_contentblock"',
+                '"dt_content_richtextblock"',
+            ],
+        )
+        self.assertEqual([result.title for result in search.search("three")], [""])
+
+
+class BlurbTransferTests(DtContentTestCase):
+    def setUp(self):
+        super().setUp()
+        Blurb.objects.create(
+            identifier="home/intro", label="Intro", content="<p>Hi, there</p>"
+        )
+        Blurb.objects.create(
+            identifier="home/outro", content="Bye", last_known_location="/"
+        )
+
+    def get_blurbs(self):
+        return list(
+            Blurb.objects.order_by("identifier").values_list(
+                "identifier", "label", "content", "rendered_content", "plain_text"
+            )
+        )
+
+    def test_round_trip(self):
+        expected = self.get_blurbs()
+        for format in ["csv", "jsonl"]:
+            lines = list(dump_blurbs(Blurb, format))
+            Blurb.objects.filter(identifier="home/intro").update(
+                label="Changed", content="", rendered_content=""
+            )
+            Blurb.objects.filter(identifier="home/outro").delete()
+            rows = read_blurb_rows(Blurb, lines, format)
+            self.assertEqual(load_blurbs(Blurb, rows), (1, 1))
+            self.assertEqual(self.get_blurbs(), expected)
+        self.assertEqual(
+            [result.title for result in search.search("bye")], ["home/outro"]
+        )
+
+    def test_invalid_csv(self):
+        too_large = "x" * (csv.field_size_limit() + 1)
+        for lines in [
+            ["identifier,label\n", "home/intro,Intro,extra\n"],
+            ["identifier,label\n", "home/intro,{}\n".format(too_large)],
+            ["identifier,unknown\n"],
+        ]:
+            with self.assertRaises(ValidationError):
+                load_blurbs(Blurb, read_blurb_rows(Blurb, lines))
+        self.assertEqual(Blurb.objects.get(identifier="home/intro").label, "Intro")
+
+
+class MenuInvalidationTests(DtContentTransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.about = Menu.objects.create(title="About", url_slug="about")
+        self.second = Menu.objects.create(title="Second", url_slug="second")
+
+    def get_titles(self):
+        return [menu.title for menu in get_menus()]
+
+    def test_save(self):
+        self.assertEqual(self.get_titles(), ["About", "Second"])
+        self.second.title = "Third"
+        self.second.save()
+        self.assertEqual(self.get_titles(), ["About", "Third"])
+        self.second.delete()
+        self.assertEqual(self.get_titles(), ["About"])
+
+    def test_move_after(self):
+        self.assertEqual(self.get_titles(), ["About", "Second"])
+        self.second.move_after(None)
+        self.assertEqual(self.get_titles(), ["Second", "About"])
+        self.assertEqual(
+            [node.title for node in get_nav_menu_list("/")], ["Second", "About"]
+        )
+
+    def test_rebalance(self):
+        Menu.objects.filter(pk=self.second.pk).update(position=self.about.position + 1)
+        self.assertEqual(
+            [menu.position for menu in get_menus()][1], self.about.position + 1
+        )
+        self.assertEqual(rebalance_crowded_groups(Menu), 1)
+        self.assertEqual(
+            [menu.position for menu in get_menus()], [POSITION_GAP, 2 * POSITION_GAP]
+        )
+
+
+class NavFragmentTests(DtContentTransactionTestCase):
+    def render(self):
+        template = Template(
+            "{% load dt_content %}"
+            "{% nav_fragment 'dt_content/example/site/navbar.html' %}"
+        )
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        nav_menu_list = get_nav_menu_list("/", request.path)
+        return template.render(
+            RequestContext(request, dict(nav_menu_list=nav_menu_list))
+        )
+
+    def test_cached_per_menu_generation(self):
+        menu = Menu.objects.create(title="About", url_slug="about")
+        self.assertIn("About", self.render())
+        with mock.patch.object(
+            Engine, "get_template", autospec=True, side_effect=Engine.get_template
+        ) as get_template:
+            self.assertIn("About", self.render())
+        get_template.assert_not_called()
+
+        menu.title = "Staff"
+        menu.save()
+        self.assertIn("Staff", self.render())
+
+
+class ContentInvalidationTests(DtContentTransactionTestCase):
+    def test_block_delete(self):
+        section = Menu.objects.create(title="About", url_slug="about").content_section
+        block = RichTextBlock.objects.create(section=section, content="<p>One</p>")
+        key = make_section_fragment_key(section.pk)
+        get_shared_cache().set(key, "<p>One</p>")
+        block.delete()
+        self.assertIsNone(get_shared_cache().get(key))
+
+    def test_bulk_registration(self):
+        with self.assertRaises(Blurb.DoesNotExist):
+            blurb_cache.get("home/intro")
+        self.assertEqual(get_counts()["blurb_count"], 0)
+        registration.register(Blurb(identifier="home/intro"), "identifier")
+        registration.flush()
+        self.assertEqual(blurb_cache.get("home/intro").identifier, "home/intro")
+        self.assertEqual(get_counts()["blurb_count"], 1)
+
+
+class BlurbCacheTests(DtContentTransactionTestCase):
+    def test_cached_with_misses(self):
+        Blurb.objects.create(identifier="home/intro", content="<p>Hi</p>")
+        identifiers = ["home/intro", "home/outro"]
+        with self.assertNumQueries(1):
+            self.assertEqual(list(blurb_cache.get_many(identifiers)), ["home/intro"])
+        with self.assertNumQueries(0):
+            self.assertEqual(list(blurb_cache.get_many(identifiers)), ["home/intro"])
+            with self.assertRaises(Blurb.DoesNotExist):
+                blurb_cache.get("home/outro")
+
+        blurb = blurb_cache.get("home/intro")
+        blurb.content = "<p>Hello</p>"
+        blurb.save()
+        self.assertEqual(blurb_cache.get("home/intro").content, "<p>Hello</p>")
+
+
+class CounterTests(DtContentTestCase):
+    def test_subclass_block(self):
+        self.assertEqual(get_counts()["static_block_count"], 0)
+        block = RichTextBlock.objects.create(key="footer", content="<p>One</p>")
+        RichTextBlock.objects.create(key="header", content="<p>Two</p>")
+        self.assertEqual(get_counts()["static_block_count"], 2)
+        block.delete()
+        self.assertEqual(get_counts()["static_block_count"], 1)
+
+    def test_drifted_counter(self):
+        blurb = Blurb.objects.create(identifier="home/intro")
+        self.assertEqual(get_counts()["blurb_count"], 1)
+        Counter.objects.update(value=0)
+        blurb.delete()
+        self.assertEqual(get_counts()["blurb_count"], 0)
+
+    def test_recount(self):
+        Blurb.objects.create(identifier="home/intro")
+        self.assertEqual(get_counts()["blurb_count"], 1)
+        Counter.objects.update(value=5)
+        call_command("recount_counters", verbosity=0)
+        self.assertEqual(
+            get_counts(),
+            dict(
+                static_section_count=0,
+                static_block_count=0,
+                blurb_count=1,
+                image_blurb_count=0,
+            ),
+        )
+
+
+class BlockListTests(DtContentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sections = [
+            Menu.objects.create(title=title, url_slug=title.lower()).content_section
+            for title in ["About", "Team", "Staff"]
+        ]
+        for section in self.sections:
+            for content in ["<p>One</p>", "<p>Two</p>"]:
+                RichTextBlock.objects.create(section=section, content=content)
+
+    def test_fetched_once(self):
+        section = ContentSection.objects.get(pk=self.sections[0].pk)
+        # The base rows, and the rows of the rich text blocks
+        with self.assertNumQueries(2):
+            self.assertEqual(section.blocks.count(), 2)
+            self.assertTrue(section.blocks.exists())
+            self.assertEqual(
+                [block.content for block in section.blocks.all()],
+                ["<p>One</p>", "<p>Two</p>"],
+            )
+
+    def test_prefetch_blocks(self):
+        with self.assertNumQueries(3):
+            sections = list(ContentSection.objects.prefetch_blocks().order_by("pk"))
+            self.assertEqual([len(section.blocks) for section in sections], [2, 2, 2])
+
+
+class LoadBlocksTests(DtContentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.section = Menu.objects.create(
+            title="About", url_slug="about"
+        ).content_section
+        self.first = RichTextBlock.objects.create(
+            section=self.section, content="<p>One</p>"
+        )
+        CarouselBlock.objects.create(section=self.section)
+        self.last = RichTextBlock.objects.create(
+            section=self.section, content="<p>Two</p>"
+        )
+
+    def load(self, **kwargs):
+        return load_blocks(ContentBlock.objects.filter(section=self.section), **kwargs)
+
+    def test_subclasses_in_order(self):
+        # The base rows, and the rows of the rich text blocks (carousel blocks
+        # have no other fields)
+        with self.assertNumQueries(2):
+            blocks = self.load()
+        self.assertEqual(
+            [type(block) for block in blocks],
+            [RichTextBlock, CarouselBlock, RichTextBlock],
+        )
+        self.assertEqual(blocks[2].content, "<p>Two</p>")
+
+    def test_defer(self):
+        block = self.load(defer=["content"])[0]
+        self.assertIn("content", block.get_deferred_fields())
+        self.assertEqual(block.content, "<p>One</p>")
+
+    def test_unknown_types(self):
+        ContentBlock.objects.filter(pk=self.first.pk).update(type_key="removed")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM dt_content_richtextblock WHERE base_id = %s",
+                [self.last.pk],
+            )
+        self.assertEqual(
+            [type(block) for block in self.load()],
+            [ContentBlock, CarouselBlock, ContentBlock],
+        )
+
+
+class KeysetPaginationTests(DtContentTestCase):
+    fields = ("last_known_location", "identifier", "id")
+
+    def test_null_keys(self):
+        for identifier, location in [
+            ("a", "/b"),
+            ("b", None),
+            ("c", "/a"),
+            ("d", None),
+            ("e", "/a"),
+        ]:
+            Blurb.objects.create(identifier=identifier, last_known_location=location)
+        expected = list(Blurb.objects.order_by(*self.fields))
+        pages = list()
+        cursor = None
+        while True:
+            page = paginate_keyset(Blurb.objects.all(), self.fields, cursor, 2)
+            pages.append(page.object_list)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+
+class ReorderViewTests(DtContentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(
+            User.objects.create_superuser("staff", "staff@example.com", "password")
+        )
+        self.about = Menu.objects.create(title="About", url_slug="about")
+        self.second = Menu.objects.create(title="Second", url_slug="second")
+        self.url = reverse("dt-content:menu-reorder", args=[self.second.pk])
+
+    def test_move_after(self):
+        response = self.client.post(self.url, dict(after=""))
+        self.assertEqual(response.json()["id"], self.second.pk)
+        self.assertEqual(
+            list(Menu.objects.values_list("title", flat=True)), ["Second", "About"]
+        )
+
+    def test_invalid_sibling(self):
+        for after in ["abc", "12345"]:
+            response = self.client.post(self.url, dict(after=after))
+            self.assertEqual(response.status_code, 400)
+
+
+class RegistrationTests(DtContentTestCase):
+    def render(self, identifiers):
+        template = Template(
+            "{% load blurb %}"
+            "{% for identifier in identifiers %}{% blurb identifier %}{% endfor %}"
+        )
+        request = RequestFactory().get("/")
+        return template.render(RequestContext(request, dict(identifiers=identifiers)))
+
+    def test_flushing(self):
+        with registration.flushing():
+            self.render(["home/intro", "home/outro"])
+            self.assertEqual(Blurb.objects.count(), 0)
+        self.assertEqual(
+            sorted(Blurb.objects.values_list("identifier", flat=True)),
+            ["home/intro", "home/outro"],
+        )
+        self.assertEqual(len(registration.get_queue()), 0)
+
+    def test_full_queue_is_flushed(self):
+        with mock.patch.object(settings, "REGISTRATION_QUEUE_SIZE", 2):
+            self.render(["a", "b", "c"])
+            self.assertEqual(Blurb.objects.count(), 2)
+            self.assertEqual(len(registration.get_queue()), 1)
+        registration.flush()
+        self.assertEqual(Blurb.objects.count(), 3)
+
+    def test_indexes_registered_objects(self):
+        # Bypasses signals, so it is left for the command
+        Blurb.objects.bulk_create([Blurb(identifier="home/outro", label="Outro")])
+        with registration.flushing():
+            self.render(["home/intro"])
+        self.assertEqual(
+            [result.title for result in search.search("intro")], ["home/intro"]
+        )
+        self.assertEqual([result.title for result in search.search("outro")], [])
+
+        call_command("rebuild_search_index", missing=True, stdout=StringIO())
+        self.assertEqual([result.title for result in search.search("outro")], ["Outro"])
+
+
+class ManifestTests(DtContentTestCase):
+    def setUp(self):
+        super().setUp()
+        for key in ["a", "b", "c"]:
+            ContentSection.objects.create(key=key)
+
+    def render(self, source, **context):
+        template = Template("{% load dt_content %}" + source)
+        request = RequestFactory().get("/")
+        return template.render(RequestContext(request, context))
+
+    def test_bulk_load(self):
+        source = (
+            "{% content_section 'a' as a %}{% content_section 'b' as b %}"
+            "{% content_section 'c' as c %}{{ a.key }}{{ b.key }}{{ c.key }}"
+        )
+        for _ in range(2):  # Loaded again by each render
+            with self.assertNumQueries(1):
+                self.assertEqual(self.render(source), "abc")
+
+    def test_missing_objects(self):
+        source = (
+            "{% content_section 'b' as b %}{% content_section 'd' as d %}"
+            "{% content_section 'd' as d2 %}{{ b.key }}{{ d.key }}{{ d2.pk }}"
+        )
+        self.render(source)
+        # Deleted since the template was compiled (and rendered)
+        ContentSection.objects.filter(key="b").delete()
+        with registration.flushing():
+            with self.assertNumQueries(1):
+                self.assertEqual(self.render(source), "bdNone")
+            self.assertEqual(len(registration.get_queue()), 2)
+        self.assertEqual(
+            sorted(ContentSection.objects.values_list("key", flat=True)),
+            ["a", "b", "c", "d"],
+        )
+
+    def test_fallback(self):
+        # Not a literal: looked up by the tag itself
+        source = "{% content_section 'a' as a %}{% content_section key as b %}"
+        with self.assertNumQueries(2):
+            self.render(source + "{{ a.key }}{{ b.key }}", key="b")
+
+        # Rendered without a manifest (e.g., outside of a template)
+        get = mock.Mock(side_effect=ContentSection.DoesNotExist)
+        create = mock.Mock(return_value="created")
+        self.assertEqual(
+            get_static_content(Context(), "content_section", "a", get, create),
+            "created",
+        )
+        get.assert_called_once_with()
+
+
+@mock.patch.object(
+    settings, "RENDITION_WIDTHS", {"dt_content.ImageBlurb.image": [480, 960, 1440]}
+)
+class ImageBlurbSrcsetTests(MediaRootMixin, DtContentTransactionTestCase):
+    def get_widths(self, image_blurb):
+        return [candidate.split()[1] for candidate in image_blurb.srcset.split(", ")]
+
+    @mock.patch("dt_content.models.warm_on_commit")
+    def test_existing_renditions(self, warm_on_commit):
+        image_blurb = ImageBlurb.objects.create(
+            identifier="home/hero", image=self.make_image("hero.png", 1000, 500)
+        )
+        self.assertEqual((image_blurb.width, image_blurb.height), (1000, 500))
+        warm_on_commit.assert_called_once_with(image_blurb, "image")
+        # Only the image itself until its renditions are generated
+        self.assertEqual(self.get_widths(image_blurb), ["1000w"])
+
+        name = image_blurb.image.name
+        generated = warm_image("dt_content.ImageBlurb", "image", name, [480, 960, 1440])
+        add_renditions(name, generated.source_mtime, generated.widths)
+        image_blurb = ImageBlurb.objects.get(pk=image_blurb.pk)
+        self.assertEqual(self.get_widths(image_blurb), ["480w", "960w", "1000w"])
+
+    @mock.patch("dt_content.models.warm_on_commit")
+    def test_unchanged_image_is_not_read(self, warm_on_commit):
+        image_blurb = ImageBlurb.objects.create(
+            identifier="home/hero", image=self.make_image("hero.png", 1000, 500)
+        )
+        with mock.patch("dt_content.models.get_image_size") as get_image_size:
+            image_blurb.label = "Hero"
+            image_blurb.save()
+            image_blurb = ImageBlurb.objects.get(pk=image_blurb.pk)
+            image_blurb.save()
+            get_image_size.assert_not_called()
+        self.assertEqual((image_blurb.width, image_blurb.height), (1000, 500))
+
+        image_blurb.image = None
+        image_blurb.save()
+        self.assertEqual((image_blurb.width, image_blurb.height), (None, None))
+
+    def test_failed_warming_is_retried(self):
+        with mock.patch(
+            "dt_content.warming.generate_renditions",
+            side_effect=Image.DecompressionBombError("Too large"),
+        ), self.assertLogs(level="ERROR"):
+            hero = ImageBlurb.objects.create(
+                identifier="home/hero", image=self.make_image("hero.png", 1000, 500)
+            )
+        self.assertEqual(self.get_widths(hero), ["1000w"])
+
+        # Along with the next upload
+        ImageBlurb.objects.create(
+            identifier="home/logo", image=self.make_image("logo.png", 600, 300)
+        )
+        hero = ImageBlurb.objects.get(pk=hero.pk)
+        self.assertEqual(self.get_widths(hero), ["480w", "960w", "1000w"])
+
+    @mock.patch("dt_content.models.warm_on_commit")
+    def test_found_renditions_are_registered(self, warm_on_commit):
+        image_blurb = ImageBlurb.objects.create(
+            identifier="home/hero", image=self.make_image("hero.png", 1000, 500)
+        )
+        name = image_blurb.image.name
+        warm_image("dt_content.ImageBlurb", "image", name, [480, 960])
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.get_widths(image_blurb), ["480w", "960w", "1000w"])
+        self.assertEqual(
+            [query["sql"].split()[0] for query in context.captured_queries],
+            ["SELECT"],
+        )
+        registration.flush()
+        self.assertEqual(
+            sorted(Rendition.objects.values_list("spec", flat=True)),
+            ["bounded__480x0", "bounded__960x0"],
+        )
+
+    @mock.patch("dt_content.models.warm_on_commit")
+    def test_missing_renditions_are_cached(self, warm_on_commit):
+        image_blurb = ImageBlurb.objects.create(
+            identifier="home/hero", image=self.make_image("hero.png", 1000, 500)
+        )
+        find_renditions = mock.patch.object(
+            rendition_index,
+            "find_renditions",
+            wraps=rendition_index.find_renditions,
+        )
+        with find_renditions as mocked:
+            for _ in range(2):
+                self.assertEqual(self.get_widths(image_blurb), ["1000w"])
+            self.assertEqual(mocked.call_count, 1)
+
+            # Adding renditions to the index invalidates the lookups
+            name = image_blurb.image.name
+            warm_image("dt_content.ImageBlurb", "image", name, [480])
+            add_renditions(name, None, [480])
+            self.assertEqual(self.get_widths(image_blurb), ["480w", "1000w"])
+            self.assertEqual(mocked.call_count, 2)
+
+
+class ImageBlurbPlaceholderTests(MediaRootMixin, DtContentTestCase):
+    def test_set_on_upload(self):
+        image_blurb = ImageBlurb.objects.create(
+            identifier="home/hero", image=self.make_image("hero.png", 1000, 500)
+        )
+        self.assertTrue(image_blurb.lqip.startswith("data:image/jpeg;base64,"))
+        self.assertEqual(image_blurb.dominant_color, "#008080")
+        self.assertIn("background-color: #008080;", image_blurb.placeholder_style)
+
+        image_blurb.image = None
+        image_blurb.save()
+        self.assertEqual((image_blurb.lqip, image_blurb.dominant_color), ("", ""))
+        self.assertEqual(image_blurb.placeholder_style, "")
+
+    def test_transparent_image(self):
+        data = BytesIO()
+        Image.new("RGBA", (100, 50), (0, 0, 0, 0)).save(data, "PNG")
+        image = SimpleUploadedFile("logo.png", data.getvalue())
+        image_blurb = ImageBlurb.objects.create(identifier="home/logo", image=image)
+        self.assertEqual((image_blurb.lqip, image_blurb.dominant_color), ("", ""))
+
+
+class RenderRichTextTests(SimpleTestCase):
+    def test_media_and_sections(self):
+        html = (
+            '<section><picture><source srcset="/a.webp" type="image/webp">'
+            '<img src="/a.jpg" alt="A"></picture>'
+            '<video controls poster="javascript:alert(1)">'
+            '<source src="/a.mp4" type="video/mp4"></video></section>'
+        )
+        self.assertEqual(
+            render_rich_text(html).html,
+            '<section><picture><source srcset="/a.webp" type="image/webp">'
+            '<img src="/a.jpg" alt="A" loading="lazy"></picture>'
+            '<video controls=""><source src="/a.mp4" type="video/mp4"></video>'
+            "</section>",
+        )
+
+    def test_unsafe_tags_and_attributes(self):
+        html = (
+            '<button type="button" onclick="alert(1)">Go</button>'
+            '<form action="/"><input name="q"></form><script>alert(1)</script>'
+        )
+        rendered = render_rich_text(html)
+        self.assertEqual(rendered.html, '<button type="button">Go</button>')
+        self.assertEqual(rendered.excerpt, "Go")
+
+
+class ResponsiveRichTextImageTests(MediaRootMixin, SimpleTestCase):
+    def test_uploaded_images(self):
+        name = default_storage.save(
+            "summernote/photo.png", self.make_image("photo.png", 1000, 500)
+        )
+        external_url = "https://example.com/photo.png"
+        html = '<img src="{}" alt="Photo"><img src="{}">'.format(
+            default_storage.url(name), external_url
+        )
+        uploaded, external = render_rich_text(html).html.split("><")
+        srcset = re.search(r'srcset="([^"]*)"', uploaded).group(1)
+        self.assertEqual(
+            [candidate.split()[1] for candidate in srcset.split(", ")],
+            ["480w", "960w", "1000w"],
+        )
+        self.assertIn('width="1000" height="500"', uploaded)
+        self.assertTrue(
+            default_storage.exists("__sized__/summernote/photo-bounded-480x0.png")
+        )
+        self.assertEqual(external, 'img src="{}" loading="lazy">'.format(external_url))
+
+
+class SnapshotTests(DtContentTransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        about = Menu.objects.create(title="About", url_slug="about")
+        team = Menu.objects.create(title="Team", url_slug="team", parent=about)
+        for section, content in [
+            (about.content_section, "<p>One</p>"),
+            (about.content_section, "<p>Two</p>"),
+            (team.content_section, "<p>Three</p>"),
+        ]:
+            RichTextBlock.objects.create(section=section, content=content)
+        RichTextBlock.objects.create(key="footer", content="<p>Footer</p>")
+        RichTextBlock.objects.create(key="header", content="<p>Header</p>")
+        Blurb.objects.create(identifier="home/intro", content="<p>Hi</p>")
+
+    def assertNoChanges(self, changes):
+        self.assertEqual(
+            {kind: tuple(map(len, changes[kind])) for kind in KINDS},
+            {kind: (0, 0, 0) for kind in KINDS},
+        )
+
+    def test_idempotent(self):
+        data = dump_snapshot()
+        self.assertNoChanges(restore_snapshot(data))
+
+        Menu.objects.get(url_slug="team").delete()
+        RichTextBlock.objects.filter(content="<p>One</p>").update(content="<p>1</p>")
+        Blurb.objects.create(identifier="home/outro")
+        changes = restore_snapshot(data)
+        self.assertEqual(changes["menus"].created, ["about/team"])
+        self.assertEqual(changes["blocks"].updated, ["menu:about#0"])
+        self.assertEqual(changes["blurbs"].deleted, ["home/outro"])
+        self.assertEqual(dump_snapshot(), data)
+        self.assertNoChanges(restore_snapshot(data))
+        self.assertEqual([result.title for result in search.search("three")], [""])
+
+    def test_deletes_static_blocks(self):
+        self.assertEqual(get_counts()["static_block_count"], 2)
+        data = dump_snapshot()
+        data["blocks"] = [
+            record
+            for record in data["blocks"]
+            if record["ref"] != "static:rich_text_block:footer"
+        ]
+        changes = restore_snapshot(data)
+        self.assertEqual(changes["blocks"].deleted, ["static:rich_text_block:footer"])
+        self.assertEqual(
+            list(RichTextBlock.static_objects.values_list("key", flat=True)),
+            ["header"],
+        )
+        self.assertEqual(get_counts()["static_block_count"], 1)
+
+    def test_missing_fields(self):
+        data = dump_snapshot()
+        del data["menus"][0]["parent"]
+        del data["blocks"][0]["type"]
+        with self.assertRaises(ValidationError) as context:
+            restore_snapshot(data)
+        self.assertEqual(
+            context.exception.messages,
+            ["menus[0]: missing parent", "blocks[0]: missing type"],
+        )
+
+    def test_multi_level_menus(self):
+        data = dump_snapshot()
+        record = dict(data["menus"][1], ref="about/team/extra", url_slug="extra")
+        record["parent"] = "about/team"
+        data["menus"].append(record)
+        data["sections"].append(
+            dict(data["sections"][1], ref="menu:about/team/extra", menu=record["ref"])
+        )
+        data["menus"].append(dict(record, ref="staff", url_slug="staff", parent=None))
+        with self.assertRaises(ValidationError) as context:
+            restore_snapshot(data)
+        self.assertEqual(
+            context.exception.messages,
+            [
+                "menus about/team/extra: multi-level submenus are not supported",
+                "menus staff: missing section menu:staff",
+            ],
+        )
+        self.assertEqual(Menu.objects.count(), 2)
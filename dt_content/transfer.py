@@ -0,0 +1,492 @@
+"""Bulk import and export of dt_content objects (as JSON-compatible data, CSV or
+JSON Lines).
+
+## Menu Tree Format
+
+```
+{
+    "menus": [
+        {
+            "title": "About",
+            "url_slug": "about",
+            "disabled": false,
+            "redirect_to": null,
+            "blocks": [
+                {"type": "rich_text_block", "disabled": false, "content": "<p>Hi</p>"}
+            ],
+            "children": [...]  # submenus, in the same format (without children)
+        }
+    ]
+}
+```
+
+Menus, submenus and blocks are ordered as listed. Blocks are the blocks of the
+content section of each menu, with the fields of their ContentBlock subclass.
+
+## Blurb Formats
+
+Blurbs and image blurbs (metadata only, not images) are streamed as CSV (with a
+header row) or JSON Lines, one blurb per row with the fields of `BLURB_FIELDS`:
+
+```
+{"identifier": "home/intro", "label": null, "content": "<p>Hi</p>", ...}
+```
+
+Blurbs are identified by `identifier`. Imports update the listed fields of
+existing blurbs and create the others, so rows may omit fields (or columns).
+Empty CSV cells are null.
+"""
+
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+from django.db.models import Max
+
+from . import models, registration, search
+from .loaders import group_blocks_by_section, load_blocks
+from .menu import invalidate_menus
+from .models import Blurb, ContentBlock, ContentSection, ImageBlurb, Menu
+from .ordering import POSITION_GAP
+
+FORMAT_VERSION = 1
+
+BLURB_FORMATS = ("csv", "jsonl")
+
+# Transferred fields of each blurb model (identifier first)
+BLURB_FIELDS = {
+    Blurb: ["identifier", "label", "content", "plain_text", "last_known_location"],
+    ImageBlurb: ["identifier", "label", "placeholder", "last_known_location"],
+}
+
+# Rows per query when streaming blurbs
+BLURB_CHUNK_SIZE = 500
+
+
+def get_block_fields(block_class):
+    """Fields specific to a ContentBlock subclass (excluding the parent link and
+    fields derived on save, such as `rendered_content`).
+    """
+    return [
+        field
+        for field in block_class._meta.local_concrete_fields
+        if not field.primary_key and field.editable
+    ]
+
+
+def dump_block(block):
+    data = dict(type=block.block_type_key, disabled=block.disabled)
+    for field in get_block_fields(type(block)):
+        data[field.name] = field.value_from_object(block)
+    return data
+
+
+def dump_menu_tree():
+    """Dump all menus with the blocks of their content sections (2 queries, plus
+    one per block type).
+    """
+    menus = list(Menu.objects.select_related("content_section"))
+    blocks_by_section = group_blocks_by_section(
+        load_blocks(ContentBlock.objects.filter(section__menu__isnull=False))
+    )
+
+    def dump_menu(menu):
+        section = menu.get_content_section()
+        section_blocks = blocks_by_section.get(section.id, []) if section else []
+        return dict(
+            title=menu.title,
+            url_slug=menu.url_slug,
+            disabled=menu.disabled,
+            redirect_to=menu.redirect_to,
+            blocks=[dump_block(block) for block in section_blocks],
+        )
+
+    menu_dicts = dict()
+    tree = list()
+    for menu in menus:
+        if not menu.parent_id:
+            menu_dict = dump_menu(menu)
+            menu_dict["children"] = list()
+            menu_dicts[menu.id] = menu_dict
+            tree.append(menu_dict)
+    for menu in menus:
+        if menu.parent_id:
+            menu_dicts[menu.parent_id]["children"].append(dump_menu(menu))
+
+    return dict(version=FORMAT_VERSION, menus=tree)
+
+
+def _lock_table(model, using):
+    """Block the writes of other transactions to the table of `model` until the
+    current transaction ends.
+    """
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    if connection.vendor == "postgresql":
+        # Still allows reads
+        with connection.cursor() as cursor:
+            cursor.execute("LOCK TABLE {} IN EXCLUSIVE MODE".format(table))
+    elif connection.vendor == "sqlite":
+        # SQLite locks the whole database for writes, on the first write of a
+        # transaction (even one that changes no rows)
+        column = connection.ops.quote_name(model._meta.pk.column)
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE {0} SET {1} = {1} WHERE 1 = 0".format(table, column))
+    else:
+        # Locks the last row and the inserts after it (e.g., InnoDB's next-key
+        # locks)
+        list(
+            model._base_manager.using(using)
+            .select_for_update()
+            .order_by("-pk")
+            .values_list("pk")[:1]
+        )
+
+
+class _IdAllocator:
+    """Allocates primary keys up front so that related rows can be bulk created
+    (SQLite does not return the ids of bulk created rows).
+
+    Must be used in a transaction: the table is locked until the transaction
+    ends, so that other writers cannot take the allocated ids (see
+    `_reset_sequences`).
+    """
+
+    def __init__(self, model, using=None):
+        using = using or router.db_for_write(model)
+        _lock_table(model, using)
+        max_id = model._base_manager.using(using).aggregate(Max("pk"))["pk__max"]
+        self.next_id = (max_id or 0) + 1
+
+    def __call__(self):
+        next_id = self.next_id
+        self.next_id += 1
+        return next_id
+
+
+def _bulk_create_child_rows(model, objs, using):
+    """Insert the rows of `objs` in the table of `model` only (not in the tables
+    of its parents, whose rows must exist), with a single `executemany`. The
+    parent links (the primary keys) must be set.
+
+    `bulk_create` does not support multi-table inheritance, and saving each
+    object would insert one row per query.
+    """
+    connection = connections[using]
+    fields = model._meta.local_concrete_fields
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        connection.ops.quote_name(model._meta.db_table),
+        ", ".join(connection.ops.quote_name(field.column) for field in fields),
+        ", ".join(["%s"] * len(fields)),
+    )
+    rows = [
+        [
+            field.get_db_prep_save(field.pre_save(obj, True), connection)
+            for field in fields
+        ]
+        for obj in objs
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+    for obj in objs:
+        obj._state.adding = False
+        obj._state.db = using
+
+
+def _validate_menu_tree(data):
+    """Validate the whole tree in memory (single pass, no queries)."""
+    errors = list()
+    parent_slugs = set()
+
+    def check_menu(menu_data, path, siblings):
+        menu = Menu(
+            title=menu_data.get("title"),
+            url_slug=menu_data.get("url_slug"),
+            disabled=menu_data.get("disabled", False),
+            redirect_to=menu_data.get("redirect_to"),
+        )
+        try:
+            menu.clean_fields(exclude=["parent"])
+        except ValidationError as e:
+            for field, messages in e.message_dict.items():
+                errors.append("{}: {}: {}".format(path, field, " ".join(messages)))
+        if menu.url_slug in siblings:
+            errors.append("{}: duplicate url_slug {}".format(path, menu.url_slug))
+        siblings.add(menu.url_slug)
+
+        for i, block_data in enumerate(menu_data.get("blocks", [])):
+            if block_data.get("type") not in models.content_block_classes:
+                errors.append(
+                    "{}.blocks[{}]: unknown block type {}".format(
+                        path, i, block_data.get("type")
+                    )
+                )
+
+    for i, menu_data in enumerate(data.get("menus", [])):
+        path = "menus[{}]".format(i)
+        check_menu(menu_data, path, parent_slugs)
+        child_slugs = set()
+        for j, child_data in enumerate(menu_data.get("children", [])):
+            child_path = "{}.children[{}]".format(path, j)
+            if child_data.get("children"):
+                errors.append(
+                    "{}: multi-level submenus are not supported".format(child_path)
+                )
+            check_menu(child_data, child_path, child_slugs)
+
+    if errors:
+        raise ValidationError(errors)
+
+
+def load_menu_tree(data, using=None):
+    """Replace all menus (and their sections and blocks) with the menu tree in
+    `data` (see module docstring).
+
+    The tree is validated as a whole before anything is written. All rows are
+    then written in one transaction, using a bulk insert per table (and per
+    block type).
+
+    :return: number of menus created
+    """
+    _validate_menu_tree(data)
+    using = using or router.db_for_write(Menu)
+
+    with transaction.atomic(using=using):
+        # Cascades to the content sections and blocks of the menus
+        Menu.objects.using(using).all().delete()
+
+        new_menu_id = _IdAllocator(Menu, using)
+        new_section_id = _IdAllocator(ContentSection, using)
+        new_block_id = _IdAllocator(ContentBlock, using)
+
+        menus = list()
+        sections = list()
+        blocks = list()
+        block_rows = dict()  # ContentBlock subclass -> list of instances
+
+        def add_menu(menu_data, order, parent_id=None):
+            menu = Menu(
+                id=new_menu_id(),
+                title=menu_data["title"],
+                url_slug=menu_data["url_slug"],
+                disabled=menu_data.get("disabled", False),
+                redirect_to=menu_data.get("redirect_to"),
+                parent_id=parent_id,
+                position=(order + 1) * POSITION_GAP,
+            )
+            menus.append(menu)
+
+            section = ContentSection(id=new_section_id(), key="", menu_id=menu.id)
+            sections.append(section)
+
+            for block_order, block_data in enumerate(menu_data.get("blocks", [])):
+                block_class = models.content_block_classes[block_data["type"]]
+                block_id = new_block_id()
+                blocks.append(
+                    ContentBlock(
+                        id=block_id,
+                        section_id=section.id,
+                        disabled=block_data.get("disabled", False),
+                        position=(block_order + 1) * POSITION_GAP,
+                        type_key=block_class.block_type_key,
+                    )
+                )
+                block = block_class(base_id=block_id)
+                for field in get_block_fields(block_class):
+                    if field.name in block_data:
+                        value = field.to_python(block_data[field.name])
+                        setattr(block, field.attname, value)
+                if isinstance(block, models.RenderedContentModel):
+                    block.render_content()
+                block_rows.setdefault(block_class, list()).append(block)
+
+            return menu
+
+        for order, menu_data in enumerate(data.get("menus", [])):
+            parent = add_menu(menu_data, order)
+            for child_order, child_data in enumerate(menu_data.get("children", [])):
+                add_menu(child_data, child_order, parent_id=parent.id)
+
+        Menu.objects.using(using).bulk_create(menus)
+        search.index_objects(Menu, menus, using)
+        ContentSection.objects.using(using).bulk_create(sections)
+        ContentBlock.objects.using(using).bulk_create(blocks)
+        for block_class, rows in block_rows.items():
+            _bulk_create_child_rows(block_class, rows, using)
+            search.index_objects(block_class, rows, using)
+
+        _reset_sequences(using, [Menu, ContentSection, ContentBlock])
+
+    invalidate_menus()
+    return len(menus)
+
+
+def _reset_sequences(using, model_list):
+    """Sync the id sequences with the explicitly set ids (as `loaddata` does)."""
+    connection = connections[using]
+    sequence_sql = connection.ops.sequence_reset_sql(no_style(), model_list)
+    if sequence_sql:
+        with connection.cursor() as cursor:
+            for line in sequence_sql:
+                cursor.execute(line)
+
+
+class _LineBuffer:
+    """File-like object whose `write` returns the written line (for csv.writer)."""
+
+    def write(self, value):
+        return value
+
+
+def dump_blurbs(model, format="csv", chunk_size=BLURB_CHUNK_SIZE):
+    """Lines of all blurbs of `model` (Blurb or ImageBlurb) in `format` (see
+    module docstring), generated while fetching `chunk_size` rows at a time.
+    """
+    fields = BLURB_FIELDS[model]
+    rows = model.objects.order_by("pk").values_list(*fields)
+    if format == "csv":
+        writer = csv.writer(_LineBuffer())
+        yield writer.writerow(fields)
+        for row in rows.iterator(chunk_size=chunk_size):
+            yield writer.writerow(["" if value is None else value for value in row])
+    elif format == "jsonl":
+        for row in rows.iterator(chunk_size=chunk_size):
+            yield json.dumps(dict(zip(fields, row))) + "\n"
+    else:
+        raise ValueError("`format` must be one of {}".format(BLURB_FORMATS))
+
+
+def read_blurb_rows(model, lines, format="csv"):
+    """Rows (dicts of field values) of blurbs of `model` read lazily from `lines`
+    (an iterable of strings, e.g., a text file) in `format`.
+
+    :raises ValidationError: on malformed input (when the row is read)
+    """
+    fields = BLURB_FIELDS[model]
+    if format == "csv":
+        reader = csv.DictReader(lines)
+        try:
+            header = reader.fieldnames or []
+            unknown = set(header) - set(fields)
+            if unknown or "identifier" not in header:
+                raise ValidationError(
+                    "The header must list identifier and any of {}, not {}".format(
+                        ", ".join(fields[1:]), ", ".join(sorted(unknown)) or "nothing"
+                    )
+                )
+            for row in reader:
+                # Extra cells are listed under the `None` key (`restkey`)
+                if None in row:
+                    raise ValidationError(
+                        "Line {}: more cells than columns in the header".format(
+                            reader.line_num
+                        )
+                    )
+                yield {field: value or None for field, value in row.items()}
+        except csv.Error as e:
+            raise ValidationError("Line {}: {}".format(reader.line_num, e))
+    elif format == "jsonl":
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise ValidationError("Line {}: {}".format(line_number, e))
+            if not isinstance(row, dict) or set(row) - set(fields):
+                raise ValidationError(
+                    "Line {}: expected an object with the keys {}".format(
+                        line_number, ", ".join(fields)
+                    )
+                )
+            yield row
+    else:
+        raise ValueError("`format` must be one of {}".format(BLURB_FORMATS))
+
+
+def _apply_blurb_row(blurb, row, number):
+    fields = [field for field in row if field != "identifier"]
+    for name in fields:
+        field = blurb._meta.get_field(name)
+        try:
+            setattr(blurb, field.attname, field.to_python(row[name]))
+        except ValidationError as e:
+            raise ValidationError(
+                "Row {}: {}: {}".format(number, name, " ".join(e.messages))
+            )
+    if isinstance(blurb, models.RenderedContentModel) and "content" in row:
+        blurb.render_content()
+    try:
+        blurb.clean_fields()
+    except ValidationError as e:
+        raise ValidationError(
+            [
+                "Row {}: {}: {}".format(number, field, " ".join(messages))
+                for field, messages in e.message_dict.items()
+            ]
+        )
+    return fields
+
+
+def load_blurbs(model, rows, chunk_size=BLURB_CHUNK_SIZE, using=None):
+    """Create or update blurbs of `model` (by identifier) from `rows` (see
+    `read_blurb_rows`), with a bulk update and a bulk insert per chunk of
+    `chunk_size` rows, in one transaction.
+
+    :raises ValidationError: on the first invalid row (nothing is written)
+    :return: numbers of created and of updated blurbs
+    """
+    using = using or router.db_for_write(model)
+    created = updated = 0
+    numbered_rows = enumerate(rows, 1)
+
+    with transaction.atomic(using=using):
+        for chunk in iter(lambda: list(islice(numbered_rows, chunk_size)), []):
+            identifiers = list()
+            for number, row in chunk:
+                if not row.get("identifier"):
+                    raise ValidationError("Row {}: missing identifier".format(number))
+                identifiers.append(row["identifier"])
+            if len(set(identifiers)) != len(identifiers):
+                raise ValidationError("Duplicate identifiers in the input")
+            existing = model.objects.using(using).in_bulk(
+                identifiers, field_name="identifier"
+            )
+
+            new_blurbs = list()
+            changed = dict()  # updated fields -> blurbs
+            for number, row in chunk:
+                blurb = existing.get(row["identifier"])
+                if blurb is None:
+                    blurb = model(identifier=row["identifier"])
+                    _apply_blurb_row(blurb, row, number)
+                    new_blurbs.append(blurb)
+                else:
+                    fields = _apply_blurb_row(blurb, row, number)
+                    if isinstance(blurb, models.RenderedContentModel) and (
+                        "content" in fields
+                    ):
+                        fields += ["rendered_content", "excerpt"]
+                    if fields:
+                        changed.setdefault(tuple(fields), list()).append(blurb)
+
+            model.objects.using(using).bulk_create(new_blurbs)
+            search.index_objects(
+                model,
+                model.objects.using(using).filter(
+                    identifier__in=[blurb.identifier for blurb in new_blurbs]
+                ),
+                using,
+            )
+            for fields, blurbs in changed.items():
+                model.objects.using(using).bulk_update(blurbs, fields)
+                search.index_objects(model, blurbs, using)
+            created += len(new_blurbs)
+            updated += sum(len(blurbs) for blurbs in changed.values())
+
+    # Bulk queries send no model signals (invalidates the cached blurbs)
+    registration.objects_registered.send(sender=model)
+    return created, updated
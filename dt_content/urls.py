@@ -14,6 +14,7 @@ urlpatterns = [
         TogglePreviewModeView.as_view(),
         name="toggle-preview-mode",
     ),
+    path("search/", SearchView.as_view(), name="search"),
     path("menus/", MenuListView.as_view(), name="menu-list"),
     path("menus/create/", MenuCreateView.as_view(), name="menu-create"),
     path("menus/update/<slug:slug>/", MenuUpdateView.as_view(), name="menu-update"),
@@ -24,6 +25,7 @@ urlpatterns = [
         name="submenu-update",
     ),
     path("menus/delete/<slug:slug>/", MenuDeleteView.as_view(), name="menu-delete"),
+    path("menus/reorder/<slug:slug>/", MenuReorderView.as_view(), name="menu-reorder"),
     path(
         "content-sections/",
         ContentSectionListView.as_view(),
@@ -45,9 +47,26 @@ urlpatterns = [
         ContentBlockDeleteView.as_view(),
         name="content-block-delete",
     ),
+    path(
+        "content-block/reorder/<slug:slug>/",
+        ContentBlockReorderView.as_view(),
+        name="content-block-reorder",
+    ),
     path("blurbs/", BlurbListView.as_view(), name="blurb-list"),
     path("blurbs/update/<slug:slug>/", BlurbUpdateView.as_view(), name="blurb-update"),
+    path("blurbs/export/", BlurbExportView.as_view(), name="blurb-export"),
+    path("blurbs/import/", BlurbImportView.as_view(), name="blurb-import"),
     path("image-blurbs/", ImageBlurbListView.as_view(), name="image-blurb-list"),
+    path(
+        "image-blurbs/export/",
+        ImageBlurbExportView.as_view(),
+        name="image-blurb-export",
+    ),
+    path(
+        "image-blurbs/import/",
+        ImageBlurbImportView.as_view(),
+        name="image-blurb-import",
+    ),
     path(
         "image-blurbs/update/<slug:slug>/",
         ImageBlurbUpdateView.as_view(),
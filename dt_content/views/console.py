@@ -1,13 +1,27 @@
+import io
 import json
 
-from django.core.exceptions import SuspiciousOperation
+from django.core.exceptions import (
+    ObjectDoesNotExist,
+    SuspiciousOperation,
+    ValidationError,
+)
+from django.db import router
+from django.db.models import Count
 from django.shortcuts import redirect
 from django.views.generic import *
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.views.generic.detail import SingleObjectMixin
 
+from .. import settings
+from ..counters import get_counts
 from ..forms import *
+from ..loaders import load_blocks
 from ..mixins import StaffMemberRequiredMixin
 from ..models import *
+from ..pagination import KeysetPaginationMixin
+from ..search import is_available, search
+from ..transfer import BLURB_FORMATS, dump_blurbs, load_blurbs, read_blurb_rows
 
 
 class IndexView(StaffMemberRequiredMixin, TemplateView):
@@ -15,15 +29,25 @@ class IndexView(StaffMemberRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["static_section_count"] = ContentSection.static_objects.count()
-        context["static_block_count"] = ContentBlock.static_objects.count()
-        context["blurb_count"] = Blurb.objects.count()
-        context["image_blurb_count"] = ImageBlurb.objects.count()
+        # Denormalized (see `dt_content.counters`)
+        context.update(get_counts())
+        return context
+
+
+class SearchView(StaffMemberRequiredMixin, TemplateView):
+    template_name = "dt_content/console/search.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get("q", "").strip()
+        context["query"] = query
+        context["search_available"] = is_available(router.db_for_read(Blurb))
+        context["results"] = search(query) if query else []
         return context
 
 
 class MenuListView(StaffMemberRequiredMixin, ListView):
-    queryset = Menu.objects.filter(parent=None)
+    queryset = Menu.objects.filter(parent=None).annotate(child_count=Count("children"))
     context_object_name = "menu_list"
     template_name = "dt_content/console/menu_list.html"
 
@@ -43,6 +67,7 @@ class MenuCreateView(StaffMemberRequiredMixin, CreateView):
 
 class MenuUpdateView(StaffMemberRequiredMixin, UpdateView):
     model = Menu
+    queryset = Menu.objects.select_related("content_section")
     form_class = MenuForm
     slug_field = "id"
     context_object_name = "menu"
@@ -95,6 +120,7 @@ class SubmenuCreateView(StaffMemberRequiredMixin, CreateView):
 
 class SubmenuUpdateView(StaffMemberRequiredMixin, UpdateView):
     model = Menu
+    queryset = Menu.objects.select_related("content_section")
     form_class = SubmenuForm
     slug_field = "id"
     context_object_name = "menu"
@@ -170,11 +196,17 @@ class ContentSectionDeleteView(StaffMemberRequiredMixin, DeleteView):
         return (self.next_url or self.object.console_list_url) + "?delete_success=True"
 
 
-class ContentBlockListView(StaffMemberRequiredMixin, ListView):
-    queryset = ContentBlock.objects.select_subclasses().filter(section=None)
+class ContentBlockListView(StaffMemberRequiredMixin, KeysetPaginationMixin, ListView):
+    queryset = ContentBlock.static_objects.all()
+    keyset_fields = ("key", "id")
+    paginate_by = settings.CONSOLE_PAGE_SIZE
     context_object_name = "content_block_list"
     template_name = "dt_content/console/content_block_list.html"
 
+    def load_page(self, queryset):
+        # The list only needs the type and id of each block
+        return load_blocks(queryset, defer=("content", "rendered_content", "excerpt"))
+
 
 class ContentBlockDeleteView(StaffMemberRequiredMixin, DeleteView):
     queryset = ContentBlock.objects.select_subclasses()
@@ -242,8 +274,10 @@ class ContentBlockCreateView(StaffMemberRequiredMixin, CreateView):
         return self.object.console_list_url
 
 
-class BlurbListView(StaffMemberRequiredMixin, ListView):
-    queryset = Blurb.objects.order_by("last_known_location", "identifier")
+class BlurbListView(StaffMemberRequiredMixin, KeysetPaginationMixin, ListView):
+    queryset = Blurb.objects.defer("content", "rendered_content")
+    keyset_fields = ("last_known_location", "identifier", "id")
+    paginate_by = settings.CONSOLE_PAGE_SIZE
     context_object_name = "blurb_list"
     template_name = "dt_content/console/blurb_list.html"
 
@@ -272,8 +306,10 @@ class BlurbUpdateView(StaffMemberRequiredMixin, UpdateView):
         return url + "?success=true"
 
 
-class ImageBlurbListView(StaffMemberRequiredMixin, ListView):
-    queryset = ImageBlurb.objects.order_by("last_known_location", "identifier")
+class ImageBlurbListView(StaffMemberRequiredMixin, KeysetPaginationMixin, ListView):
+    queryset = ImageBlurb.objects.all()
+    keyset_fields = ("last_known_location", "identifier", "id")
+    paginate_by = settings.CONSOLE_PAGE_SIZE
     context_object_name = "image_blurb_list"
     template_name = "dt_content/console/image_blurb_list.html"
 
@@ -302,6 +338,64 @@ class ImageBlurbUpdateView(StaffMemberRequiredMixin, UpdateView):
         return url + "?success=true"
 
 
+class BlurbExportView(StaffMemberRequiredMixin, View):
+    """Stream all blurbs as CSV (default) or JSON Lines (`?format=jsonl`)."""
+
+    model = Blurb
+    content_types = dict(csv="text/csv", jsonl="application/x-ndjson")
+
+    def get(self, request, *args, **kwargs):
+        format = request.GET.get("format", "csv")
+        if format not in BLURB_FORMATS:
+            raise SuspiciousOperation("Unknown format: {}".format(format))
+        response = StreamingHttpResponse(
+            dump_blurbs(self.model, format), content_type=self.content_types[format]
+        )
+        response["Content-Disposition"] = 'attachment; filename="{}.{}"'.format(
+            self.model._meta.model_name, format
+        )
+        return response
+
+
+class ImageBlurbExportView(BlurbExportView):
+    model = ImageBlurb
+
+
+class BlurbImportView(StaffMemberRequiredMixin, FormView):
+    model = Blurb
+    form_class = BlurbImportForm
+    template_name = "dt_content/console/blurb_import.html"
+    list_url_name = "dt-content:blurb-list"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["verbose_name"] = self.model._meta.verbose_name
+        context["list_url"] = reverse(self.list_url_name)
+        return context
+
+    def form_valid(self, form):
+        # Read line by line (large uploads are temporary files)
+        lines = io.TextIOWrapper(
+            form.cleaned_data["file"], encoding="utf-8-sig", newline=""
+        )
+        rows = read_blurb_rows(self.model, lines, form.cleaned_data["format"])
+        try:
+            created, updated = load_blurbs(self.model, rows)
+        except (ValidationError, UnicodeDecodeError) as e:
+            errors = e.messages if isinstance(e, ValidationError) else [str(e)]
+            for error in errors:
+                form.add_error(None, error)
+            return self.form_invalid(form)
+        return self.render_to_response(
+            self.get_context_data(form=form, created=created, updated=updated)
+        )
+
+
+class ImageBlurbImportView(BlurbImportView):
+    model = ImageBlurb
+    list_url_name = "dt-content:image-blurb-list"
+
+
 class RichTextBlockUpdateView(ContentBlockUpdateView):
     model = RichTextBlock
     fields = ["content"]
@@ -312,3 +406,46 @@ class RichTextBlockCreateView(ContentBlockCreateView):
     model = RichTextBlock
     form_class = RichTextBlockCreateForm
     template_name = "dt_content/console/rich_text_block_create.html"
+
+
+class ReorderView(StaffMemberRequiredMixin, SingleObjectMixin, View):  # Abstract class
+    """Move an object among its siblings (see `dt_content.ordering`).
+
+    POST parameters (one of):
+    - `direction`: `up` or `down`
+    - `after`: id of the sibling to move after (empty to move to the front)
+    """
+
+    slug_field = "id"
+    http_method_names = ["post"]
+
+    def post(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        direction = request.POST.get("direction", None)
+        if direction == "up":
+            self.object.move_up()
+        elif direction == "down":
+            self.object.move_down()
+        elif "after" in request.POST:
+            after = request.POST["after"]
+            if after:
+                try:
+                    after = self.object.get_siblings().get(id=after)
+                except (ObjectDoesNotExist, ValueError):
+                    raise SuspiciousOperation("Could not find sibling {}".format(after))
+            self.object.move_after(after or None)
+        else:
+            raise SuspiciousOperation("Missing POST parameter: `direction` or `after`")
+
+        next_url = request.GET.get("next", None)
+        if next_url:
+            return HttpResponseRedirect(next_url)
+        return JsonResponse(dict(id=self.object.id, position=self.object.position))
+
+
+class MenuReorderView(ReorderView):
+    queryset = Menu.objects
+
+
+class ContentBlockReorderView(ReorderView):
+    queryset = ContentBlock.objects
@@ -1,11 +1,9 @@
-import logging
 from typing import Tuple
 
 from django.http import Http404
-from django.shortcuts import get_object_or_404
 from django.views.generic.base import ContextMixin, TemplateView
 
-from ..menu import get_nav_menu_list
+from ..menu import get_nav_menu_list, resolve_menu_path
 from ..mixins import PreviewModeMixin
 from ..models import *
 
@@ -20,8 +18,12 @@ class PageContextMixin(PreviewModeMixin, ContextMixin):
     `menu_path_kwarg`: "menu_path"
 
     ## Optimization Notes
-    - Need to combine `get_current_menu` and `get_menu_list` for optimal performance.
-      These methods are called for **every** page load.
+    - The current menu is resolved from the cached menu tree (see
+      `dt_content.menu.resolve_menu_path`), so a page load costs no menu queries
+      and at most one query for the content section.
+    - For anonymous users, the rendered blocks of the section are cached (see the
+      `content_section_fragment` template tag), so its blocks are only queried
+      after the section has changed.
     """
 
     menu_base_url = "/"
@@ -30,25 +32,16 @@ class PageContextMixin(PreviewModeMixin, ContextMixin):
     def get_menu_base_url(self):
         return str(self.menu_base_url)  # may be lazy
 
+    def get_menu_path(self):
+        return self.kwargs.get(self.menu_path_kwarg)
+
     def get_current_menu(self, request):
-        menu_path = self.kwargs.get(self.menu_path_kwarg)
+        menu_path = self.get_menu_path()
         if not menu_path:
             return None
 
-        slugs = menu_path.split("/")
-
-        if len(slugs) not in [1, 2]:
-            logging.warning("Invalid menu_path {}".format(menu_path))
-
-        parent_slug = slugs[0]
-        parent = get_object_or_404(Menu, url_slug=parent_slug, parent=None)
-
-        if len(slugs) == 2:
-            child_slug = slugs[1]
-            child = get_object_or_404(Menu, url_slug=child_slug, parent=parent)
-            return child
-
-        return parent
+        page = resolve_menu_path(menu_path, self.get_nav_menu_list())
+        return page.child or page.parent
 
     def get_nav_menu_list(self):
         return get_nav_menu_list(
@@ -58,36 +51,13 @@ class PageContextMixin(PreviewModeMixin, ContextMixin):
     def get_page_context_data(self, **kwargs):
         page_context = dict()
 
-        current_menu = self.get_current_menu(self.request)
         nav_menu_list = self.get_nav_menu_list()
 
-        nav_menu = None
-        if current_menu:
-            if current_menu.parent:
-                parent_menu = current_menu.parent
-                child_menu = current_menu
-            else:
-                parent_menu = current_menu
-                child_menu = None
-
-            # Search parent
-            for menu in nav_menu_list:
-                if menu["id"] == parent_menu.id:
-                    nav_menu = menu
-                    break
-            else:
-                logging.warning("Could not find current parent menu in menu_list")
-
-            # Search child if exists
-            if child_menu:
-                for menu in nav_menu["children"]:
-                    if menu["id"] == child_menu.id:
-                        nav_menu = menu
-                        break
-                else:
-                    logging.warning("Could not find current child menu in menu_list")
-            page_context["content_section"] = current_menu.get_content_section()
-            page_context["nav_menu"] = nav_menu
+        menu_path = self.get_menu_path()
+        if menu_path:
+            page = resolve_menu_path(menu_path, nav_menu_list)
+            page_context["content_section"] = page.content_section
+            page_context["nav_menu"] = page.nav_menu
 
         page_context["nav_menu_list"] = nav_menu_list
         page_context["dt_content_preview_mode"] = self.get_preview_mode()
@@ -113,6 +83,5 @@ class PageView(PageContextMixin, TemplateView):
     `menu_path_kwarg`: "menu_path"
 
     ## Optimization Notes
-    - Need to combine `get_current_menu` and `get_menu_list` for optimal performance.
-      These methods are called for **every** page load.
+    - See `PageContextMixin`.
     """
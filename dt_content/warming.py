@@ -0,0 +1,191 @@
+"""Ahead-of-time generation ("warming") of the renditions of uploaded images.
+
+`settings.RENDITION_WIDTHS` declares the widths of the renditions of each image
+field. Instead of generating them on the first request, the renditions of new
+uploads are generated once the upload is committed (see `warm_on_commit`), and
+`manage.py warm_renditions` generates the missing renditions of existing images.
+
+With `settings.RENDITION_WARMING_PROCESSES`, new uploads are warmed by a pool of
+worker processes, started by each process that saves images (e.g., each web
+worker). Otherwise, the process that saves the image warms it. Images that fail
+(e.g., a worker was killed) are warmed again along with the next upload, up to
+`settings.RENDITION_WARMING_ATTEMPTS` times.
+
+Workers only access the storage (not the database). The renditions that they
+generate are then added to the rendition index (see `dt_content.rendition_index`)
+by the process that queued them.
+"""
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.apps import apps
+from django.db import connections, transaction
+
+from . import settings
+from .renditions import generate_renditions
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Images to warm again, as (arguments of `warm_image`, attempts so far)
+_retries = list()
+_retries_lock = threading.Lock()
+
+
+def get_field_label(model, field_name):
+    return "{}.{}".format(model._meta.label, field_name)
+
+
+def get_rendition_widths(model, field_name):
+    """Declared rendition widths of an image field (empty if none)."""
+    return settings.RENDITION_WIDTHS.get(get_field_label(model, field_name), [])
+
+
+def get_rendition_fields():
+    """(model, field name, widths) of the image fields with declared renditions.
+
+    Fields of apps that are not installed (e.g., carousel) are skipped.
+    """
+    rendition_fields = list()
+    for field_label, widths in settings.RENDITION_WIDTHS.items():
+        model_label, field_name = field_label.rsplit(".", 1)
+        try:
+            model = apps.get_model(model_label)
+        except LookupError:
+            continue
+        rendition_fields.append((model, field_name, widths))
+    return rendition_fields
+
+
+def is_new_upload(field_file):
+    """Whether `field_file` is a new upload, not yet stored (i.e., before the
+    model instance is saved).
+    """
+    return bool(field_file) and not field_file._committed
+
+
+def _init_worker():
+    # Worker processes are spawned (rather than forked) on some platforms
+    if not apps.ready:
+        django.setup()
+
+
+def create_executor(max_workers=None):
+    return ProcessPoolExecutor(
+        max_workers=max_workers or settings.RENDITION_WARMING_PROCESSES,
+        initializer=_init_worker,
+    )
+
+
+def get_executor():
+    """Process pool of the current process, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = create_executor()
+        return _executor
+
+
+def _discard_executor(executor):
+    """Drop `executor` (e.g., broken by a killed worker), so that the next
+    submission starts another pool.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def warm_image(model_label, field_name, name, widths):
+    """Generate the missing renditions of image `name` of a field (in a worker).
+
+    :return: the `GeneratedRenditions` of the image, or None on failure
+    """
+    storage = apps.get_model(model_label)._meta.get_field(field_name).storage
+    try:
+        return generate_renditions(name, storage, widths)
+    except OSError:
+        logging.warning("Could not generate renditions of {}".format(name))
+    except Exception:
+        # e.g., PIL's DecompressionBombError
+        logging.exception("Could not generate renditions of {}".format(name))
+    return None
+
+
+def warm_on_commit(instance, field_name):
+    """Queue the generation of the renditions of the image of `instance` once the
+    current transaction is committed.
+    """
+    widths = get_rendition_widths(type(instance), field_name)
+    name = getattr(instance, field_name).name
+    if not widths or not name:
+        return
+    args = (instance._meta.label, field_name, name, widths)
+
+    def submit():
+        with _retries_lock:
+            retries = list(_retries)
+            _retries.clear()
+        for image_args, attempts in [(args, 0)] + retries:
+            _warm(image_args, attempts)
+
+    transaction.on_commit(submit)
+
+
+def _warm(args, attempts):
+    if not settings.RENDITION_WARMING_PROCESSES:
+        _index_renditions(args, attempts, warm_image(*args))
+        return
+    executor = get_executor()
+    try:
+        future = executor.submit(warm_image, *args)
+    except BrokenProcessPool:
+        _discard_executor(executor)
+        executor = get_executor()
+        future = executor.submit(warm_image, *args)
+    future.add_done_callback(
+        lambda future: _index_worker_renditions(executor, args, attempts, future)
+    )
+
+
+def _index_worker_renditions(executor, args, attempts, future):
+    # Called in a thread of the executor, once the worker is done. Exceptions
+    # raised here would be lost.
+    try:
+        try:
+            generated = future.result()
+        except Exception as e:
+            logging.exception("Could not generate renditions of {}".format(args[2]))
+            if isinstance(e, BrokenProcessPool):
+                _discard_executor(executor)
+            generated = None
+        _index_renditions(args, attempts, generated)
+    finally:
+        connections.close_all()  # of this thread
+
+
+def _index_renditions(args, attempts, generated):
+    """Add the `generated` renditions of an image to the rendition index, or
+    queue the image to be warmed again if it failed.
+    """
+    from .rendition_index import add_renditions
+
+    name = args[2]
+    if generated is not None:
+        try:
+            add_renditions(name, generated.source_mtime, generated.widths)
+            return
+        except Exception:
+            logging.exception("Could not index the renditions of {}".format(name))
+    if attempts + 1 < settings.RENDITION_WARMING_ATTEMPTS:
+        with _retries_lock:
+            _retries.append((args, attempts + 1))
+    else:
+        logging.warning(
+            "Gave up generating renditions of {} (see manage.py "
+            "warm_renditions)".format(name)
+        )